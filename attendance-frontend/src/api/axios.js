@@ -50,4 +50,17 @@ API.interceptors.response.use(
   }
 );
 
+// Follow keyset "next" links until the last page of a list endpoint
+export const fetchAll = async (url, config) => {
+  let rows = [];
+  let next = url;
+  while (next) {
+    const res = await API.get(next, config);
+    if (Array.isArray(res.data)) return res.data;
+    rows = rows.concat(res.data.results);
+    next = res.data.next;
+  }
+  return rows;
+};
+
 export default API;
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import API from "../api/axios";
+import API, { fetchAll } from "../api/axios";
 import { PieChart, Pie, Cell, Tooltip, ResponsiveContainer } from "recharts";
 
 const StudentDashboard = () => {
@@ -17,8 +17,7 @@ const StudentDashboard = () => {
         const studentData = profileRes.data;
         setStudent(studentData);
 
-        const attendanceRes = await API.get("attendance/");
-        const records = attendanceRes.data;
+        const records = await fetchAll("attendance/?page_size=1000");
 
         const myAttendance = records.filter(
           (a) => a.student === studentData.id
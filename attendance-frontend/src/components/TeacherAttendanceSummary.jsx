@@ -11,6 +11,7 @@ const TeacherAttendanceSummary = () => {
   const [sessionDetails, setSessionDetails] = useState([]);
   const [searchTerm, setSearchTerm] = useState("");
   const [showDeleted, setShowDeleted] = useState(false);
+  const [nextPage, setNextPage] = useState(null);
 
   const navigate = useNavigate();
 
@@ -22,8 +23,11 @@ const TeacherAttendanceSummary = () => {
         ? "/attendance/teacher-deleted/"
         : "/attendance/teacher-summary/";
       const res = await API.get(url);
-      setSessions(res.data);
-      setFilteredSessions(res.data);
+      // summary is cursor-paginated: { next, previous, results }
+      const rows = res.data.results ?? res.data;
+      setSessions(rows);
+      setFilteredSessions(rows);
+      setNextPage(res.data.next ?? null);
     } catch {
       alert("Failed to load summary");
     } finally {
@@ -46,6 +50,18 @@ const TeacherAttendanceSummary = () => {
     setFilteredSessions(results);
   }, [searchTerm, sessions]);
 
+  // ---------------- LOAD MORE ----------------
+  const loadMore = async () => {
+    if (!nextPage) return;
+    try {
+      const res = await API.get(nextPage);
+      setSessions((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch {
+      alert("Failed to load more sessions");
+    }
+  };
+
   // ---------------- VIEW DETAILS ----------------
   const viewDetails = async (sessionId) => {
     if (expandedSession === sessionId) {
@@ -225,6 +241,15 @@ const TeacherAttendanceSummary = () => {
                   </div>
                 ))
               )}
+
+              {nextPage && (
+                <button
+                  onClick={loadMore}
+                  className="w-full bg-white/90 hover:bg-white py-3 rounded-2xl shadow font-black text-blue-600 transition active:scale-95"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>
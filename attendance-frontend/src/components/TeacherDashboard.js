@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import API from "../api/axios";
 import { useNavigate } from "react-router-dom";
 
@@ -11,6 +11,8 @@ const TeacherDashboard = () => {
   const [section, setSection] = useState("");
   const [semester, setSemester] = useState("");
   const [selectedSubject, setSelectedSubject] = useState("");
+  // Idempotency key of the batch being submitted, reused by resubmits
+  const batch = useRef({ body: null, key: null });
 
   const navigate = useNavigate();
 
@@ -38,14 +40,24 @@ const TeacherDashboard = () => {
   }
 
   try {
-    const res = await API.get(
-      `/teacher/students/?subject=${selectedSubject}&semester=${semester}&section=${section}`
-    );
+    // Revalidate the last copy of this class by its ETag; 304 keeps it
+    const url = `/teacher/roster/?subject=${selectedSubject}&semester=${semester}&section=${section}`;
+    const cached = JSON.parse(sessionStorage.getItem(url) || "null");
+    const res = await API.get(url, {
+      headers: cached ? { "If-None-Match": cached.etag } : {},
+      validateStatus: (code) => code === 200 || code === 304,
+    });
+
+    let roster = cached?.students;
+    if (res.status === 200) {
+      roster = res.data.students;
+      sessionStorage.setItem(url, JSON.stringify({ etag: res.headers.etag, students: roster }));
+    }
 
-    setStudents(res.data);
+    setStudents(roster);
 
     const initialStatus = {};
-    res.data.forEach((s) => (initialStatus[s.id] = ""));
+    roster.forEach((s) => (initialStatus[s.id] = ""));
     setStudentStatus(initialStatus);
   } catch (err) {
     console.error("Failed to fetch students", err);
@@ -82,9 +94,16 @@ const TeacherDashboard = () => {
     status: studentStatus[s.id],
   }));
 
+  const body = JSON.stringify(data);
+  if (batch.current.body !== body) {
+    batch.current = { body, key: crypto.randomUUID() };
+  }
+
   try {
     setLoading(true);
-    await API.post("/attendance/", data);
+    await API.post("/attendance/", data, {
+      headers: { "Idempotency-Key": batch.current.key },
+    });
     alert("Attendance marked ✅");
     navigate("/teacher/attendance-summary");
   } catch (err) {
@@ -248,8 +267,8 @@ const TeacherDashboard = () => {
               {students.map((s) => (
                 <div key={s.id} className="p-4 flex justify-between items-center">
                   <div>
-                    <p className="font-bold">{s.full_name}</p>
-                    <p className="text-xs text-gray-400">{s.register_number}</p>
+                    <p className="font-bold">{s.name}</p>
+                    <p className="text-xs text-gray-400">{s.roll_number}</p>
                   </div>
 
                   {/* ✅ CLEAN PILL BUTTONS */}
@@ -16,10 +16,21 @@ const UploadStudents = () => {
     setFile(e.target.files[0]);
   };
 
+  const pollJob = async (jobId) => {
+    while (true) {
+      const res = await API.get(`/jobs/${jobId}/`);
+      if (res.data.status === "succeeded" || res.data.status === "failed") {
+        return res.data;
+      }
+      setMessage(`Importing... ${res.data.progress} rows processed`);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleUpload = async (e) => {
     e.preventDefault();
     if (!file) {
-      setMessage("Please select an Excel file");
+      setMessage("Please select an Excel or CSV file");
       return;
     }
 
@@ -27,13 +38,21 @@ const UploadStudents = () => {
     formData.append("file", file);
 
     try {
-      const res = await API.post("/upload-students/", formData, {
+      // Queue the import and poll the job until the worker finishes it
+      const res = await API.post("/upload-students/?async=1", formData, {
         headers: {
           ...authHeader(),
           "Content-Type": "multipart/form-data",
         },
       });
-      setMessage(`Success! ${res.data.created_students} students uploaded.`);
+      const job = await pollJob(res.data.job_id);
+      if (job.status === "failed") {
+        setMessage(job.error || "Upload failed");
+        return;
+      }
+      setMessage(
+        `Success! ${job.result.created} students uploaded, ${job.result.exists} already existed, ${job.result.error} rows failed.`
+      );
       setFile(null);
     } catch (err) {
       console.error(err);
@@ -45,7 +64,7 @@ const UploadStudents = () => {
     <div className="min-h-screen flex items-center justify-center bg-gray-50 p-6">
       <div className="bg-white p-8 rounded-2xl shadow-lg w-full max-w-md">
         <h2 className="text-2xl font-semibold mb-4 text-center">
-          Upload Students (Excel)
+          Upload Students (Excel / CSV)
         </h2>
 
         {message && (
@@ -55,7 +74,7 @@ const UploadStudents = () => {
         <form onSubmit={handleUpload} className="space-y-4">
           <input
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.csv"
             onChange={handleFileChange}
             className="w-full border p-2 rounded"
           />
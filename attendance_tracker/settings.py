@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+
+from corsheaders.defaults import default_headers
+
 LOGIN_URL = 'student-login'
 LOGIN_REDIRECT_URL = '/student/dashboard/'
 LOGOUT_REDIRECT_URL = 'student-login'
@@ -49,16 +52,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'students.middleware.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'students.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "if-none-match")
+CORS_EXPOSE_HEADERS = ["ETag", "Idempotent-Replayed"]
 
 ROOT_URLCONF = 'attendance_tracker.urls'
 
@@ -83,12 +90,148 @@ WSGI_APPLICATION = 'attendance_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+#
+# Configured from the environment (defaults: the local SQLite file):
+#   DB_ENGINE            sqlite | postgres
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE      seconds to keep connections open (postgres, default 60)
+#   DB_CONN_HEALTH_CHECKS  ping reused connections before use (default on)
+#   DB_POOL              use psycopg's connection pool instead (postgres)
+#   DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE
+#   DB_SQLITE_PRODUCTION  WAL + tuned pragmas + IMMEDIATE transactions (sqlite)
+#   DB_SQLITE_TIMEOUT    seconds a writer waits for the lock (default 20)
+# A read replica is added as the "replica" alias when DB_REPLICA_NAME or
+# DB_REPLICA_HOST is set; other DB_REPLICA_* values default to the primary's.
+# Read-only summary/dashboard views are routed to it (students/routers.py).
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _database(prefix, default_name):
+    def env(key, default=None):
+        return os.environ.get(prefix + key, os.environ.get("DB_" + key, default))
+
+    if env("ENGINE", "sqlite") != "postgres":
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env("NAME", BASE_DIR / default_name),
+        }
+        if env_bool("DB_SQLITE_PRODUCTION"):
+            timeout = int(os.environ.get("DB_SQLITE_TIMEOUT", 20))
+            config['OPTIONS'] = {
+                'timeout': timeout,
+                # Take the write lock at BEGIN so waiting writers queue on
+                # busy_timeout instead of failing on a lock upgrade
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA busy_timeout={timeout * 1000};'
+                    'PRAGMA cache_size=-64000;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            }
+        return config
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env("NAME", "attendx"),
+        'USER': env("USER", ""),
+        'PASSWORD': env("PASSWORD", ""),
+        'HOST': env("HOST", ""),
+        'PORT': env("PORT", ""),
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        'CONN_HEALTH_CHECKS': env_bool("DB_CONN_HEALTH_CHECKS", True),
+        'OPTIONS': {},
+    }
+    if env_bool("DB_POOL"):
+        # Django's pool (psycopg 3) replaces persistent connections
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+        }
+    return config
+
+
 DATABASES = {
+    'default': _database("DB_", 'db.sqlite3'),
+}
+
+REPLICA_DATABASE = None
+if os.environ.get("DB_REPLICA_NAME") or os.environ.get("DB_REPLICA_HOST"):
+    REPLICA_DATABASE = 'replica'
+    DATABASES[REPLICA_DATABASE] = _database("DB_REPLICA_", 'db-replica.sqlite3')
+    # Tests read the replica through the primary's connection
+    DATABASES[REPLICA_DATABASE]['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['students.routers.ReplicaRouter']
+
+# Response cache for the dashboard reads (see students/cache.py). The
+# in-process default suits a single worker; several workers need a shared
+# backend (CACHE_BACKEND=file with CACHE_LOCATION=<dir>, or redis with
+# CACHE_LOCATION=redis://...) so a write in one invalidates them all.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get("CACHE_LOCATION", "attendx"),
     }
 }
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get("CACHE_MAX_ENTRIES", 10000))}
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+
+# Attendance rate (percent) below which a student is listed as a defaulter
+ATTENDANCE_DEFAULTER_THRESHOLD = float(os.environ.get("ATTENDANCE_DEFAULTER_THRESHOLD", 75))
+
+# Seconds an Idempotency-Key (and its stored response) is honoured; expired
+# keys are removed by `manage.py purge_idempotency_keys`
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 3600))
+# Seconds a request may hold a key without storing a response; after that its
+# worker is presumed dead and a retry takes the key over (a few request timeouts)
+IDEMPOTENCY_CLAIM_TIMEOUT = int(os.environ.get("IDEMPOTENCY_CLAIM_TIMEOUT", 120))
+
+# Delta sync (GET /api/attendance/sync/): records written in the last
+# ATTENDANCE_SYNC_SAFETY_WINDOW seconds wait for the next pull, so writes still
+# committing cannot slip behind a client's watermark; page size of a pull
+ATTENDANCE_SYNC_SAFETY_WINDOW = int(os.environ.get("ATTENDANCE_SYNC_SAFETY_WINDOW", 10))
+ATTENDANCE_SYNC_PAGE_SIZE = int(os.environ.get("ATTENDANCE_SYNC_PAGE_SIZE", 500))
+
+# Share of requests (0-1) profiled by students.middleware.InstrumentationMiddleware:
+# Server-Timing header plus a JSON line on the students.instrumentation logger.
+# 0 removes the middleware; INSTRUMENTATION_SLOW_QUERIES query shapes are logged
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get("INSTRUMENTATION_SAMPLE_RATE", 0))
+INSTRUMENTATION_SLOW_QUERIES = int(os.environ.get("INSTRUMENTATION_SLOW_QUERIES", 3))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "students.instrumentation": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Attempts a background job gets (failures and dead workers) before it is failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# Processes hashing imported students' passwords; 1 hashes in the job itself
+STUDENT_IMPORT_HASH_WORKERS = int(os.environ.get("STUDENT_IMPORT_HASH_WORKERS", 1))
+
+# Attempts for attendance writes that hit a locked database (see students/retry.py)
+ATTENDANCE_WRITE_RETRIES = int(os.environ.get("ATTENDANCE_WRITE_RETRIES", 5))
 
 
 # Password validation
@@ -139,7 +282,9 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',  # Only authenticated users can access by default
-    )
+    ),
+    # Keyset pagination on every list endpoint: ?cursor=...&page_size=N
+    'DEFAULT_PAGINATION_CLASS': 'students.pagination.KeysetPagination',
 }
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -1,16 +1,17 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework import routers
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import TokenRefreshView
-from students.views import MyTokenObtainPairView
+from students.views import MyTokenObtainPairView, MyTokenRefreshView, serve_thumbnail
+from students.thumbnails import ROOT as THUMBNAIL_ROOT
 
 from students.views import (
     StudentViewSet,
     TeacherViewSet,
     AttendanceViewSet,
     SubjectViewSet,
+    JobViewSet,
     restore_session
 )
 
@@ -20,18 +21,24 @@ router.register(r'teachers', TeacherViewSet)
 router.register(r'attendance', AttendanceViewSet, basename='attendance')
 
 router.register(r'subjects', SubjectViewSet, basename="subject")
+router.register(r'jobs', JobViewSet, basename="job")
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # 🔐 JWT
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/refresh/', MyTokenRefreshView.as_view(), name='token_refresh'),
     path("api/attendance/restore-session/<str:session_id>/", restore_session, name="restore-session"),
     # 🔁 API ROUTES
     path('api/', include(router.urls)),
     path('api/', include('students.urls')),  # ✅ ONLY THIS
+    # Async (ASGI) variants of the read-heavy dashboard endpoints
+    path('api/async/', include('students.async_urls')),
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>{THUMBNAIL_ROOT}/.*)$", serve_thumbnail),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
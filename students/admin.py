@@ -1,20 +1,32 @@
 from django.contrib import admin
-from .models import Student, Attendance, Teacher, Subject
+from .models import Student, Attendance, Teacher, Subject, SubjectSection, Job
+from django.db.models import Count
 from django.utils.html import format_html
+from .services import delete_attendance, save_attendance
+from .thumbnails import thumbnail_url
 
 class SubjectInline(admin.TabularInline):
     model = Subject
     extra = 1
-    fields = ('name', 'code', 'department', 'semester','sections')
+    fields = ('name', 'code', 'department', 'semester')
     show_change_link = True
+
+
+class SubjectSectionInline(admin.TabularInline):
+    model = SubjectSection
+    extra = 1
 # -----------------------------
 # TEACHER ADMIN
 # -----------------------------
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ("get_name", "get_email", "department", "subjects_count",)
+    list_select_related = ("user",)
     inlines = [SubjectInline]   # ✅ THIS IS THE FIX
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(subjects_total=Count("subjects"))
+
     def get_name(self, obj):
         return obj.user.get_full_name() or obj.user.username
     get_name.short_description = "Name"
@@ -24,8 +36,9 @@ class TeacherAdmin(admin.ModelAdmin):
     get_email.short_description = "Email"
 
     def subjects_count(self, obj):
-        return obj.subjects.count()
+        return obj.subjects_total
     subjects_count.short_description = "Subjects Count"
+    subjects_count.admin_order_field = "subjects_total"
 
 # -----------------------------
 # SUBJECT ADMIN
@@ -33,17 +46,29 @@ class TeacherAdmin(admin.ModelAdmin):
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ("name", "code", "teacher_name", "department", "semester", "students_count" ,"display_sections",)
+    list_filter = ("subject_sections__section", "semester")
+    list_select_related = ("teacher__user",)
+    inlines = [SubjectSectionInline]
+
+    def get_queryset(self, request):
+        return (
+            super().get_queryset(request)
+            .annotate(students_total=Count("students"))
+            .prefetch_related("subject_sections")
+        )
 
     def teacher_name(self, obj):
         return obj.teacher.user.get_full_name() if obj.teacher else "-"
     teacher_name.short_description = "Teacher"
 
     def students_count(self, obj):
-        return obj.students.count()
+        return obj.students_total
     students_count.short_description = "Students Count"
+    students_count.admin_order_field = "students_total"
 
     def display_sections(self, obj):
-        return ", ".join(obj.sections) if obj.sections else "-"
+        sections = [item.section for item in obj.subject_sections.all()]
+        return ", ".join(sections) if sections else "-"
 
     display_sections.short_description = "Sections"
 # -----------------------------
@@ -52,6 +77,12 @@ class SubjectAdmin(admin.ModelAdmin):
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ("get_name", "register_number", "department", "semester", "display_image", "subjects_count","section",)
+    # (department, semester, section) is indexed
+    list_filter = ("department", "semester", "section")
+    search_fields = ("register_number",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(subjects_total=Count("subjects"))
 
     def get_name(self, obj):
         return obj.full_name
@@ -61,27 +92,56 @@ class StudentAdmin(admin.ModelAdmin):
         if obj.img:
             return format_html(
                 '<img src="{}" width="40" height="40" style="object-fit:cover;border-radius:4px;" />',
-                obj.img.url
+                thumbnail_url(obj, "sm") or obj.img.url
             )
         return "-"
     display_image.short_description = "Photo"
 
     def subjects_count(self, obj):
-        return obj.subjects.count()
+        return obj.subjects_total
     subjects_count.short_description = "Subjects Count"
+    subjects_count.admin_order_field = "subjects_total"
 
 # -----------------------------
 # ATTENDANCE ADMIN
 # -----------------------------
+class SubjectListFilter(admin.RelatedFieldListFilter):
+    """Subject choices with their teacher joined in (Subject.__str__ reads it)."""
+
+    def field_choices(self, field, request, model_admin):
+        subjects = Subject.objects.select_related("teacher__user").order_by("name")
+        return [(subject.pk, str(subject)) for subject in subjects]
+
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ("student_image", "student_name", "date", "status", "subject_name", "recorded_by_email", "timestamp", "attendance_percentage")
+    # The percentage comes from the per-student counter row joined in here
+    list_select_related = ("student__attendance_stats", "subject", "recorded_by")
+    date_hierarchy = "date"
+    list_filter = (("subject", SubjectListFilter), "status", "is_deleted")
+    # Skip the unfiltered COUNT(*) over the whole table on every page
+    show_full_result_count = False
+
+    # Edits go through the services so the counters and rollups follow
+    def save_model(self, request, obj, form, change):
+        def save():
+            super(AttendanceAdmin, self).save_model(request, obj, form, change)
+            return obj
+
+        save_attendance(obj.pk if change else None, save)
+
+    def delete_model(self, request, obj):
+        delete_attendance(Attendance.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_attendance(queryset)
 
     def student_image(self, obj):
         if obj.student.img:
             return format_html(
                 '<img src="{}" width="50" height="50" style="border-radius:50%;object-fit:cover;" />', 
-                obj.student.img.url
+                thumbnail_url(obj.student, "sm") or obj.student.img.url
             )
         return "-"
     student_image.short_description = "Profile Pic"
@@ -99,9 +159,16 @@ class AttendanceAdmin(admin.ModelAdmin):
     recorded_by_email.short_description = "Recorded By"
 
     def attendance_percentage(self, obj):
-        total = obj.student.attendances.count()
-        if total == 0:
-            return "0%"
-        present = obj.student.attendances.filter(status="Present").count()
-        return f"{(present / total) * 100:.2f}%"
+        percentage = obj.student.attendance_percentage()
+        return f"{percentage:.2f}%" if percentage else "0%"
     attendance_percentage.short_description = "Attendance %"
+
+
+# -----------------------------
+# JOB ADMIN
+# -----------------------------
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress", "total", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("result", "error", "started_at", "finished_at", "attempts")
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import async_views
+
+# Served under /api/async/; mirror the sync routes of the same name
+urlpatterns = [
+    path('attendance/teacher-summary/', async_views.teacher_attendance_summary, name='async-teacher-summary'),
+    path('attendance/by-session/<uuid:session_id>/', async_views.by_session, name='async-by-session'),
+    path('students/<int:pk>/attendance_summary/', async_views.attendance_summary, name='async-attendance-summary'),
+    path('student/profile/', async_views.get_student_profile, name='async-student-profile'),
+]
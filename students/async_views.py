@@ -0,0 +1,144 @@
+"""
+Async (ASGI-native) variants of the read-heavy dashboard endpoints.
+
+They answer the same JSON as their DRF counterparts in ``views.py`` but
+run on the event loop with Django's async ORM, so under ASGI a single
+worker process can keep many dashboard polls in flight without a thread
+per request. DRF views are sync-only, hence plain async Django views with
+their own JWT authentication.
+"""
+import functools
+
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .filters import filter_date_range
+from .models import Attendance, Student, StudentAttendanceStats
+from .pagination import SummaryPagination
+from .roles import _role_from_token, arole_for_user
+from .routers import replica_reads
+from .serializer import AttendanceValuesSerializer, StudentSerializer
+from .services import teacher_summary_rows
+
+
+def _json(data, status=200):
+    # DRF's encoder, so dates and UUIDs render exactly as in the sync API
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+# -----------------------------
+# AUTH
+# -----------------------------
+_jwt = JWTAuthentication()
+
+
+async def authenticate(request):
+    """
+    Validate the ``Authorization: Bearer`` access token and attach
+    ``request.user``, ``request.auth`` and ``request.role``.
+    Returns an error response, or None when authenticated.
+    """
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header else None
+    if raw_token is None:
+        return _json({"detail": "Authentication credentials were not provided."}, status=401)
+    try:
+        token = _jwt.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return _json({"detail": "Given token not valid for any token type", "code": "token_not_valid"}, status=401)
+
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}, is_active=True).afirst()
+    if user is None:
+        return _json({"detail": "User not found", "code": "user_not_found"}, status=401)
+
+    request.user = user
+    request.auth = token
+    request.role = _role_from_token(token) or await arole_for_user(user)
+    return None
+
+
+def jwt_required(view):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        error = await authenticate(request)
+        if error is not None:
+            return error
+        try:
+            return await view(request, *args, **kwargs)
+        except (NotFound, ValidationError) as exc:
+            return _json(exc.detail if isinstance(exc, ValidationError) else {"detail": exc.detail},
+                         status=exc.status_code)
+    return wrapper
+
+
+# -----------------------------
+# ENDPOINTS
+# -----------------------------
+@jwt_required
+@replica_reads
+async def teacher_attendance_summary(request):
+    role = request.role
+    if not role.is_teacher:
+        return _json({"error": "Teacher not found"}, status=404)
+
+    rollups = filter_date_range(teacher_summary_rows(role.teacher_id), request)
+    paginator = SummaryPagination()
+    page = await paginator.apaginate_queryset(rollups, request)
+    return _json({"next": paginator.get_next_link(), "results": page})
+
+
+@jwt_required
+@replica_reads
+async def attendance_summary(request, pk):
+    if str(request.role.student_id) != str(pk):
+        return _json({"detail": "No Student matches the given query."}, status=404)
+    student = await Student.objects.filter(pk=pk).only("id", "full_name").afirst()
+    if student is None:
+        return _json({"detail": "No Student matches the given query."}, status=404)
+
+    stats = await StudentAttendanceStats.objects.filter(student_id=pk).afirst()
+    total_classes = stats.total if stats else 0
+    present_count = stats.present if stats else 0
+    percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
+
+    return _json({
+        "student_id": student.id,
+        "name": student.full_name,
+        "total_classes": total_classes,
+        "present_days": present_count,
+        "attendance_percentage": round(percentage, 2),
+    })
+
+
+@jwt_required
+@replica_reads
+async def get_student_profile(request):
+    # Everything the serializer reads is eager-loaded, so rendering it
+    # below runs no (sync) queries on the event loop
+    student = await StudentSerializer.setup_eager_loading(
+        Student.objects.filter(pk=request.role.student_id)
+    ).afirst()
+    if not student:
+        return _json({"error": "Student profile not found"}, status=404)
+    return _json(StudentSerializer(student, context={"request": request}).data)
+
+
+@jwt_required
+async def by_session(request, session_id):
+    rows = [
+        row async for row in AttendanceValuesSerializer.values(
+            Attendance.objects.filter(session_id=session_id, is_deleted=False)
+            .order_by(*Attendance._meta.ordering)
+        )
+    ]
+    if not rows:
+        return _json({"error": "No attendance found for this session"}, status=404)
+    return _json(AttendanceValuesSerializer.to_representation(rows))
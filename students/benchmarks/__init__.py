@@ -0,0 +1,58 @@
+"""
+Benchmarks run against a throwaway test database, never the configured
+one; see ``test_database``. Entry points are the ``bench_*`` management
+commands.
+"""
+import time
+from contextlib import contextmanager
+from statistics import quantiles
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.test.utils import get_runner
+from django.conf import settings
+
+
+@contextmanager
+def test_database():
+    """Create (and afterwards destroy) the test databases for a benchmark run."""
+    runner = get_runner(settings)(verbosity=0, interactive=False)
+    runner.setup_test_environment()
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        runner.teardown_test_environment()
+
+
+@contextmanager
+def count_hashes():
+    """Count PBKDF2 computations made inside the block."""
+    calls = {"count": 0}
+    original = hashers.pbkdf2
+
+    def counting(*args, **kwargs):
+        calls["count"] += 1
+        return original(*args, **kwargs)
+
+    with mock.patch.object(hashers, "pbkdf2", counting):
+        yield calls
+
+
+def percentile_summary(samples):
+    """p50/p95 in milliseconds for a list of durations in seconds."""
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {"p50": value, "p95": value}
+    cuts = quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000}
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,297 @@
+import datetime
+import json
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, resolve
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from students.jobs import enqueue
+from students.models import Attendance
+from students.serializer import MyTokenObtainPairSerializer
+
+from . import percentile_summary
+from .datagen import PASSWORD
+
+
+BUDGETS_FILE = Path(__file__).with_name("budgets.json")
+
+
+@dataclass
+class Route:
+    """
+    One API call to benchmark. ``path`` and ``data`` are callables taking
+    the dataset dict and the iteration number, so write routes can target a
+    fresh period on every run. ``collect`` sees each response and can stash
+    values (e.g. new session ids) in the dataset for later routes.
+    ``cold`` routes start every call from an empty response cache, so the
+    uncached path is what gets measured.
+    """
+    name: str
+    method: str
+    path: Callable
+    role: str = "teacher"
+    data: Optional[Callable] = None
+    format: Optional[str] = "json"
+    status: tuple = (200,)
+    collect: Optional[Callable] = None
+    cold: bool = False
+
+
+@dataclass
+class Measurement:
+    name: str
+    queries: int = 0
+    samples: list = field(default_factory=list)
+    pattern: Optional[str] = None
+
+    def summary(self):
+        return {"queries": self.queries, **percentile_summary(self.samples), "pattern": self.pattern}
+
+
+def _roster_query(ds):
+    return f"subject={ds['subject'].id}&semester={ds['subject'].semester}&section={ds['section']}"
+
+
+def _mark_payload(ds, i, offset=1):
+    date = ds["start"] + datetime.timedelta(days=ds["days"] + offset + i)
+    return [
+        {
+            "student": student_id,
+            "subject": ds["subject"].id,
+            "date": date.isoformat(),
+            "session": 1,
+            "semester": ds["subject"].semester,
+            "section": ds["section"],
+            "status": "Present",
+        }
+        for student_id in ds["roster"]
+    ]
+
+
+def _marked_record(ds, i):
+    # One record of each session marked (and restored) by earlier routes
+    return Attendance.objects.filter(session_id=ds["marked"][i]).values_list("id", flat=True).first()
+
+
+def _move_payload(ds, i):
+    date = ds["start"] + datetime.timedelta(days=ds["days"] + 400 + i)
+    return {
+        "student": ds["record"]["student_id"], "subject": ds["record"]["subject_id"],
+        "date": date.isoformat(), "session": 1, "status": "Present",
+    }
+
+
+def _subject_payload(ds, i):
+    return {
+        "name": f"Benchmark {i}", "code": f"BENCH{i:04d}", "teacher": ds["teacher"].id,
+        "department": ds["subject"].department, "semester": ds["subject"].semester,
+        "sections": [ds["section"]],
+    }
+
+
+# Every API route in attendance_tracker/urls.py, students/urls.py and
+# students/async_urls.py (``api_patterns`` lists them; a test checks each
+# one is hit). The HTML login/logout views and the admin are not part of
+# the API and are not benchmarked.
+ROUTES = [
+    Route("token", "post", lambda ds, i: "/api/token/", role=None,
+          data=lambda ds, i: {"username": ds["student"].user.username, "password": PASSWORD}),
+    Route("token-refresh", "post", lambda ds, i: "/api/token/refresh/", role=None,
+          data=lambda ds, i: {"refresh": ds["refresh"]}),
+    Route("students-list", "get", lambda ds, i: "/api/students/", role="student"),
+    Route("students-detail", "get", lambda ds, i: f"/api/students/{ds['student'].id}/", role="student"),
+    Route("students-attendance-summary", "get",
+          lambda ds, i: f"/api/students/{ds['student'].id}/attendance_summary/", role="student"),
+    Route("api-root", "get", lambda ds, i: "/api/"),
+    Route("teachers-list", "get", lambda ds, i: "/api/teachers/"),
+    # Teachers need a user account, which this endpoint cannot create: only validation is reachable
+    Route("teachers-create", "post", lambda ds, i: "/api/teachers/", data=lambda ds, i: {"department": "x" * 101},
+          status=(400,)),
+    Route("teachers-detail", "get", lambda ds, i: f"/api/teachers/{ds['teacher'].id}/"),
+    Route("teachers-profile", "get", lambda ds, i: "/api/teachers/profile/"),
+    Route("subjects-list", "get", lambda ds, i: "/api/subjects/"),
+    Route("subjects-create", "post", lambda ds, i: "/api/subjects/", data=_subject_payload, status=(201,)),
+    Route("subjects-detail", "get", lambda ds, i: f"/api/subjects/{ds['subject'].id}/"),
+    Route("jobs-list", "get", lambda ds, i: "/api/jobs/"),
+    Route("jobs-detail", "get", lambda ds, i: f"/api/jobs/{ds['job'].id}/"),
+    Route("attendance-list-teacher", "get", lambda ds, i: "/api/attendance/"),
+    Route("attendance-list-student", "get", lambda ds, i: "/api/attendance/", role="student"),
+    Route("attendance-list-columnar", "get", lambda ds, i: "/api/attendance/?format=columnar&page_size=1000"),
+    Route("attendance-teacher-summary", "get", lambda ds, i: "/api/attendance/teacher-summary/"),
+    Route("attendance-teacher-deleted", "get", lambda ds, i: "/api/attendance/teacher-deleted/"),
+    Route("attendance-analytics-month", "get", lambda ds, i: "/api/attendance/analytics/?by=month"),
+    Route("attendance-analytics-student", "get", lambda ds, i: "/api/attendance/analytics/?by=student"),
+    Route("attendance-defaulters", "get", lambda ds, i: "/api/attendance/defaulters/"),
+    Route("attendance-register-csv", "get",
+          lambda ds, i: f"/api/attendance/register/?subject={ds['subject'].id}&section={ds['section']}&format=csv"),
+    Route("attendance-by-session", "get", lambda ds, i: f"/api/attendance/by-session/{ds['session_id']}/"),
+    Route("attendance-by-session-fast", "get", lambda ds, i: f"/api/attendance/by-session/{ds['session_id']}/?fast=1"),
+    Route("attendance-list-teacher-large", "get", lambda ds, i: "/api/attendance/?page_size=1000"),
+    Route("attendance-sync", "get", lambda ds, i: "/api/attendance/sync/"),
+    Route("attendance-sync-push", "post", lambda ds, i: "/api/attendance/sync/",
+          data=lambda ds, i: _mark_payload(ds, i, offset=200)),
+    Route("attendance-detail", "get", lambda ds, i: f"/api/attendance/{ds['record']['id']}/"),
+    Route("attendance-patch", "patch", lambda ds, i: f"/api/attendance/{ds['record']['id']}/",
+          data=lambda ds, i: {"status": "Present"}),
+    Route("attendance-put", "put", lambda ds, i: f"/api/attendance/{ds['record']['id']}/", data=_move_payload),
+    Route("attendance-mark", "post", lambda ds, i: "/api/attendance/", data=_mark_payload, status=(201,),
+          collect=lambda ds, response: ds["marked"].append(response.data["session_id"])),
+    Route("attendance-delete-session", "delete",
+          lambda ds, i: f"/api/attendance/delete-session/{ds['marked'][i]}/", status=(204,)),
+    Route("attendance-restore-session", "post",
+          lambda ds, i: f"/api/attendance/restore-session/{ds['marked'][i]}/"),
+    Route("attendance-delete", "delete", lambda ds, i: f"/api/attendance/{_marked_record(ds, i)}/"),
+    Route("student-profile", "get", lambda ds, i: "/api/student/profile/", role="student"),
+    Route("teacher-profile", "get", lambda ds, i: "/api/teacher/profile/"),
+    Route("teacher-students", "get", lambda ds, i: f"/api/teacher/students/?{_roster_query(ds)}"),
+    Route("teacher-roster", "get", lambda ds, i: f"/api/teacher/roster/?{_roster_query(ds)}"),
+    Route("upload-students", "post", lambda ds, i: "/api/upload-students/", format="multipart",
+          data=lambda ds, i: {"file": _upload_file(i)}),
+    Route("change-password", "post", lambda ds, i: "/api/change-password/", role="student",
+          data=lambda ds, i: {"old_password": "wrong", "new_password": "irrelevant"}, status=(400,)),
+    Route("async-teacher-summary", "get", lambda ds, i: "/api/async/attendance/teacher-summary/"),
+    Route("async-by-session", "get", lambda ds, i: f"/api/async/attendance/by-session/{ds['session_id']}/"),
+    Route("async-attendance-summary", "get",
+          lambda ds, i: f"/api/async/students/{ds['student'].id}/attendance_summary/", role="student"),
+    Route("async-student-profile", "get", lambda ds, i: "/api/async/student/profile/", role="student"),
+]
+
+# The routes above are measured warm (after the first call their responses
+# come from the response cache); these copies measure the uncached path
+CACHED_ROUTES = (
+    "students-attendance-summary", "teachers-profile", "subjects-list",
+    "student-profile", "teacher-profile", "teacher-roster",
+)
+ROUTES += [replace(route, name=f"{route.name}-cold", cold=True) for route in ROUTES if route.name in CACHED_ROUTES]
+
+
+# HTML views that happen to live under /api/
+NOT_API = {"student-login", "student-logout"}
+
+
+def api_patterns():
+    """
+    The full pattern of every API URL (``/api/...``) as ``resolve()``
+    reports it, format-suffix variants left out.
+    """
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern).lstrip("^")
+            if isinstance(pattern, URLPattern):
+                if route.startswith("api/") and "format>" not in route and pattern.name not in NOT_API:
+                    yield route
+            else:
+                yield from walk(pattern.url_patterns, route)
+    return set(walk(get_resolver().url_patterns, ""))
+
+
+def _upload_file(i):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    content = (
+        "register_number,full_name,department,semester,year,section\n"
+        f"UPLOAD{i:05d},Uploaded {i},CSE,1,1,A\n"
+    )
+    return SimpleUploadedFile("students.csv", content.encode())
+
+
+def _client(user):
+    client = APIClient()
+    if user is not None:
+        # Real JWT so the measured path matches production (token claims etc.)
+        token = MyTokenObtainPairSerializer().get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+def run_api_benchmark(ds, iterations=10, routes=ROUTES):
+    """
+    Call every route ``iterations`` times (after one warm-up call) and
+    return ``{route name: {"queries", "p50", "p95", "pattern"}}``.
+    ``queries`` is the worst count seen across the calls, ``pattern`` the
+    URL pattern the route resolved to.
+    """
+    # Start cold: responses cached by an earlier run would skew the warm-up
+    caches[settings.RESPONSE_CACHE_ALIAS].clear()
+    ds = dict(ds)
+    ds["roster"] = list(
+        ds["student"].__class__.objects
+        .filter(semester=ds["subject"].semester, section=ds["section"])
+        .values_list("id", flat=True)
+    )
+    ds["refresh"] = str(RefreshToken.for_user(ds["student"].user))
+    ds["marked"] = []
+    ds["record"] = Attendance.objects.filter(session_id=ds["session_id"]).values("id", "student_id", "subject_id").first()
+    ds["job"] = enqueue("import_students", {"path": "benchmark.csv", "filename": "benchmark.csv"}, ds["teacher"].user)
+    clients = {
+        "teacher": _client(ds["teacher"].user),
+        "student": _client(ds["student"].user),
+        None: _client(None),
+    }
+
+    results = {}
+    for route in routes:
+        client = clients[route.role]
+        measurement = Measurement(route.name)
+        for i in range(iterations + 1):
+            kwargs = {}
+            if route.data:
+                kwargs["data"] = route.data(ds, i)
+                kwargs["format"] = route.format
+            path = route.path(ds, i)
+            if route.cold:
+                caches[settings.RESPONSE_CACHE_ALIAS].clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, route.method)(path, **kwargs)
+                if response.streaming:
+                    # Exports run their queries while the body is read
+                    b"".join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if response.status_code not in route.status:
+                raise AssertionError(
+                    f"{route.name}: {route.method.upper()} {path} returned {response.status_code}"
+                )
+            if route.collect:
+                route.collect(ds, response)
+            measurement.pattern = resolve(path.partition("?")[0]).route
+            if i == 0:
+                continue  # warm-up
+            measurement.queries = max(measurement.queries, len(queries.captured_queries))
+            measurement.samples.append(elapsed)
+        results[route.name] = measurement.summary()
+    return results
+
+
+# -----------------------------
+# BUDGETS
+# -----------------------------
+def load_budgets(path=BUDGETS_FILE):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def check_budgets(results, budgets, check_latency=True):
+    """Return a list of human-readable budget violations."""
+    violations = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            violations.append(f"{name}: no budget checked in")
+            continue
+        if result["queries"] > budget["queries"]:
+            violations.append(f"{name}: {result['queries']} queries > budget {budget['queries']}")
+        if check_latency:
+            for key in ("p50", "p95"):
+                limit = budget.get(f"{key}_ms")
+                if limit is not None and result[key] > limit:
+                    violations.append(f"{name}: {key} {result[key]:.1f} ms > budget {limit} ms")
+    return violations
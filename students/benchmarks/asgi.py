@@ -0,0 +1,95 @@
+"""
+Sync endpoints through the WSGI handler on a thread pool versus their
+async twins (``/api/async/...``) through the ASGI handler on one event
+loop, at the same number of requests in flight.
+
+"threads" counts the threads that served requests: one per in-flight
+request on the WSGI side, the event loop on the ASGI side (whose async ORM
+calls share one more executor thread).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import AsyncClient, Client
+
+from students.serializer import MyTokenObtainPairSerializer
+
+from . import percentile_summary
+
+
+# name, path (appended to /api/ and /api/async/), role
+ENDPOINTS = [
+    ("teacher-summary", lambda ds: "attendance/teacher-summary/", "teacher"),
+    ("by-session", lambda ds: f"attendance/by-session/{ds['session_id']}/", "teacher"),
+    ("attendance-summary", lambda ds: f"students/{ds['student'].id}/attendance_summary/", "student"),
+    ("student-profile", lambda ds: "student/profile/", "student"),
+]
+
+
+def _result(samples, elapsed, threads):
+    return {
+        "requests_per_second": len(samples) / elapsed,
+        "threads": threads,
+        **percentile_summary(samples),
+    }
+
+
+def _run_wsgi(url, header, requests, concurrency):
+    local = threading.local()
+    threads = set()
+
+    def call(_):
+        if not hasattr(local, "client"):
+            local.client = Client()
+        threads.add(threading.get_ident())
+        began = time.perf_counter()
+        response = local.client.get(url, headers={"Authorization": header})
+        assert response.status_code == 200, (url, response.status_code)
+        return time.perf_counter() - began
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - began
+    connections.close_all()
+    return _result(samples, elapsed, len(threads))
+
+
+async def _run_asgi(url, header, requests, concurrency):
+    client = AsyncClient()
+    gate = asyncio.Semaphore(concurrency)
+    threads = set()
+
+    async def call():
+        async with gate:
+            began = time.perf_counter()
+            response = await client.get(url, headers={"Authorization": header})
+            threads.add(threading.get_ident())
+            assert response.status_code == 200, (url, response.status_code)
+            return time.perf_counter() - began
+
+    began = time.perf_counter()
+    samples = await asyncio.gather(*(call() for _ in range(requests)))
+    return _result(samples, time.perf_counter() - began, len(threads))
+
+
+def run_asgi_benchmark(ds, requests=200, concurrency=32):
+    """
+    ``{endpoint: {"wsgi": {...}, "asgi": {...}}}`` with requests/s, p50/p95
+    latency and the number of request-serving threads each side used.
+    """
+    headers = {
+        role: f"Bearer {MyTokenObtainPairSerializer().get_token(ds[role].user).access_token}"
+        for role in ("teacher", "student")
+    }
+    results = {}
+    for name, path, role in ENDPOINTS:
+        header = headers[role]
+        results[name] = {
+            "wsgi": _run_wsgi(f"/api/{path(ds)}", header, requests, concurrency),
+            "asgi": asyncio.run(_run_asgi(f"/api/async/{path(ds)}", header, requests, concurrency)),
+        }
+    return results
@@ -0,0 +1,147 @@
+"""
+Many processes marking attendance at the same moment against one on-disk
+SQLite file, the 9:00 burst in miniature.
+
+Each mode runs on a fresh database file configured purely through the
+DB_* environment variables, so worker processes (spawned, not forked) set
+up Django exactly as a production server would. Django is imported inside
+the functions only: spawned children unpickle this module before
+``django.setup()`` has run.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+
+
+MODES = {
+    # plain SQLite settings, no retry: what we ran before
+    "baseline": {"DB_SQLITE_PRODUCTION": "0", "ATTENDANCE_WRITE_RETRIES": "0"},
+    # WAL + pragmas + IMMEDIATE transactions + retry with jitter
+    "production": {"DB_SQLITE_PRODUCTION": "1", "ATTENDANCE_WRITE_RETRIES": "5"},
+}
+
+START = datetime.date(2025, 7, 1)
+
+
+def _setup(env):
+    os.environ.update(env)
+    import django
+
+    django.setup()
+
+
+def _prepare(env, students):
+    """Migrate the fresh database and seed one teacher, subject and roster."""
+    _setup(env)
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from students.models import Student, Subject, SubjectSection, Teacher
+
+    call_command("migrate", verbosity=0)
+    teacher = Teacher.objects.create(user=User.objects.create(username="bench-teacher"), department="CSE")
+    subject = Subject.objects.create(name="Bench", code="BENCH", teacher=teacher, semester="5")
+    SubjectSection.objects.create(subject=subject, section="A")
+    users = User.objects.bulk_create([User(username=f"bench-s{i:05d}") for i in range(students)])
+    Student.objects.bulk_create([
+        Student(
+            user_id=user.id, full_name=user.username, register_number=user.username,
+            department="CSE", semester="5", section="A",
+        )
+        for user in users
+    ])
+
+
+def _worker(env, worker, requests, start, results):
+    _setup(env)
+    from django.db import OperationalError
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+
+    from students.models import Student, Subject, Teacher
+    from students.retry import is_lock_error
+
+    setup_test_environment()  # lets the test client talk to "testserver"
+    logging.disable(logging.CRITICAL)  # lock errors and retries are counted, not logged
+    teacher = Teacher.objects.select_related("user").get()
+    subject = Subject.objects.get()
+    roster = list(Student.objects.values_list("id", flat=True))
+    client = APIClient()
+    client.force_authenticate(teacher.user)
+
+    outcome = {"ok": 0, "locked": 0, "other": 0, "rows": 0, "samples": []}
+    start.wait()  # released once every worker is set up
+    for i in range(requests):
+        # Every request is its own period, so there are no logical conflicts
+        date = START + datetime.timedelta(days=worker * requests + i)
+        payload = [
+            {
+                "student": student_id, "subject": subject.id, "date": date.isoformat(),
+                "session": 1, "semester": "5", "section": "A", "status": "Present",
+            }
+            for student_id in roster
+        ]
+        began = time.perf_counter()
+        try:
+            response = client.post("/api/attendance/", payload, format="json")
+        except OperationalError as exc:
+            outcome["locked" if is_lock_error(exc) else "other"] += 1
+            continue
+        outcome["samples"].append(time.perf_counter() - began)
+        if response.status_code == 201:
+            outcome["ok"] += 1
+            outcome["rows"] += response.data["created"]
+        else:
+            outcome["other"] += 1
+    results.put(outcome)
+
+
+def run_concurrency_benchmark(mode, workers=16, requests=10, students=40):
+    """
+    Run ``workers`` processes each posting ``requests`` attendance batches
+    of ``students`` rows at once. Returns totals, throughput and latency.
+    """
+    from . import percentile_summary
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            "DB_ENGINE": "sqlite",
+            "DB_NAME": os.path.join(directory, "bench.sqlite3"),
+            **MODES[mode],
+        }
+        prepare = context.Process(target=_prepare, args=(env, students))
+        prepare.start()
+        prepare.join()
+        if prepare.exitcode:
+            raise RuntimeError("Preparing the benchmark database failed")
+
+        start = context.Barrier(workers + 1)
+        results = context.Queue()
+        processes = [
+            context.Process(target=_worker, args=(env, worker, requests, start, results))
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        start.wait()
+        began = time.perf_counter()
+        outcomes = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+    totals = {key: sum(outcome[key] for outcome in outcomes) for key in ("ok", "locked", "other", "rows")}
+    samples = [sample for outcome in outcomes for sample in outcome["samples"]]
+    return {
+        "mode": mode,
+        "requests": workers * requests,
+        **totals,
+        "seconds": elapsed,
+        "requests_per_second": totals["ok"] / elapsed,
+        "rows_per_second": totals["rows"] / elapsed,
+        **percentile_summary(samples),
+    }
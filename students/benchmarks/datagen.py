@@ -0,0 +1,167 @@
+import datetime
+import random
+import uuid
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from students.models import Attendance, Student, Subject, SubjectSection, Teacher
+from students.services import rebuild_attendance_stats
+
+
+# students, subjects, teachers, days of attendance
+SCALES = {
+    "tiny": dict(students=40, subjects=4, teachers=2, days=3),
+    "small": dict(students=400, subjects=24, teachers=8, days=10),
+    "medium": dict(students=2000, subjects=120, teachers=40, days=30),
+    # a few million attendance rows
+    "large": dict(students=3000, subjects=300, teachers=100, days=40),
+}
+
+SECTIONS = ["A", "B", "C", "D"]
+SEMESTERS = [str(n) for n in range(1, 9)]
+DEPARTMENT = "CSE"
+PASSWORD = "bench-pass"
+
+BATCH_SIZE = 5000
+
+
+def _batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _users(prefix, count, password_hash):
+    User.objects.bulk_create(
+        [User(username=f"{prefix}{i:05d}", password=password_hash) for i in range(count)],
+        batch_size=BATCH_SIZE,
+    )
+    return list(User.objects.filter(username__startswith=prefix).order_by("username"))
+
+
+@transaction.atomic
+def generate(students, subjects, teachers, days, seed=1, start=datetime.date(2025, 7, 1)):
+    """
+    Seed a realistic synthetic campus with ``bulk_create`` only.
+
+    Students are spread over 8 semesters x 4 sections of one department.
+    Every subject belongs to one semester, covers two or more of its
+    sections and is marked once a day for each covered section, so the
+    attendance table grows to roughly ``students * subjects / 8 * days``
+    rows. All accounts share the password ``PASSWORD`` (hashed once).
+
+    Returns a dict describing the dataset for the API benchmark.
+    """
+    rng = random.Random(seed)
+    password_hash = make_password(PASSWORD)
+
+    teacher_users = _users("bench-t", teachers, password_hash)
+    Teacher.objects.bulk_create([Teacher(user=user, department=DEPARTMENT) for user in teacher_users])
+    teacher_list = list(Teacher.objects.filter(user__in=teacher_users).order_by("id"))
+
+    Subject.objects.bulk_create([
+        Subject(
+            name=f"Bench Subject {i:04d}",
+            code=f"BS{i:04d}",
+            teacher=teacher_list[i % teachers],
+            department=DEPARTMENT,
+            semester=SEMESTERS[i % len(SEMESTERS)],
+        )
+        for i in range(subjects)
+    ])
+    subject_list = list(Subject.objects.filter(code__startswith="BS").select_related("teacher").order_by("id"))
+    sections_of = {
+        subject.id: sorted(rng.sample(SECTIONS, rng.randint(2, len(SECTIONS))))
+        for subject in subject_list
+    }
+    SubjectSection.objects.bulk_create(
+        [
+            SubjectSection(subject_id=subject_id, section=section)
+            for subject_id, sections in sections_of.items()
+            for section in sections
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    student_users = _users("bench-s", students, password_hash)
+    Student.objects.bulk_create(
+        [
+            Student(
+                user=user,
+                full_name=f"Bench Student {i:05d}",
+                register_number=f"BENCH{i:05d}",
+                roll_number=f"R{i:05d}",
+                department=DEPARTMENT,
+                semester=SEMESTERS[i % len(SEMESTERS)],
+                section=SECTIONS[(i // len(SEMESTERS)) % len(SECTIONS)],
+                must_change_password=False,
+            )
+            for i, user in enumerate(student_users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    roster = {}
+    for student_id, semester, section in Student.objects.filter(
+        register_number__startswith="BENCH"
+    ).values_list("id", "semester", "section"):
+        roster.setdefault((semester, section), []).append(student_id)
+
+    Enrolment = Student.subjects.through
+    Enrolment.objects.bulk_create(
+        (
+            Enrolment(student_id=student_id, subject_id=subject.id)
+            for subject in subject_list
+            for section in sections_of[subject.id]
+            for student_id in roster.get((subject.semester, section), [])
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    def attendance_rows():
+        for offset in range(days):
+            date = start + datetime.timedelta(days=offset)
+            for index, subject in enumerate(subject_list):
+                for section in sections_of[subject.id]:
+                    session_id = uuid.uuid4()
+                    period = index % 6 + 1
+                    for student_id in roster.get((subject.semester, section), []):
+                        yield Attendance(
+                            student_id=student_id,
+                            subject_id=subject.id,
+                            date=date,
+                            session=period,
+                            status="Present" if rng.random() < 0.8 else "Absent",
+                            recorded_by_id=subject.teacher.user_id,
+                            semester=subject.semester,
+                            section=section,
+                            session_id=session_id,
+                        )
+
+    rows = 0
+    for batch in _batched(attendance_rows()):
+        Attendance.objects.bulk_create(batch)
+        rows += len(batch)
+
+    rebuild_attendance_stats(batch_size=BATCH_SIZE)
+
+    subject = subject_list[0]
+    section = sections_of[subject.id][0]
+    student = Student.objects.filter(id=roster[(subject.semester, section)][0]).select_related("user").get()
+    return {
+        "attendance_rows": rows,
+        "teacher": subject.teacher,
+        "subject": subject,
+        "section": section,
+        "student": student,
+        "session_id": Attendance.objects.filter(subject=subject).values_list("session_id", flat=True).first(),
+        "start": start,
+        "days": days,
+    }
+
+
+def generate_scale(scale, seed=1):
+    return generate(seed=seed, **SCALES[scale])
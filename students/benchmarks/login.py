@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from students.models import Student
+
+from . import count_hashes, percentile_summary
+
+
+def run_login_benchmark(users=20, rounds=3):
+    """
+    Log ``users`` students in ``rounds`` times through /api/token/ and
+    report throughput, latency and PBKDF2 computations per login.
+
+    Half the users still have their default password (register number),
+    half have changed it, so both branches of the login path are timed.
+    """
+    accounts = []
+    for i in range(users):
+        number = f"BENCH{i:05d}"
+        password = number if i % 2 else f"{number}-changed"
+        user = User.objects.create_user(number, password=password)
+        Student.objects.create(
+            user=user, full_name=number, register_number=number,
+            department="CSE", semester="1", section="A",
+        )
+        accounts.append((number, password))
+
+    client = APIClient()
+    samples = []
+    with count_hashes() as hashes:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for username, password in accounts:
+                t0 = time.perf_counter()
+                response = client.post("/api/token/", {"username": username, "password": password})
+                samples.append(time.perf_counter() - t0)
+                assert response.status_code == 200, response.content
+        elapsed = time.perf_counter() - started
+
+    logins = len(samples)
+    return {
+        "logins": logins,
+        "logins_per_second": logins / elapsed if elapsed else 0.0,
+        "hashes_per_login": hashes["count"] / logins,
+        **percentile_summary(samples),
+    }
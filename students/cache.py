@@ -0,0 +1,179 @@
+"""
+Per-user response cache for the dashboard reads, with ETag revalidation.
+
+Every cached response is keyed on the *versions* of the data it shows:
+
+* ``student:<id>``  - a student's row, enrolment and attendance counters
+* ``teacher:<id>``  - a teacher's row and user
+* ``subjects``      - any subject or subject section
+* ``roster:<department>:<semester>:<section>`` - the students of a class
+
+The write paths bump the versions they touch (``bump_on_commit``), so a
+write never has to know which responses exist: the next read simply
+misses and stores under the new version, and old entries age out. The
+ETag is derived from the same key, so ``If-None-Match`` is answered with
+a 304 from a single ``get_many`` of the versions, without touching the
+database or the cached body.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .roles import get_role
+from .routers import use_primary
+
+
+SUBJECTS = "subjects"
+KEY_PREFIX = "attendx"
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def student_scope(student_id):
+    return f"student:{student_id}"
+
+
+def teacher_scope(teacher_id):
+    return f"teacher:{teacher_id}"
+
+
+def roster_scope(department, semester, section):
+    return f"roster:{department}:{semester}:{section}"
+
+
+# -----------------------------
+# VERSIONS
+# -----------------------------
+def _version_key(scope):
+    return f"{KEY_PREFIX}:v:{scope}"
+
+
+def bump(*scopes):
+    """Give ``scopes`` fresh versions; responses built on the old ones are never read again."""
+    if scopes:
+        _cache().set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, timeout=None)
+
+
+def bump_on_commit(*scopes):
+    """
+    ``bump`` once the current transaction commits. Bumping earlier would
+    let a concurrent read cache pre-commit data under the new version.
+    """
+    if scopes:
+        transaction.on_commit(functools.partial(bump, *scopes))
+
+
+def versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = _cache().get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        # Unknown (or evicted) versions start fresh: at worst one extra miss
+        _cache().set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+# -----------------------------
+# RESPONSES
+# -----------------------------
+def cached_snapshot(name, scopes, build):
+    """
+    ``build()`` computed once per set of versions of ``scopes`` and shared
+    by every caller (unlike ``cached_response``, which is per user). Built
+    from the primary for the same reason.
+    """
+    digest = hashlib.sha1("|".join([name, *scopes, *versions(scopes)]).encode()).hexdigest()
+    key = f"{KEY_PREFIX}:s:{digest}"
+    value = _cache().get(key)
+    if value is None:
+        with use_primary():
+            value = build()
+        _cache().set(key, value, settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+def _resolve_scopes(names, role):
+    resolved = []
+    for name in names:
+        if name == "student":
+            if not role.student_id:
+                return None
+            resolved.append(student_scope(role.student_id))
+        elif name == "teacher":
+            if not role.teacher_id:
+                return None
+            resolved.append(teacher_scope(role.teacher_id))
+        else:
+            resolved.append(name)
+    return resolved
+
+
+def _response_key(request, scopes):
+    parts = [
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        str(request.user.pk),
+        *scopes,
+        *versions(scopes),
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    """Whether ``If-None-Match`` already names ``etag`` (answer 304)."""
+    etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return "*" in etags or etag in etags or f"W/{etag}" in etags
+
+
+def cached_response(*scope_names):
+    """
+    Cache a GET view's 200 responses per user under the versions of
+    ``scope_names`` ("student" / "teacher" resolve to the caller's own
+    scope; callers without that role are not cached).
+
+    Works on function views and viewset methods. Misses are filled from
+    the primary database: a lagging replica read under an already bumped
+    version would otherwise be cached as current.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            scopes = _resolve_scopes(scope_names, get_role(request))
+            if scopes is None:
+                return view(*args, **kwargs)
+
+            digest = _response_key(request, scopes)
+            key, etag = f"{KEY_PREFIX}:r:{digest}", quote_etag(digest)
+            if etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = _cache().get(key)
+                if data is None:
+                    with use_primary():
+                        response = view(*args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    _cache().set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+                else:
+                    response = Response(data)
+
+            response["ETag"] = etag
+            # Per user, and always revalidated: the ETag makes that cheap
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ("Authorization", "Accept"))
+            return response
+        return wrapper
+    return decorator
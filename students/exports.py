@@ -0,0 +1,64 @@
+"""
+File responses for reports and exports.
+
+CSV rows are streamed as they are produced, straight from a queryset
+iterator, so a response's memory does not grow with its length. XLSX
+workbooks are written through a temporary file for the same reason, but
+can only be sent once complete.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, filename):
+    """Stream ``rows`` (sequences in ``header`` order) as a CSV download."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_xlsx(header, rows, file, title="Sheet"):
+    """
+    Write ``rows`` to ``file`` as a single-sheet workbook. openpyxl's
+    write-only mode spills rows to disk as they come, so memory stays flat.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
+
+
+def xlsx_response(header, rows, filename, title="Sheet"):
+    """
+    XLSX download of ``rows``. Not streamed: a workbook is a zip that can
+    only be finished once every row is in, so nothing is sent until it has
+    been built (in a temporary file, to keep memory flat). Fine for reports
+    of bounded size; long ones are built by a job (``export_register``).
+    """
+    file = tempfile.TemporaryFile()
+    write_xlsx(header, rows, file, title)
+    file.seek(0)
+    return FileResponse(file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
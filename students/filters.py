@@ -0,0 +1,22 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateField
+
+
+def filter_date_range(queryset, request, field="date"):
+    """
+    Narrow ``queryset`` to the inclusive ``?from=YYYY-MM-DD&to=YYYY-MM-DD``
+    window given in the query string. Either bound may be omitted.
+    ``request`` may be a DRF or a plain Django request.
+    """
+    parser = DateField()
+    params = getattr(request, "query_params", request.GET)
+    for param, lookup in (("from", "gte"), ("to", "lte")):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            day = parser.to_internal_value(value)
+        except ValidationError:
+            raise ValidationError({param: "Enter a date in YYYY-MM-DD format."})
+        queryset = queryset.filter(**{f"{field}__{lookup}": day})
+    return queryset
@@ -0,0 +1,148 @@
+"""
+Retry-safe POSTs through the ``Idempotency-Key`` request header.
+
+The first request with a key claims it (a row without a response), runs,
+and stores its response. A retry with the same key within
+``settings.IDEMPOTENCY_KEY_TTL`` seconds gets the stored response back
+from one indexed lookup, without validating or writing anything again.
+A retry that arrives while the first request is still running gets a
+409, and a key reused for a different body a 422. A claim still without
+a response after ``settings.IDEMPOTENCY_CLAIM_TIMEOUT`` seconds belongs
+to a request that died (killed worker, timed out proxy) and is taken over
+by the next retry.
+
+Only a successful response is stored. Client errors (validation errors,
+a batch with nothing to save) and server errors release the key, so the
+client can fix the request (or simply retry) under the same key; none of
+them has written anything.
+"""
+import functools
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+# Namespace of the session ids derived from idempotency keys
+SESSION_NAMESPACE = uuid.UUID("3f0c8f9e-5d1b-4f5a-9a59-2b6f4c1d7e21")
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def _is_stale(record):
+    if record.created_at < expiry_cutoff():
+        return True
+    lease = timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT)
+    return record.status_code is None and record.created_at < timezone.now() - lease
+
+
+def batch_session_id(request):
+    """
+    ``session_id`` for a new attendance batch: derived from the
+    idempotency key when one is sent, so every retry of a batch names the
+    same session (even after its key has expired), else random.
+    """
+    key = request.headers.get(HEADER)
+    if key:
+        return str(uuid.uuid5(SESSION_NAMESPACE, f"{request.user.pk}:{key}"))
+    return str(uuid.uuid4())
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Return ``(record, claimed)``: the key's row and whether this request owns it."""
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            # A concurrent first request got there in between
+            record = IdempotencyKey.objects.get(user=user, key=key)
+
+    if _is_stale(record):
+        # Expired but not purged yet, or an abandoned claim: take it over,
+        # compare-and-set so only one of several concurrent requests wins
+        now = timezone.now()
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, created_at=record.created_at, status_code=record.status_code,
+        ).update(fingerprint=fingerprint, status_code=None, response=None, created_at=now)
+        if taken:
+            record.fingerprint, record.status_code, record.response, record.created_at = fingerprint, None, None, now
+            return record, True
+        record.refresh_from_db()
+    return record, False
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"{HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        response = Response(
+            {"detail": f"A request with this {HEADER} is still being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+        response["Retry-After"] = "1"
+        return response
+    response = Response(record.response, status=record.status_code)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Make a POST handler (viewset method or function view) honour
+    ``Idempotency-Key``. Requests without the header run as before.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+        if not claimed:
+            return _replay(record, fingerprint)
+
+        # Only while the claim is still ours: a request that outlived its
+        # lease must not overwrite (or release) the one that took over
+        claim = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            claim.delete()
+            raise
+        if response.status_code >= 400:
+            claim.delete()
+        else:
+            claim.update(status_code=response.status_code, response=response.data)
+        return response
+    return wrapper
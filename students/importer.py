@@ -0,0 +1,240 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .cache import bump_on_commit, roster_scope
+from .models import Student
+
+
+COLUMNS = ("register_number", "full_name", "department", "semester", "year", "section")
+REQUIRED_COLUMNS = ("register_number", "full_name", "department", "semester", "section")
+SECTIONS = {choice for choice, _ in Student._meta.get_field("section").choices}
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class ImportFormatError(ValueError):
+    """The uploaded file is not a readable CSV/XLSX student sheet."""
+
+
+# -----------------------------
+# READERS
+# -----------------------------
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _rows_from_header(header, rows):
+    header = [_cell(name).lower() for name in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+
+    for line, values in enumerate(rows, start=2):
+        row = {name: _cell(value) for name, value in zip(header, values) if name in COLUMNS}
+        if any(row.values()):
+            yield line, row
+
+
+def _read_csv(file):
+    reader = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    header = next(reader, None)
+    if header is None:
+        raise ImportFormatError("The file is empty")
+    yield from _rows_from_header(header, reader)
+
+
+def _read_xlsx(file):
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError("Invalid Excel file")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFormatError("The file is empty")
+        yield from _rows_from_header(header, rows)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """
+    Stream ``(line, row)`` pairs from a CSV or XLSX upload, where ``row`` is
+    a dict of the known columns and ``line`` its 1-based line in the sheet.
+    Blank rows are skipped.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return _read_csv(file)
+    if extension in (".xlsx", ".xlsm"):
+        return _read_xlsx(file)
+    raise ImportFormatError("Upload a .csv or .xlsx file")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# -----------------------------
+# PASSWORD HASHING
+# -----------------------------
+def _init_hash_worker():
+    import django
+
+    django.setup()
+
+
+class HashPool:
+    """
+    Hash passwords in a process pool of ``workers`` processes, started on
+    first use so small imports never pay for spawning it.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+
+    def hash(self, passwords):
+        if self.workers < 2 or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_hash_worker)
+        return list(self.executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def hash_workers():
+    return settings.STUDENT_IMPORT_HASH_WORKERS
+
+
+# -----------------------------
+# IMPORT ENGINE
+# -----------------------------
+def _validate(row):
+    missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if row["section"] not in SECTIONS:
+        return f"Invalid section '{row['section']}'"
+    return None
+
+
+def _import_chunk(chunk, seen, pool):
+    """
+    Import one chunk of ``(line, row)`` pairs and return its report rows.
+
+    Existing users and students are resolved with one set query each, new
+    users and students are written with one ``bulk_create`` each.
+    """
+    results = {}
+    pending = []
+    for line, row in chunk:
+        error = _validate(row)
+        if not error and row["register_number"] in seen:
+            error = "Duplicate register number in file"
+        if error:
+            results[line] = {"status": "error", "detail": error}
+            continue
+        seen.add(row["register_number"])
+        pending.append((line, row))
+
+    numbers = [row["register_number"] for _, row in pending]
+    existing_students = set(
+        Student.objects.filter(register_number__in=numbers).values_list("register_number", flat=True)
+    )
+    users = dict(User.objects.filter(username__in=numbers).values_list("username", "id"))
+    linked_users = set(
+        Student.objects.filter(user_id__in=users.values()).values_list("user_id", flat=True)
+    )
+
+    to_create = []
+    for line, row in pending:
+        number = row["register_number"]
+        if number in existing_students:
+            results[line] = {"status": "exists", "detail": "Student already exists"}
+        elif users.get(number) in linked_users:
+            results[line] = {"status": "error", "detail": "User is linked to another student"}
+        else:
+            to_create.append((line, row))
+
+    new_numbers = [row["register_number"] for _, row in to_create if row["register_number"] not in users]
+    with transaction.atomic():
+        if new_numbers:
+            # Default password is the register number, as before
+            hashes = pool.hash(new_numbers)
+            User.objects.bulk_create(
+                [User(username=number, password=hashed) for number, hashed in zip(new_numbers, hashes)]
+            )
+            users.update(User.objects.filter(username__in=new_numbers).values_list("username", "id"))
+
+        Student.objects.bulk_create([
+            Student(
+                user_id=users[row["register_number"]],
+                register_number=row["register_number"],
+                full_name=row["full_name"],
+                department=row["department"],
+                semester=row["semester"],
+                year=row.get("year") or None,
+                section=row["section"],
+                must_change_password=True,
+            )
+            for _, row in to_create
+        ])
+        # bulk_create sends no signals
+        bump_on_commit(*{
+            roster_scope(row["department"], row["semester"], row["section"]) for _, row in to_create
+        })
+
+    for line, _ in to_create:
+        results[line] = {"status": "created", "detail": ""}
+
+    return [
+        {"row": line, "register_number": row.get("register_number", ""), **results[line]}
+        for line, row in chunk
+    ]
+
+
+def import_students(file, filename, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, progress=None):
+    """
+    Import students from a CSV/XLSX upload in chunks of ``chunk_size`` rows.
+
+    Returns a report with per-status totals and one entry per data row
+    (``row`` is the line in the sheet, counting the header).
+    ``progress`` is called with the number of rows processed after each chunk.
+    """
+    rows = read_rows(file, filename)
+    report = {"created": 0, "exists": 0, "error": 0, "rows": []}
+    seen = set()
+
+    pool = HashPool(hash_workers() if workers is None else workers)
+    try:
+        for chunk in chunked(rows, chunk_size):
+            for result in _import_chunk(chunk, seen, pool):
+                report[result["status"]] += 1
+                report["rows"].append(result)
+            if progress:
+                progress(len(report["rows"]))
+    finally:
+        pool.close()
+
+    return report
@@ -0,0 +1,132 @@
+"""
+Per-request profile of the hot paths: query count and SQL time, time in
+the view versus in serialization, and the slowest query shapes.
+
+A sampled request (``settings.INSTRUMENTATION_SAMPLE_RATE``) gets a
+``Server-Timing`` header and one JSON log line on the
+``students.instrumentation`` logger. With the rate at 0 the middleware
+removes itself and the serializer hook is never installed, so requests
+run exactly as without it.
+
+Phases (milliseconds):
+
+* ``view``      - the view, less the time in ``serializer.data``
+* ``serialize`` - ``serializer.data`` plus rendering the response body
+* ``db``        - SQL on every database alias, wherever it ran
+* ``total``     - the rest of the middleware chain included
+"""
+import contextvars
+import functools
+import hashlib
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("instrumentation_profile", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\((?:\s*\?\s*,)*\s*\?\s*\)")
+_ROW_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """``sql`` with literals and parameter lists folded, so one query shape reads the same every time."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _PARAM_LIST.sub("(...)", sql)
+    sql = _ROW_LIST.sub("(...)", sql)  # multi-row INSERTs of any size
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+class Profile:
+    """What one sampled request spent, filled in by the hooks below."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.shapes = {}
+        # perf_counter() marks set by the middleware's view hooks
+        self.view_began = self.view_finished = None
+        self._serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook."""
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.queries += 1
+            self.db += elapsed
+            shape = self.shapes.setdefault(sql, [0, 0.0])
+            shape[0] += 1
+            shape[1] += elapsed
+
+    def slowest(self, limit):
+        """The ``limit`` query shapes with the most total time."""
+        totals = {}
+        for sql, (count, elapsed) in self.shapes.items():
+            key = fingerprint(sql)
+            entry = totals.setdefault(key, {"fingerprint": key, "sql": normalize_sql(sql)[:300], "count": 0, "ms": 0.0})
+            entry["count"] += count
+            entry["ms"] += elapsed * 1000
+        ranked = sorted(totals.values(), key=lambda entry: entry["ms"], reverse=True)[:limit]
+        for entry in ranked:
+            entry["ms"] = round(entry["ms"], 2)
+        return ranked
+
+    def capture_queries(self):
+        """Context manager routing every alias' queries through ``execute``."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self.execute))
+        return stack
+
+
+def start():
+    profile = Profile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def _timed_data(prop):
+    @functools.wraps(prop.fget)
+    def data(serializer):
+        profile = _current.get()
+        if profile is None or profile._serializing:
+            # Not sampled, or a serializer nested in one already timed
+            return prop.fget(serializer)
+        profile._serializing = True
+        began = time.perf_counter()
+        try:
+            return prop.fget(serializer)
+        finally:
+            profile.serialize += time.perf_counter() - began
+            profile._serializing = False
+    return property(data)
+
+
+@functools.cache
+def install_serializer_timing():
+    """Time ``serializer.data``; done once, and only when sampling is on."""
+    from rest_framework.serializers import ListSerializer, Serializer
+
+    for cls in (Serializer, ListSerializer):
+        cls.data = _timed_data(cls.__dict__["data"])
@@ -0,0 +1,163 @@
+import logging
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+CLEANUPS = {}
+
+
+def job_handler(kind, cleanup=None):
+    """
+    Register ``func(job, **payload)`` as the handler for jobs of ``kind``.
+    Whatever it returns (JSON-serializable) is stored as the job result.
+
+    ``cleanup(job, **payload)`` runs once the job is finished for good
+    (succeeded, or failed on its last attempt), never before a retry.
+    """
+    def register(func):
+        HANDLERS[kind] = func
+        if cleanup is not None:
+            CLEANUPS[kind] = cleanup
+        return func
+    return register
+
+
+def _finish(job):
+    cleanup = CLEANUPS.get(job.kind)
+    if cleanup is None:
+        return
+    try:
+        cleanup(job, **job.payload)
+    except Exception:
+        logger.exception("Cleanup of job %s (%s) failed", job.pk, job.kind)
+
+
+def enqueue(kind, payload=None, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(kind=kind, payload=payload or {}, created_by=user)
+
+
+# -----------------------------
+# WORKER SIDE
+# -----------------------------
+def claim_next():
+    """
+    Atomically move the oldest queued job to ``running`` and return it, or
+    return None when the queue is empty.
+
+    Claiming is a compare-and-set UPDATE on ``status`` so several workers
+    can share the table on SQLite as well as PostgreSQL without a broker.
+    """
+    while True:
+        job_id = (
+            Job.objects
+            .filter(status=Job.QUEUED)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome. A failure is queued
+    again until the job has had ``settings.JOB_MAX_ATTEMPTS`` attempts.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{job.kind}'")
+        job.result = handler(job, **job.payload)
+        job.status = Job.SUCCEEDED
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.error = str(exc) or type(exc).__name__
+        job.status = Job.QUEUED if job.attempts < settings.JOB_MAX_ATTEMPTS else Job.FAILED
+
+    if job.status == Job.QUEUED:
+        job.started_at = None
+        job.save(update_fields=["status", "error", "started_at"])
+        return job
+    job.finished_at = timezone.now()
+    job.save(update_fields=["result", "status", "error", "finished_at"])
+    _finish(job)
+    return job
+
+
+def requeue_stale(older_than):
+    """
+    Put back jobs whose worker died mid-run (started before ``older_than``
+    ago), or fail them if that was their last attempt.
+    """
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff)
+    for job in stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS):
+        # Compare-and-set: another worker may be sweeping at the same time
+        if Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+            status=Job.FAILED, error="Worker stopped responding", finished_at=timezone.now(),
+        ):
+            _finish(job)
+    return stale.update(status=Job.QUEUED, started_at=None)
+
+
+# -----------------------------
+# HANDLERS
+# -----------------------------
+def _delete_upload(job, path, filename):
+    default_storage.delete(path)
+
+
+@job_handler("import_students", cleanup=_delete_upload)
+def import_students_job(job, path, filename):
+    from .importer import import_students
+
+    # The upload stays until the job is finished for good, so a retry
+    # (after a failure or a dead worker) can read it again
+    with default_storage.open(path, "rb") as file:
+        return import_students(file, filename, progress=job.set_progress)
+
+
+@job_handler("export_register")
+def export_register_job(job, subject_id, section, date_from=None, date_to=None):
+    """The XLSX register of a subject+section, saved under ``exports/`` for download."""
+    from .exports import write_xlsx
+    from .models import Subject
+    from .services import register_header, register_periods, register_rows
+
+    def date_range(queryset):
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        return queryset
+
+    subject = Subject.objects.select_related("teacher").get(pk=subject_id)
+    periods = register_periods(subject, section, date_range)
+    name = f"register-{subject.code}-{section}"
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(register_header(periods), register_rows(subject, section, periods, date_range), file, title=name)
+        file.seek(0)
+        path = default_storage.save(f"exports/{uuid.uuid4()}/{name}.xlsx", File(file))
+    return {"file": default_storage.url(path), "path": path}
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.benchmarks import test_database
+from students.benchmarks.api import (
+    BUDGETS_FILE,
+    check_budgets,
+    load_budgets,
+    run_api_benchmark,
+)
+from students.benchmarks.datagen import SCALES, generate_scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset in a throwaway database, call every API route and "
+        "fail if query counts or p50/p95 latency exceed the checked-in budgets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--budgets", default=str(BUDGETS_FILE))
+        parser.add_argument("--no-latency", action="store_true", help="Only enforce query budgets.")
+        parser.add_argument(
+            "--update-budgets", action="store_true",
+            help="Write the measured query counts (and 3x the measured latency) as the new budgets."
+        )
+
+    def handle(self, *args, **options):
+        with test_database():
+            dataset = generate_scale(options["scale"])
+            self.stdout.write(f"Seeded {dataset['attendance_rows']} attendance rows ({options['scale']}).")
+            results = run_api_benchmark(dataset, iterations=options["iterations"])
+
+        width = max(len(name) for name in results)
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<{width}}  {result['queries']:>4} queries  "
+                f"p50 {result['p50']:8.1f} ms  p95 {result['p95']:8.1f} ms"
+            )
+
+        if options["update_budgets"]:
+            budgets = {
+                name: {
+                    "queries": result["queries"],
+                    "p50_ms": max(20, round(result["p50"] * 3)),
+                    "p95_ms": max(50, round(result["p95"] * 3)),
+                }
+                for name, result in results.items()
+            }
+            with open(options["budgets"], "w") as fh:
+                json.dump(budgets, fh, indent=2)
+                fh.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Budgets written to {options['budgets']}"))
+            return
+
+        violations = check_budgets(results, load_budgets(options["budgets"]), not options["no_latency"])
+        if violations:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(violations))
+        self.stdout.write(self.style.SUCCESS("All routes within budget."))
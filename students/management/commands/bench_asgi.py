@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from students.benchmarks import test_database
+from students.benchmarks.asgi import run_asgi_benchmark
+from students.benchmarks.datagen import SCALES, generate_scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the dashboard endpoints: sync views through WSGI on a thread pool "
+        "versus their /api/async/ twins through ASGI on one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and side")
+        parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+
+    def handle(self, *args, **options):
+        with test_database():
+            dataset = generate_scale(options["scale"])
+            self.stdout.write(
+                f"Seeded {dataset['attendance_rows']} attendance rows ({options['scale']}), "
+                f"{options['concurrency']} requests in flight."
+            )
+            results = run_asgi_benchmark(dataset, options["requests"], options["concurrency"])
+
+        width = max(len(name) for name in results)
+        for name, sides in results.items():
+            for side, result in sides.items():
+                self.stdout.write(
+                    f"{name:<{width}}  {side}  {result['requests_per_second']:8.1f} req/s  "
+                    f"p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms  "
+                    f"{result['threads']:>3} threads"
+                )
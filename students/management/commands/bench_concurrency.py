@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from students.benchmarks.concurrency import MODES, run_concurrency_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Spawn many processes marking attendance at once against a scratch SQLite "
+        "file and report throughput and lock errors, before and after production mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=10, help="Batches posted per worker")
+        parser.add_argument("--students", type=int, default=40, help="Rows per batch")
+        parser.add_argument("--mode", choices=list(MODES), action="append", help="Default: all modes")
+
+    def handle(self, *args, **options):
+        for mode in options["mode"] or list(MODES):
+            result = run_concurrency_benchmark(
+                mode, options["workers"], options["requests"], options["students"]
+            )
+            self.stdout.write(
+                f"{mode:<12} {result['ok']:>4}/{result['requests']} ok  "
+                f"{result['locked']:>4} locked  {result['other']:>3} other  "
+                f"{result['requests_per_second']:7.1f} req/s  {result['rows_per_second']:8.0f} rows/s  "
+                f"p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from students.benchmarks import test_database
+from students.benchmarks.login import run_login_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure /api/token/ login throughput and password hashes per login on a throwaway database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with test_database():
+            result = run_login_benchmark(options["users"], options["rounds"])
+
+        self.stdout.write(
+            f"{result['logins']} logins: {result['logins_per_second']:.1f}/s, "
+            f"p50 {result['p50']:.1f} ms, p95 {result['p95']:.1f} ms, "
+            f"{result['hashes_per_login']:.2f} hashes/login"
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Student
+from students.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Create the missing thumbnails of student photos (e.g. uploaded before thumbnails existed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Check every photo, not only those without thumbnails (recreates deleted files).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        students = Student.objects.exclude(img="").exclude(img__isnull=True).order_by("pk")
+        if not options["all"]:
+            students = students.filter(img_digest="")
+
+        done = files = failed = 0
+        for student in students.iterator(chunk_size=options["batch_size"]):
+            try:
+                files += generate_thumbnails(student)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"{student.register_number}: {exc}")
+                continue
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Thumbnails ready for {done} photos ({files} files written)."))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} photos could not be read."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from students.idempotency import expiry_cutoff
+from students.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys older than IDEMPOTENCY_KEY_TTL. Run it periodically (e.g. from cron)."
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_cutoff()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys."))
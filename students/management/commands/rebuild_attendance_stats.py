@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from students.services import rebuild_attendance_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the attendance counters and period rollups from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        students, subjects = rebuild_attendance_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt attendance counters for {students} students ({subjects} student/subject pairs)."
+        ))
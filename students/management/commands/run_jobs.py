@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from students.jobs import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, exports) from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument(
+            "--stale-after", type=int, default=3600,
+            help="Requeue jobs left running for this many seconds by a dead worker."
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        while True:
+            close_old_connections()
+            job = claim_next()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
+                continue
+
+            job = run_job(job)
+            self.stdout.write(f"{job} finished")
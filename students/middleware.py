@@ -0,0 +1,105 @@
+import json
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from . import instrumentation
+from .roles import resolve_role
+
+
+class RoleMiddleware:
+    """
+    Attach a lazy ``request.role`` resolved at most once per request.
+
+    JWT authentication happens inside the DRF view, so the role is only
+    worked out on first access, by which time DRF has copied the
+    authenticated ``user`` and ``auth`` token onto this request.
+
+    Async-capable, so async views under ASGI keep the whole middleware
+    chain on the event loop (they set ``request.role`` themselves).
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: resolve_role(request))
+        # Under ASGI this is the next middleware's coroutine, awaited by the caller
+        return self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    """
+    Profile a sample of requests (see ``students/instrumentation.py``):
+    ``Server-Timing`` header plus a JSON log line each.
+
+    Off unless ``settings.INSTRUMENTATION_SAMPLE_RATE`` is above 0, in
+    which case it is dropped from the chain at startup. Sync only: with it
+    on, ASGI serves async views through the sync chain.
+    """
+
+    def __init__(self, get_response):
+        self.rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if self.rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrumentation.install_serializer_timing()
+
+    def __call__(self, request):
+        if random.random() >= self.rate:
+            return self.get_response(request)
+
+        profile, token = instrumentation.start()
+        request._profile = profile
+        began = time.perf_counter()
+        try:
+            with profile.capture_queries():
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        finished = time.perf_counter()
+
+        view_began = profile.view_began or began
+        # DRF responses are rendered after the view returns; others have no render step
+        view_finished = profile.view_finished or finished
+        timings = {
+            "total": finished - began,
+            "view": view_finished - view_began - profile.serialize,
+            "serialize": profile.serialize + finished - view_finished,
+            "db": profile.db,
+        }
+        response["Server-Timing"] = ", ".join(
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{profile.queries} queries"' if name == "db" else "")
+            for name, seconds in timings.items()
+        )
+
+        match = request.resolver_match
+        instrumentation.logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in timings.items()},
+            "queries": profile.queries,
+            "slow_queries": profile.slowest(settings.INSTRUMENTATION_SLOW_QUERIES),
+        }, separators=(",", ":")))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            profile.view_began = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            profile.view_finished = time.perf_counter()
+        return response
@@ -0,0 +1,76 @@
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+BATCH_SIZE = 1000
+
+
+def _bulk_create(model, db, objs):
+    """``bulk_create`` ``objs`` a batch at a time, never holding them all in memory."""
+    objs = iter(objs)
+    while batch := list(islice(objs, BATCH_SIZE)):
+        model.objects.using(db).bulk_create(batch)
+
+
+def build_stats(apps, schema_editor):
+    Attendance = apps.get_model('students', 'Attendance')
+    StudentAttendanceStats = apps.get_model('students', 'StudentAttendanceStats')
+    SubjectAttendanceStats = apps.get_model('students', 'SubjectAttendanceStats')
+    db = schema_editor.connection.alias
+    live = Attendance.objects.using(db).filter(is_deleted=False).order_by()
+    present = Count('id', filter=Q(status='Present'))
+    _bulk_create(
+        SubjectAttendanceStats,
+        db,
+        (
+            SubjectAttendanceStats(**row)
+            for row in live.values('student_id', 'subject_id')
+            .annotate(total=Count('id'), present=present)
+            .iterator(chunk_size=BATCH_SIZE)
+        ),
+    )
+    _bulk_create(
+        StudentAttendanceStats,
+        db,
+        (
+            StudentAttendanceStats(**row)
+            for row in live.values('student_id')
+            .annotate(total=Count('id'), present=present)
+            .iterator(chunk_size=BATCH_SIZE)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_alter_student_section'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceStats',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_stats', serialize=False, to='students.student')),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubjectAttendanceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_attendance_stats', to='students.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='students.subject')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'subject'), name='unique_attendance_stats_per_subject')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_attendance_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attendances', to='students.student'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='students.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['session_id'], name='attendance_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'is_deleted', 'status'], name='attendance_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject', 'is_deleted', 'date', 'session'], name='attendance_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['subject'], name='attendance_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+BATCH_SIZE = 1000
+
+
+def build_rollups(apps, schema_editor):
+    Attendance = apps.get_model('students', 'Attendance')
+    AttendanceRollup = apps.get_model('students', 'AttendanceRollup')
+    db = schema_editor.connection.alias
+    rows = (
+        Attendance.objects.using(db)
+        .filter(is_deleted=False)
+        .order_by()
+        .values('session_id', 'date', 'subject_id', 'session', 'semester', 'section')
+        .annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent')),
+        )
+    )
+    # bulk_create would list every row first: insert a batch at a time
+    objs = (AttendanceRollup(**row) for row in rows.iterator(chunk_size=BATCH_SIZE))
+    while batch := list(islice(objs, BATCH_SIZE)):
+        AttendanceRollup.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.UUIDField()),
+                ('date', models.DateField()),
+                ('session', models.PositiveIntegerField()),
+                ('semester', models.CharField(max_length=10)),
+                ('section', models.CharField(max_length=5)),
+                ('total', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='students.subject')),
+            ],
+            options={
+                'ordering': ['-date', '-session', '-id'],
+                'indexes': [models.Index(fields=['subject', 'date', 'session'], name='rollup_subject_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('session_id', 'date', 'subject', 'session', 'semester', 'section'), name='unique_attendance_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
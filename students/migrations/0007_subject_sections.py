@@ -0,0 +1,72 @@
+import sys
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# SECTION_CHOICES as of this migration
+SECTIONS = ("A", "B", "C", "D")
+
+
+def copy_sections(apps, schema_editor):
+    Subject = apps.get_model("students", "Subject")
+    SubjectSection = apps.get_model("students", "SubjectSection")
+    db = schema_editor.connection.alias
+    rows = []
+    skipped = []
+    for subject_id, sections in Subject.objects.using(db).values_list("id", "sections").iterator():
+        if isinstance(sections, str):
+            sections = sections.split(",")
+        # Legacy values were free text: " a", "B ", "b" all mean one section
+        cleaned = {str(section).strip().upper() for section in sections or [] if section is not None}
+        cleaned.discard("")
+        skipped += [(subject_id, section) for section in sorted(cleaned - set(SECTIONS))]
+        for section in sorted(cleaned & set(SECTIONS)):
+            rows.append(SubjectSection(subject_id=subject_id, section=section))
+    SubjectSection.objects.using(db).bulk_create(rows, batch_size=1000)
+    if skipped:
+        sys.stdout.write(
+            "\n  Skipped sections outside %s (subject id, section): %s\n"
+            % ("/".join(SECTIONS), ", ".join(f"({subject_id}, {section!r})" for subject_id, section in skipped))
+        )
+
+
+def restore_sections(apps, schema_editor):
+    Subject = apps.get_model("students", "Subject")
+    SubjectSection = apps.get_model("students", "SubjectSection")
+    db = schema_editor.connection.alias
+    sections = {}
+    for subject_id, section in SubjectSection.objects.using(db).order_by("subject_id", "section").values_list("subject_id", "section"):
+        sections.setdefault(subject_id, []).append(section)
+    subjects = list(Subject.objects.using(db).filter(id__in=sections))
+    for subject in subjects:
+        subject.sections = sections[subject.id]
+    Subject.objects.using(db).bulk_update(subjects, ["sections"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')], max_length=2)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subject_sections', to='students.subject')),
+            ],
+            options={
+                'ordering': ['subject', 'section'],
+                'indexes': [models.Index(fields=['section', 'subject'], name='subject_section_idx')],
+                'constraints': [models.UniqueConstraint(fields=('subject', 'section'), name='unique_subject_section')],
+            },
+        ),
+        migrations.RunPython(copy_sections, restore_sections),
+        migrations.RemoveField(
+            model_name='subject',
+            name='sections',
+        ),
+    ]
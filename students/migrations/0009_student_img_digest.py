@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0008_student_roster_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='img_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
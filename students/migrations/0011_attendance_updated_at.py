@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    Attendance = apps.get_model('students', 'Attendance')
+    db = schema_editor.connection.alias
+    Attendance.objects.using(db).update(updated_at=Coalesce('deleted_at', 'timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['updated_at', 'id'], name='attendance_sync_idx'),
+        ),
+    ]
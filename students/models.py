@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 import datetime
 import uuid
+
+SECTION_CHOICES = [("A","A"),("B","B"),("C","C"),("D","D")]
+
 # -----------------------------
 # TEACHER MODEL
 # -----------------------------
@@ -21,7 +25,6 @@ class Teacher(models.Model):
 class Subject(models.Model):
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(max_length=20, unique=True)
-    sections = models.JSONField(default=list) 
     teacher = models.ForeignKey(
         Teacher,
         on_delete=models.SET_NULL,
@@ -40,6 +43,28 @@ class Subject(models.Model):
       return f"{self.name} - No Teacher"
 
 
+# -----------------------------
+# SUBJECT SECTION (which sections a subject is taught to)
+# -----------------------------
+class SubjectSection(models.Model):
+    # Covered by the (subject, section) unique index
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="subject_sections", db_index=False)
+    section = models.CharField(max_length=2, choices=SECTION_CHOICES)
+
+    class Meta:
+        ordering = ["subject", "section"]
+        constraints = [
+            models.UniqueConstraint(fields=["subject", "section"], name="unique_subject_section"),
+        ]
+        indexes = [
+            # "which subjects cover section B" without touching every subject
+            models.Index(fields=["section", "subject"], name="subject_section_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject.name} - {self.section}"
+
+
 # -----------------------------
 # STUDENT MODEL
 # -----------------------------
@@ -51,6 +76,8 @@ class Student(models.Model):
     register_number = models.CharField(max_length=100, unique=True)
     roll_number = models.CharField(max_length=20, unique=True, null=True, blank=True)
     img = models.ImageField(upload_to='student_images/', blank=True, null=True)
+    # SHA-256 of img once its thumbnails exist (see students/thumbnails.py)
+    img_digest = models.CharField(max_length=64, blank=True, default="", editable=False)
     
     # Academic details
     department = models.CharField(max_length=50)
@@ -58,7 +85,7 @@ class Student(models.Model):
     year = models.CharField(max_length=10, null=True, blank=True)
     section = models.CharField(
         max_length=2,
-        choices=[("A","A"),("B","B"),("C","C"),("D","D")]
+        choices=SECTION_CHOICES
     )
     course = models.CharField(max_length=100, null=True, blank=True)
     must_change_password = models.BooleanField(default=True)
@@ -66,10 +93,17 @@ class Student(models.Model):
     # Relationship with subjects
     subjects = models.ManyToManyField(Subject, related_name='students')
 
+    class Meta:
+        indexes = [
+            # Rosters and admin filters: department -> semester -> section
+            models.Index(fields=["department", "semester", "section"], name="student_roster_idx"),
+        ]
+
     def attendance_percentage(self):
-        total = self.attendances.count()
-        present = self.attendances.filter(status='Present').count()
-        return round((present / total) * 100, 2) if total else 0
+        try:
+            return self.attendance_stats.percentage()
+        except StudentAttendanceStats.DoesNotExist:
+            return 0
 
     def __str__(self):
         return f"{self.full_name} ({self.register_number})"
@@ -86,9 +120,14 @@ class Attendance(models.Model):
     student = models.ForeignKey(
         Student,
         on_delete=models.CASCADE,
-        related_name="attendances"
+        related_name="attendances",
+        db_index=False  # covered by attendance_student_idx
+    )
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        db_index=False  # covered by attendance_subject_idx
     )
-    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
 
     date = models.DateField(default=datetime.date.today)
 
@@ -103,6 +142,9 @@ class Attendance(models.Model):
     session_id = models.UUIDField(default=uuid.uuid4, editable=False)
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # Last write (mark, delete, restore): the delta sync watermark.
+    # Queryset .update() calls must set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -112,4 +154,186 @@ class Attendance(models.Model):
                 name="unique_attendance_per_period"
             )
         ]
+        indexes = [
+            # by_session / delete_session / restore_session
+            models.Index(fields=["session_id"], name="attendance_session_idx"),
+            # per-student history and counters
+            models.Index(fields=["student", "is_deleted", "status"], name="attendance_student_idx"),
+            # teacher views: subject__teacher + is_deleted, ordered by date/session
+            models.Index(fields=["subject", "is_deleted", "date", "session"], name="attendance_subject_idx"),
+            # deleted_sessions only ever looks at the (small) deleted set
+            models.Index(
+                fields=["subject"],
+                condition=models.Q(is_deleted=True),
+                name="attendance_deleted_idx"
+            ),
+            # delta sync: changes past a watermark, in watermark order (picked
+            # by planners with statistics when the delta is small)
+            models.Index(fields=["updated_at", "id"], name="attendance_sync_idx"),
+        ]
         ordering = ["-date", "session", "student"]
+
+
+# -----------------------------
+# ATTENDANCE COUNTERS
+# -----------------------------
+class StudentAttendanceStats(models.Model):
+    """
+    Running totals of a student's live (non-deleted) attendance, kept in
+    step with every write in ``students.services`` so serializers do not
+    have to COUNT the full history per row.
+    """
+    student = models.OneToOneField(
+        Student,
+        on_delete=models.CASCADE,
+        related_name="attendance_stats",
+        primary_key=True
+    )
+    total = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+
+    def percentage(self):
+        return round((self.present / self.total) * 100, 2) if self.total else 0
+
+    def __str__(self):
+        return f"{self.student_id}: {self.present}/{self.total}"
+
+
+class SubjectAttendanceStats(models.Model):
+    """Same as ``StudentAttendanceStats`` but per student and subject."""
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        related_name="subject_attendance_stats"
+    )
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    total = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject"],
+                name="unique_attendance_stats_per_subject"
+            )
+        ]
+
+    def percentage(self):
+        return round((self.present / self.total) * 100, 2) if self.total else 0
+
+    def __str__(self):
+        return f"{self.student_id}/{self.subject_id}: {self.present}/{self.total}"
+
+
+# -----------------------------
+# ATTENDANCE ROLLUP
+# -----------------------------
+class AttendanceRollup(models.Model):
+    """
+    Live (non-deleted) attendance counts per marked period, maintained by
+    ``students.services`` on every write so the teacher summary does not
+    have to GROUP BY the raw attendance table.
+    """
+    session_id = models.UUIDField()
+    date = models.DateField()
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="rollups")
+    session = models.PositiveIntegerField()
+    semester = models.CharField(max_length=10)
+    section = models.CharField(max_length=5)
+    total = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session_id", "date", "subject", "session", "semester", "section"],
+                name="unique_attendance_rollup"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["subject", "date", "session"], name="rollup_subject_date_idx"),
+        ]
+        ordering = ["-date", "-session", "-id"]
+
+    def __str__(self):
+        return f"{self.subject_id} {self.date} P{self.session}: {self.present}/{self.total}"
+
+
+# -----------------------------
+# BACKGROUND JOBS
+# -----------------------------
+class Job(models.Model):
+    """
+    A unit of background work (imports, exports) queued in the database
+    and executed by ``manage.py run_jobs``. See ``students.jobs``.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    )
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_queue_idx"),
+        ]
+        ordering = ["-created_at", "-id"]
+
+    def set_progress(self, progress, total=None):
+        """Record progress without touching the rest of the row."""
+        self.progress = progress
+        fields = {"progress": progress}
+        if total is not None:
+            self.total = fields["total"] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+# -----------------------------
+# IDEMPOTENCY KEYS
+# -----------------------------
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied ``Idempotency-Key`` and the response its first
+    request produced, so retries are answered without redoing the write.
+    ``response`` is null while that first request is still running.
+    See ``students.idempotency``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotency_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'in progress'})"
@@ -0,0 +1,196 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination over the full ordering tuple.
+
+    The ordering is ``ordering`` / ``view.pagination_ordering`` when set
+    (which must end in a unique key), otherwise the queryset's own
+    ``order_by`` or the model's ``Meta.ordering`` closed with the primary
+    key so every row has a unique position.
+    The cursor is an opaque encoding of the last row's ordering values, so
+    the next page is a plain indexed range scan no matter how deep it is.
+
+    Works with model instances and ``.values()`` rows alike, as long as the
+    ordering keys are present in the values. ``apaginate_queryset`` is the
+    async ORM variant for async views (plain Django requests).
+    """
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    ordering = None
+
+    invalid_cursor_message = "Invalid cursor"
+
+    @staticmethod
+    def _params(request):
+        return getattr(request, "query_params", request.GET)
+
+    def get_page_size(self, request):
+        try:
+            size = int(self._params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        explicit = self.ordering or getattr(view, "pagination_ordering", None)
+        if explicit:
+            # Trusted to end in a unique key (grouped .values() rows have no pk)
+            return list(explicit)
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ()
+        ordering = [key for key in ordering if isinstance(key, str)]
+        pk = queryset.model._meta.pk.name
+        if not any(key.lstrip("-") in (pk, "pk") for key in ordering):
+            ordering.append(f"-{pk}" if ordering and ordering[0].startswith("-") else pk)
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = self._params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, values):
+        data = json.dumps(values, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+    def _after(self, ordering, values):
+        # (a, b, c) > (x, y, z)  ==  a > x  OR  (a = x AND b > y)  OR  ...
+        condition = Q()
+        equal = {}
+        for key, value in zip(ordering, values):
+            name = key.lstrip("-")
+            lookup = "lt" if key.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    @staticmethod
+    def _field(model, name):
+        """The model field an ordering key names (across relations), or None for annotations."""
+        field = None
+        for part in name.split("__"):
+            if model is None:
+                return None
+            try:
+                field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model
+        return field
+
+    def clean_cursor(self, cursor, ordering, model):
+        """
+        A decoded cursor's values converted to their fields' types. A cursor
+        that decodes but holds values of the wrong shape is as invalid as
+        one that does not decode.
+        """
+        if not isinstance(cursor, list) or len(cursor) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for key, value in zip(ordering, cursor):
+            field = self._field(model, key.lstrip("-"))
+            try:
+                if field is not None:
+                    value = field.to_python(value)
+                elif not isinstance(value, (str, int, float)):
+                    raise ValueError(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def _position(self, row, ordering, model):
+        values = []
+        for key in ordering:
+            name = key.lstrip("-")
+            if isinstance(row, dict):
+                values.append(row[name])
+                continue
+            if name == "pk":
+                values.append(row.pk)
+                continue
+            values.append(getattr(row, model._meta.get_field(name).attname))
+        return values
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering_value = self.get_ordering(queryset, view)
+        queryset = queryset.order_by(*self.ordering_value)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            cursor = self.clean_cursor(cursor, self.ordering_value, queryset.model)
+            queryset = queryset.filter(self._after(self.ordering_value, cursor))
+        return queryset[:self.page_size_value + 1]
+
+    def _page(self, rows, model):
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = (
+            self.encode_cursor(self._position(rows[-1], self.ordering_value, model))
+            if self.has_next else None
+        )
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        return self._page(list(queryset), queryset.model)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        return self._page([row async for row in queryset], queryset.model)
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class SummaryPagination(KeysetPagination):
+    """Per-period summaries, newest period first."""
+    ordering = ("-date", "-session", "-id")
+    page_size = 50
+    max_page_size = 500
+
+
+class DeletedSessionPagination(KeysetPagination):
+    """Grouped deleted sessions; session_id makes the position unique."""
+    ordering = ("-date", "-session", "session_id")
+    page_size = 50
+    max_page_size = 500
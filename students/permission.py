@@ -1,17 +1,19 @@
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+
+from .roles import get_role
 
 class IsTeacher(BasePermission):
-    """Allow access only to teachers (users in 'Teachers' group)."""
+    """Allow access only to teachers."""
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="Teachers").exists()
+        return get_role(request).is_teacher
 
 
 class IsStudent(BasePermission):
-    """Allow access only to students (users in 'Students' group)."""
+    """Allow access only to students."""
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="Students").exists()
+        return get_role(request).is_student
 class IsTeacherOrReadOnly(BasePermission):
     def has_permission(self, request, view):
-        if request.method in ['GET', 'HEAD', 'OPTIONS']:
+        if request.method in SAFE_METHODS:
             return True
-        return request.user.is_authenticated and request.user.role == 'teacher'
\ No newline at end of file
+        return get_role(request).is_teacher
\ No newline at end of file
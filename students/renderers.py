@@ -0,0 +1,91 @@
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+def to_columnar(data):
+    """
+    ``[{"a": 1, "b": 2}, ...]`` -> ``{"columns": ["a", "b"], "rows": [[1, 2], ...]}``.
+
+    Paginated bodies keep their other keys (``next``) with the columns and
+    rows lifted next to them. Bodies that are already columnar, and
+    anything that is not a list of rows (errors, details), pass through.
+    """
+    if isinstance(data, list):
+        columns = list(data[0]) if data else []
+        return {"columns": columns, "rows": [[row[name] for name in columns] for row in data]}
+    if isinstance(data, dict) and isinstance(data.get("results"), (list, dict)):
+        results = data["results"]
+        body = {key: value for key, value in data.items() if key != "results"}
+        body.update(results if isinstance(results, dict) else to_columnar(results))
+        return body
+    return data
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Compact JSON for large row sets: column names once, then one array per
+    row. Selected with ``Accept: application/vnd.attendx.columnar+json`` or
+    ``?format=columnar``.
+    """
+    media_type = "application/vnd.attendx.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    ``text/csv`` for report endpoints, selected with ``?format=csv``.
+
+    Large reports are streamed by the view itself (``students.exports``);
+    this renders the rest, e.g. validation errors, as ``field,message``
+    lines.
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        body = to_columnar(data)
+        if isinstance(body, dict) and "rows" in body:
+            lines = [body["columns"], *body["rows"]]
+        elif isinstance(body, dict):
+            lines = [[key, value] for key, value in body.items()]
+        else:
+            lines = [[body]]
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lines)
+        return buffer.getvalue().encode(self.charset)
+
+
+class XLSXRenderer(BaseRenderer):
+    """
+    Excel workbooks for report endpoints, selected with ``?format=xlsx``.
+    Report views build their workbooks themselves (``exports.xlsx_response``,
+    or a job for registers); this covers error bodies.
+    """
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    format = "xlsx"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        from .exports import write_xlsx
+
+        if data is None:
+            return b""
+        body = to_columnar(data)
+        if isinstance(body, dict) and "rows" in body:
+            header, rows = body["columns"], body["rows"]
+        elif isinstance(body, dict):
+            header, rows = ["field", "message"], [[key, str(value)] for key, value in body.items()]
+        else:
+            header, rows = ["message"], [[str(body)]]
+        buffer = io.BytesIO()
+        write_xlsx(header, rows, buffer)
+        return buffer.getvalue()
@@ -0,0 +1,56 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+logger = logging.getLogger(__name__)
+
+BASE_DELAY = 0.05
+MAX_DELAY = 1.0
+
+# PostgreSQL serialization failure / deadlock detected
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+
+def is_lock_error(exc):
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc).lower()
+    if "database is locked" in message or "database is busy" in message:
+        return True
+    return getattr(exc.__cause__, "sqlstate", None) in RETRYABLE_SQLSTATES
+
+
+def retry_on_lock(func):
+    """
+    Re-run ``func`` when its transaction loses a write-lock race, up to
+    ``settings.ATTENDANCE_WRITE_RETRIES`` extra attempts with full jitter
+    (a random sleep below an exponentially growing cap), so a burst of
+    writers spreads out instead of retrying in lock-step.
+
+    Only wraps whole transactions: inside an outer atomic block the
+    failure is re-raised, since that transaction is already broken.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = getattr(settings, "ATTENDANCE_WRITE_RETRIES", 5)
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (
+                    attempt >= retries
+                    or not is_lock_error(exc)
+                    or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                ):
+                    raise
+                attempt += 1
+                delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+                logger.warning("%s hit a locked database, retry %d in %.0f ms", func.__qualname__, attempt, delay * 1000)
+                time.sleep(delay)
+    return wrapper
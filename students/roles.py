@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+
+
+TEACHER = "teacher"
+STUDENT = "student"
+
+
+class Role(namedtuple("Role", ["kind", "teacher_id", "student_id"])):
+    """Who the caller is, resolved once per request (see ``get_role``)."""
+
+    @property
+    def is_teacher(self):
+        return self.kind == TEACHER
+
+    @property
+    def is_student(self):
+        return self.kind == STUDENT
+
+
+ANONYMOUS = Role(None, None, None)
+
+
+def _role_lookup(user_id):
+    return User.objects.filter(pk=user_id).values_list("teacher__id", "student__id")
+
+
+def _role_from_row(row):
+    teacher_id, student_id = row or (None, None)
+    kind = TEACHER if teacher_id else STUDENT if student_id else None
+    return Role(kind, teacher_id, student_id)
+
+
+def role_for_user(user):
+    """Resolve a user's role with a single query (both reverse one-to-ones)."""
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+    return _role_from_row(_role_lookup(user.pk).first())
+
+
+async def arole_for_user(user):
+    """``role_for_user`` for async views."""
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+    return _role_from_row(await _role_lookup(user.pk).afirst())
+
+
+def role_claims(user_id):
+    """
+    JWT claims added to each access token as it is issued
+    (``serializer.RoleRefreshToken``), at login and on every refresh.
+    """
+    role = _role_from_row(_role_lookup(user_id).first())
+    return {"role": role.kind, "teacher_id": role.teacher_id, "student_id": role.student_id}
+
+
+def _role_from_token(token):
+    if token is None or not hasattr(token, "get") or "role" not in token:
+        return None
+    return Role(token.get("role"), token.get("teacher_id"), token.get("student_id"))
+
+
+def resolve_role(request):
+    """
+    Role of the authenticated caller: from the access token claims when
+    present, otherwise one DB lookup.
+    """
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+    return _role_from_token(getattr(request, "auth", None)) or role_for_user(user)
+
+
+def get_role(request):
+    """
+    Cached role for ``request`` (a DRF or Django request).
+
+    ``RoleMiddleware`` attaches a lazy ``request.role``; without it the
+    role is resolved here and cached on the underlying HttpRequest.
+    """
+    http_request = getattr(request, "_request", request)
+    role = http_request.__dict__.get("role")
+    if role is None:
+        role = http_request.role = resolve_role(request)
+    return role
@@ -0,0 +1,84 @@
+import functools
+from asgiref.sync import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def use_replica():
+    """Send reads inside the block to the replica (when one is configured)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Undo ``use_replica()`` for reads inside the block."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """
+    Mark a read-only view as safe to serve from the replica.
+
+    Only for summary/dashboard reads that tolerate replication lag: a
+    teacher who just marked attendance may not see it here for a moment.
+    Works for async views too (the async ORM carries the context along).
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with use_replica():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def _target(alias):
+    config = connections[alias].settings_dict
+    return tuple(config.get(key) for key in ("ENGINE", "NAME", "HOST", "PORT"))
+
+
+def _mirrors_primary(alias):
+    # The replica points at the primary's database (the test runner makes
+    # it a TEST MIRROR): read through the primary's connection instead, so
+    # reads see the same transaction.
+    return _target(alias) == _target(DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    """
+    Reads go to ``settings.REPLICA_DATABASE`` inside ``use_replica()``,
+    everything else (all writes, and reads elsewhere) to the default alias.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(settings, "REPLICA_DATABASE", None)
+        if alias and _replica_reads.get() and not _mirrors_primary(alias):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary and replica hold the same data
+        return True
@@ -1,21 +1,165 @@
+import datetime
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Student, Attendance, Teacher, Subject
+from .models import Student, Attendance, Teacher, Subject, Job, SECTION_CHOICES
+from .services import set_subject_sections
+from .thumbnails import DEFAULT_FORMAT, thumbnail_url
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.password_validation import validate_password
+from .roles import role_claims
+from django.utils.crypto import constant_time_compare
+
+
+# -----------------------------
+# Eager loading
+# -----------------------------
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the relations it reads, so views can fetch
+    them up front instead of one query per row::
+
+        class Meta:
+            select_related = ["teacher__user"]
+            prefetch_related = [...]
+
+    Nested serializer fields are folded in automatically: to-one nesting
+    is joined under its source, to-many nesting becomes a ``Prefetch``
+    whose queryset is eager-loaded by the nested serializer itself.
+    """
+
+    @classmethod
+    def eager_relations(cls):
+        meta = getattr(cls, "Meta", None)
+        select = list(getattr(meta, "select_related", ()))
+        prefetch = list(getattr(meta, "prefetch_related", ()))
+
+        for field in cls().fields.values():
+            many = isinstance(field, serializers.ListSerializer)
+            child = field.child if many else field
+            if not isinstance(child, serializers.BaseSerializer) or field.source == "*":
+                continue
+            source = field.source.replace(".", "__")
+            if many:
+                queryset = child.Meta.model.objects.all()
+                if isinstance(child, EagerLoadingMixin):
+                    queryset = type(child).setup_eager_loading(queryset)
+                prefetch.append(Prefetch(source, queryset=queryset))
+                continue
+
+            select.append(source)
+            if isinstance(child, EagerLoadingMixin):
+                child_select, child_prefetch = type(child).eager_relations()
+                select += [f"{source}__{name}" for name in child_select]
+                prefetch += [
+                    Prefetch(f"{source}__{lookup.prefetch_through}", queryset=lookup.queryset)
+                    if isinstance(lookup, Prefetch) else f"{source}__{lookup}"
+                    for lookup in child_prefetch
+                ]
+        return select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        select, prefetch = cls.eager_relations()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+# -----------------------------
+# Values (fast read) serializer
+# -----------------------------
+class ValuesSerializer:
+    """
+    Read-only fast path for a ModelSerializer: rows come straight from
+    ``queryset.values()`` and are turned into the same field names and
+    representations the serializer would produce, without building model
+    instances or walking attribute chains per row.
+
+    Each field's ``source`` becomes a ``values()`` lookup
+    (``student.full_name`` -> ``student__full_name``); only dates, datetimes
+    and UUIDs need converting.
+    """
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        self.lookups = []
+        self.converters = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.columns.append(name)
+            self.lookups.append("__".join(field.source_attrs))
+            self.converters.append(self._converter(field))
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.DateTimeField):
+            return field.to_representation
+        if isinstance(field, serializers.DateField):
+            return datetime.date.isoformat
+        if isinstance(field, serializers.UUIDField):
+            return str
+        return None
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def row(self, values):
+        row = []
+        for lookup, convert in zip(self.lookups, self.converters):
+            value = values[lookup]
+            row.append(convert(value) if convert and value is not None else value)
+        return row
+
+    def to_representation(self, rows, columnar=False):
+        """``rows`` are dicts from :meth:`values`."""
+        if columnar:
+            return {"columns": self.columns, "rows": [self.row(values) for values in rows]}
+        return [dict(zip(self.columns, self.row(values))) for values in rows]
 
 
 # -----------------------------
 # Subject Serializer
 # -----------------------------
-class SubjectSerializer(serializers.ModelSerializer):
+class SectionListField(serializers.ListField):
+    """``Subject.subject_sections`` as a plain list of section names."""
+    child = serializers.ChoiceField(choices=SECTION_CHOICES)
+
+    def to_representation(self, data):
+        # .all() so a prefetched set is reused
+        return sorted(item.section for item in data.all())
+
+
+class SubjectSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     teacher_name = serializers.SerializerMethodField()
+    sections = SectionListField(source="subject_sections", required=False)
 
 
 
     class Meta:
         model = Subject
         fields = ['id', 'name', 'code', 'teacher', 'teacher_name', 'department', 'semester','sections']
+        select_related = ['teacher__user']
+        prefetch_related = ['subject_sections']
+
+    def create(self, validated_data):
+        sections = validated_data.pop("subject_sections", [])
+        subject = super().create(validated_data)
+        set_subject_sections(subject, sections)
+        return subject
+
+    def update(self, instance, validated_data):
+        sections = validated_data.pop("subject_sections", None)
+        subject = super().update(instance, validated_data)
+        if sections is not None:
+            set_subject_sections(subject, sections)
+        return subject
+
     def get_teacher_name(self, obj):
         if obj.teacher:
             full_name = obj.teacher.user.get_full_name()
@@ -26,23 +170,55 @@ class SubjectSerializer(serializers.ModelSerializer):
 # -----------------------------
 # Custom JWT Token Serializer
 # -----------------------------
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token that looks the role up again for every access token it
+    issues, so a refresh picks up a Teacher/Student row added or removed
+    since login. The refresh token itself carries no role.
+    """
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        for claim, value in role_claims(self[jwt_settings.USER_ID_CLAIM]).items():
+            access[claim] = value
+        return access
+
+
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
-    @classmethod
-    def get_token(cls, user):
+    token_class = RoleRefreshToken
+    # Set by validate before the token is built; None reads the stored flag
+    must_change = None
+
+    def get_token(self, user):
         token = super().get_token(user)
         token['is_staff'] = user.is_staff
         token['username'] = user.username
-        token['must_change_password'] = not user.has_usable_password()
+        must_change = self.must_change
+        if must_change is None:
+            must_change = Student.objects.filter(user=user, must_change_password=True).exists()
+        token['must_change_password'] = must_change
         return token
 
     def validate(self, attrs):
+        # 🔥 FORCE CHANGE IF PASSWORD == USERNAME
+        # Compared directly instead of hashing the username a second time;
+        # super().validate authenticates and then calls get_token.
+        self.must_change = constant_time_compare(attrs["password"], attrs[self.username_field])
         data = super().validate(attrs)
 
+        # Keep the stored flag in step
+        Student.objects.filter(user=self.user).exclude(
+            must_change_password=self.must_change
+        ).update(must_change_password=self.must_change)
+
         data["is_staff"] = self.user.is_staff
         data["username"] = self.user.username
-
-        # 🔥 FORCE CHANGE IF PASSWORD == USERNAME
-        data["must_change_password"] =( self.user.check_password(self.user.username))
+        data["must_change_password"] = self.must_change
 
         return data
 # -----------------------------
@@ -69,7 +245,7 @@ class UserSerializer(serializers.ModelSerializer):
 # -----------------------------
 # Student Serializer
 # -----------------------------
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     attendance_percentage = serializers.SerializerMethodField()
     img_url = serializers.SerializerMethodField()
     subjects = SubjectSerializer(many=True, read_only=True)
@@ -81,32 +257,39 @@ class StudentSerializer(serializers.ModelSerializer):
             "year", "section", "course", "img_url",
             "attendance_percentage", "subjects"
         ]
+        select_related = ["attendance_stats"]
 
     def get_attendance_percentage(self, obj):
-        total = obj.attendances.count()
-        if total == 0:
-            return "0%"
-        present = obj.attendances.filter(status="Present").count()
-        return f"{(present / total) * 100:.2f}%"
+        # Read from the maintained counters instead of counting attendances
+        percentage = obj.attendance_percentage()
+        return f"{percentage:.2f}%" if percentage else "0%"
 
     def get_img_url(self, obj):
+        """
+        ``?img_size=sm|md|lg`` (or the view's ``img_size`` context) picks a
+        thumbnail, ``?img_format=webp|jpeg`` its format; ``original`` or a
+        photo without thumbnails yet falls back to the uploaded file.
+        """
         request = self.context.get("request")
-        if obj.img and request:
-            return request.build_absolute_uri(obj.img.url)
-        return None
+        if not obj.img or not request:
+            return None
+        params = getattr(request, "query_params", request.GET)
+        size = params.get("img_size", self.context.get("img_size", "original"))
+        url = thumbnail_url(obj, size, params.get("img_format", DEFAULT_FORMAT))
+        return request.build_absolute_uri(url or obj.img.url)
 
 
 # -----------------------------
 # Teacher Serializer
 # -----------------------------
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     subjects = SubjectSerializer(many=True, read_only=True)
 
     class Meta:
         model = Teacher
         fields = ["id", "user", "department", "subjects"]
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     recorded_by = serializers.ReadOnlyField(source="recorded_by.username")
     student_name = serializers.CharField(source='student.full_name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
@@ -135,6 +318,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
             "timestamp",
         ]
         read_only_fields = ["session_id", "recorded_by", "timestamp"]
+        select_related = ["student", "subject", "recorded_by"]
 
     # 🔥 THIS IS THE FIX
     def validate(self, attrs):
@@ -158,3 +342,39 @@ class AttendanceSerializer(serializers.ModelSerializer):
             )
 
         return attrs
+
+
+AttendanceValuesSerializer = ValuesSerializer(AttendanceSerializer)
+
+
+# -----------------------------
+# Bulk Attendance Serializer
+# -----------------------------
+class AttendanceBulkSerializer(serializers.Serializer):
+    """
+    Lightweight per-row validation for list submissions.
+
+    Unlike ``AttendanceSerializer`` it resolves no foreign keys and runs no
+    duplicate check per row; ``services.bulk_mark_attendance`` does both
+    once for the whole batch.
+    """
+    student = serializers.IntegerField()
+    subject = serializers.IntegerField()
+    date = serializers.DateField(default=datetime.date.today)
+    session = serializers.IntegerField(min_value=1, default=1)
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES)
+    semester = serializers.CharField(max_length=10)
+    section = serializers.CharField(max_length=5)
+
+
+# -----------------------------
+# Job Serializer
+# -----------------------------
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "progress", "total", "result", "error",
+            "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
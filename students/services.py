@@ -0,0 +1,718 @@
+import base64
+import datetime
+import hashlib
+import json
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Round, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .cache import SUBJECTS, bump_on_commit, cached_snapshot, roster_scope, student_scope
+from .models import (
+    Attendance,
+    AttendanceRollup,
+    Student,
+    Subject,
+    StudentAttendanceStats,
+    SubjectAttendanceStats,
+    SubjectSection,
+)
+from .importer import chunked
+from .thumbnails import thumbnail_url
+
+
+CONFLICT_MESSAGE = "Attendance already marked for this subject, date and period."
+
+# Fields every write path needs from the rows it touches to keep the
+# derived tables (counters, rollups) in step.
+ROLLUP_KEY = ("session_id", "date", "subject_id", "session", "semester", "section")
+DELTA_FIELDS = ("student_id", "status") + ROLLUP_KEY
+
+
+# -----------------------------
+# DERIVED COUNTERS
+# -----------------------------
+def _delta_row(record):
+    if isinstance(record, dict):
+        return record
+    return {field: getattr(record, field) for field in DELTA_FIELDS}
+
+
+def _grouped_updates(model, totals, key_fields):
+    """
+    Apply ``totals`` ({key: [total, present]}) to ``model`` with one UPDATE
+    per distinct (delta, scope) instead of one per key.
+    """
+    groups = defaultdict(list)
+    for key, (total, present) in totals.items():
+        if total or present:
+            scope = key[1:]
+            groups[(total, present, scope)].append(key[0])
+
+    for (total, present, scope), student_ids in groups.items():
+        filters = dict(zip(key_fields[1:], scope))
+        model.objects.filter(student_id__in=student_ids, **filters).update(
+            total=F("total") + total,
+            present=F("present") + present,
+        )
+
+
+def apply_attendance_deltas(records, sign=1, replaced=()):
+    """
+    Add (``sign=1``) or remove (``sign=-1``) ``records`` from the
+    per-student and per-student+subject counters and the period rollup.
+    ``replaced`` are the stored values of edited records; they are taken
+    out in the same pass, so an edit costs no more queries than a mark.
+
+    ``records`` are ``Attendance`` instances or dicts with ``DELTA_FIELDS``.
+    Must run inside the transaction that changed the records.
+    """
+    per_student = defaultdict(lambda: [0, 0])
+    per_subject = defaultdict(lambda: [0, 0])
+    per_period = defaultdict(lambda: [0, 0, 0])
+    weighted = [(record, sign) for record in records] + [(record, -sign) for record in replaced]
+    for record, weight in weighted:
+        row = _delta_row(record)
+        present = weight if row["status"] == "Present" else 0
+        period = tuple(row[field] for field in ROLLUP_KEY)
+        for bucket in (
+            per_student[(row["student_id"],)],
+            per_subject[(row["student_id"], row["subject_id"])],
+            per_period[period],
+        ):
+            bucket[0] += weight
+            bucket[1] += present
+        # Counted like rebuild_attendance_stats does, not as total - present
+        per_period[period][2] += weight if row["status"] == "Absent" else 0
+
+    if not per_student:
+        return
+
+    StudentAttendanceStats.objects.bulk_create(
+        [StudentAttendanceStats(student_id=key[0]) for key in per_student],
+        ignore_conflicts=True,
+    )
+    SubjectAttendanceStats.objects.bulk_create(
+        [SubjectAttendanceStats(student_id=key[0], subject_id=key[1]) for key in per_subject],
+        ignore_conflicts=True,
+    )
+    _grouped_updates(StudentAttendanceStats, per_student, ("student_id",))
+    _grouped_updates(SubjectAttendanceStats, per_subject, ("student_id", "subject_id"))
+    _apply_rollup_deltas(per_period)
+    # Profiles and summaries cached on these students' counters
+    bump_on_commit(*(student_scope(key[0]) for key in per_student))
+
+
+def _apply_rollup_deltas(per_period):
+    AttendanceRollup.objects.bulk_create(
+        [AttendanceRollup(**dict(zip(ROLLUP_KEY, key))) for key in per_period],
+        ignore_conflicts=True,
+    )
+    for key, (total, present, absent) in per_period.items():
+        if total or present or absent:
+            AttendanceRollup.objects.filter(**dict(zip(ROLLUP_KEY, key))).update(
+                total=F("total") + total,
+                present=F("present") + present,
+                absent=F("absent") + absent,
+            )
+
+
+# -----------------------------
+# BULK ATTENDANCE MARKING
+# -----------------------------
+def _period_key(row):
+    return (row["student"], row["subject"], row["date"], row["session"])
+
+
+def _periods_condition(rows):
+    """One ``Q`` matching the (student, subject, date, session) keys of ``rows``, or None."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["subject"], row["date"], row["session"]), set()).add(row["student"])
+
+    if not groups:
+        return None
+
+    condition = Q()
+    for (subject_id, date, session), student_ids in groups.items():
+        condition |= Q(subject_id=subject_id, date=date, session=session, student_id__in=student_ids)
+    return condition
+
+
+def find_conflicts(rows):
+    """
+    Return the set of (student, subject, date, session) keys from ``rows``
+    that already have a live attendance record, using one query for the
+    whole batch instead of one ``exists()`` per row.
+    """
+    condition = _periods_condition(rows)
+    if condition is None:
+        return set()
+
+    existing = (
+        Attendance.objects
+        .filter(condition, is_deleted=False)
+        .order_by()
+        .values_list("student_id", "subject_id", "date", "session")
+    )
+    return set(existing)
+
+
+def bulk_mark_attendance(rows, recorded_by, session_id, session, semester, section, teacher_id=None):
+    """
+    Insert a batch of attendance rows with a single duplicate check and a
+    single ``bulk_create``.
+
+    ``rows`` are validated dicts with ``student``/``subject`` ids, ``date``
+    and ``status``. Rows that clash with ``unique_attendance_per_period``
+    (either in the database or earlier in the same batch) are skipped and
+    reported back instead of failing the whole batch. With ``teacher_id``,
+    rows for another teacher's subject are reported as invalid too.
+
+    Returns ``(created_records, conflicts)``.
+    """
+    rows = [dict(row, session=session) for row in rows]
+    conflicts = []
+
+    student_ids = {row["student"] for row in rows}
+    subject_ids = {row["subject"] for row in rows}
+    known_students = set(Student.objects.filter(id__in=student_ids).values_list("id", flat=True))
+    subjects = Subject.objects.filter(id__in=subject_ids)
+    if teacher_id is not None:
+        subjects = subjects.filter(teacher_id=teacher_id)
+    known_subjects = set(subjects.values_list("id", flat=True))
+
+    candidates = []
+    for index, row in enumerate(rows):
+        if row["student"] not in known_students:
+            conflicts.append({"index": index, "student": row["student"], "detail": "Invalid student."})
+        elif row["subject"] not in known_subjects:
+            conflicts.append({"index": index, "student": row["student"], "detail": "Invalid subject."})
+        else:
+            candidates.append((index, row))
+
+    with transaction.atomic():
+        taken = find_conflicts([row for _, row in candidates])
+
+        records = []
+        for index, row in candidates:
+            key = _period_key(row)
+            if key in taken:
+                conflicts.append({"index": index, "student": row["student"], "detail": CONFLICT_MESSAGE})
+                continue
+            taken.add(key)
+            records.append(Attendance(
+                student_id=row["student"],
+                subject_id=row["subject"],
+                date=row["date"],
+                session=session,
+                status=row["status"],
+                recorded_by=recorded_by,
+                semester=semester,
+                section=section,
+                session_id=session_id,
+            ))
+
+        if records:
+            Attendance.objects.bulk_create(records)
+            apply_attendance_deltas(records)
+
+    conflicts.sort(key=lambda conflict: conflict["index"])
+    return records, conflicts
+
+
+# -----------------------------
+# SINGLE RECORD WRITES
+# -----------------------------
+def mark_attendance(serializer, **save_kwargs):
+    """Save one validated ``AttendanceSerializer`` and count it."""
+    with transaction.atomic():
+        attendance = serializer.save(**save_kwargs)
+        apply_attendance_deltas([attendance])
+    return attendance
+
+
+def save_attendance(pk, save):
+    """
+    Run ``save`` (which writes and returns one record) and move that
+    record's counts from its stored values to the saved ones. ``pk`` is
+    None for a new record. For edits that bypass ``mark_attendance``:
+    PUT/PATCH and the admin.
+    """
+    with transaction.atomic():
+        previous = None
+        if pk is not None:
+            previous = Attendance.objects.select_for_update().filter(pk=pk).values("is_deleted", *DELTA_FIELDS).first()
+        attendance = save()
+        current = dict(_delta_row(attendance), is_deleted=attendance.is_deleted)
+        if previous == current:
+            # Nothing the counters see has changed
+            return attendance
+        apply_attendance_deltas(
+            [] if attendance.is_deleted else [attendance],
+            replaced=[previous] if previous and not previous["is_deleted"] else [],
+        )
+    return attendance
+
+
+def delete_attendance(queryset):
+    """Hard-delete ``queryset`` (admin only), uncounting its live records first."""
+    with transaction.atomic():
+        rows = list(
+            Attendance.objects.select_for_update()
+            .filter(pk__in=queryset.values("pk"))
+            .order_by()
+            .values("pk", "is_deleted", *DELTA_FIELDS)
+        )
+        apply_attendance_deltas([row for row in rows if not row["is_deleted"]], sign=-1)
+        Attendance.objects.filter(pk__in=[row["pk"] for row in rows]).delete()
+
+
+def soft_delete_attendance(attendance):
+    with transaction.atomic():
+        attendance.is_deleted = True
+        attendance.deleted_at = timezone.now()
+        attendance.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+        apply_attendance_deltas([attendance], sign=-1)
+
+
+# -----------------------------
+# SESSION WRITES
+# -----------------------------
+def soft_delete_session(session_id):
+    """
+    Soft-delete every live record of a session. Returns the number of
+    records deleted (0 when the session does not exist).
+    """
+    with transaction.atomic():
+        qs = Attendance.objects.select_for_update().filter(session_id=session_id, is_deleted=False)
+        rows = list(qs.order_by().values(*DELTA_FIELDS))
+        if rows:
+            now = timezone.now()
+            qs.update(is_deleted=True, deleted_at=now, updated_at=now)
+            apply_attendance_deltas(rows, sign=-1)
+    return len(rows)
+
+
+def restore_attendance_session(session_id):
+    """
+    Undo ``soft_delete_session``. Returns the number of records restored.
+    Raises ``IntegrityError`` if the period has been re-marked meanwhile.
+    """
+    with transaction.atomic():
+        qs = Attendance.objects.select_for_update().filter(session_id=session_id, is_deleted=True)
+        rows = list(qs.order_by().values(*DELTA_FIELDS))
+        if rows:
+            qs.update(is_deleted=False, deleted_at=None, updated_at=timezone.now())
+            apply_attendance_deltas(rows)
+    return len(rows)
+
+
+# -----------------------------
+# DELTA SYNC
+# -----------------------------
+SYNC_FIELDS = (
+    "id", "student", "subject", "date", "session", "status",
+    "semester", "section", "session_id", "is_deleted", "updated_at",
+)
+# Namespace of the session ids given to periods first marked by a sync push
+SYNC_SESSION_NAMESPACE = uuid.UUID("9b7a51d2-6c1e-4b8e-8f0d-4e2a7c93d15f")
+
+
+def encode_watermark(watermark):
+    updated_at, pk = watermark
+    data = json.dumps([updated_at.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode("ascii")
+
+
+def decode_watermark(token):
+    """``(updated_at, id)`` from ``encode_watermark``; ``ValueError`` if ``token`` is not one."""
+    try:
+        updated_at, pk = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        updated_at, pk = datetime.datetime.fromisoformat(updated_at), int(pk)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid watermark")
+    if timezone.is_naive(updated_at):
+        raise ValueError("Invalid watermark")
+    return updated_at, pk
+
+
+def attendance_changes(queryset, watermark=None, limit=500):
+    """
+    The records of ``queryset`` (soft-deleted ones included) written after
+    ``watermark``, oldest first. Returns ``(rows, watermark, has_more)``,
+    the watermark being the last row's ``(updated_at, id)``.
+
+    Records younger than ``settings.ATTENDANCE_SYNC_SAFETY_WINDOW`` seconds
+    are held back for the next call: ``updated_at`` is stamped before the
+    write commits, so a transaction still in flight can commit a record
+    dated *before* one that is already visible. Past the window that order
+    is settled, and the watermark neither skips a record nor repeats one.
+    """
+    settled = timezone.now() - datetime.timedelta(seconds=settings.ATTENDANCE_SYNC_SAFETY_WINDOW)
+    qs = queryset.filter(updated_at__lte=settled)
+    if watermark is not None:
+        updated_at, pk = watermark
+        qs = qs.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+
+    rows = list(qs.order_by("updated_at", "id").values(*SYNC_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        watermark = (rows[-1]["updated_at"], rows[-1]["id"])
+    return rows, watermark, has_more
+
+
+def _sync_period(row):
+    return (row["subject"], row["date"], row["session"], row["semester"], row["section"])
+
+
+def _live_session_ids(periods):
+    """``{period: session_id}`` for the periods that already have live records."""
+    condition = Q()
+    for subject_id, date, session, _, section in periods:
+        condition |= Q(subject_id=subject_id, date=date, session=session, section=section)
+    existing = (
+        Attendance.objects
+        .filter(condition, is_deleted=False)
+        .order_by()
+        .values_list("subject_id", "date", "session", "semester", "section", "session_id")
+        .distinct()
+    )
+    return {tuple(row[:5]): row[5] for row in existing}
+
+
+def sync_mark_attendance(rows, recorded_by, teacher_id, batch_id):
+    """
+    Save a batch of offline markings that may span several periods, in one
+    transaction, through ``bulk_mark_attendance`` once per period.
+
+    A period that already has live records is joined to their session, so
+    it stays one session however its rows arrived; a new one gets a
+    session id derived from ``batch_id``, so a retried push names the same
+    sessions. Rows for a student and period the server already has keep
+    the server's record (first write wins) and come back as conflicts.
+
+    Returns ``(created_records, conflicts, server_rows)``, ``server_rows``
+    being the live record (``SYNC_FIELDS``) of every submitted row that has
+    one, for the client to reconcile with.
+    """
+    subject_ids = {row["subject"] for row in rows}
+    own_subjects = set(
+        Subject.objects.filter(id__in=subject_ids, teacher_id=teacher_id).values_list("id", flat=True)
+    )
+
+    conflicts = []
+    periods = {}
+    for index, row in enumerate(rows):
+        if row["subject"] not in own_subjects:
+            conflicts.append({"index": index, "student": row["student"], "detail": "Invalid subject."})
+        else:
+            periods.setdefault(_sync_period(row), []).append(index)
+
+    created = []
+    with transaction.atomic():
+        session_ids = _live_session_ids(periods) if periods else {}
+        for period, indexes in periods.items():
+            _, date, session, semester, section = period
+            session_id = session_ids.get(period) or uuid.uuid5(
+                SYNC_SESSION_NAMESPACE, "|".join(map(str, (batch_id, *period)))
+            )
+            records, period_conflicts = bulk_mark_attendance(
+                [rows[index] for index in indexes],
+                recorded_by=recorded_by,
+                session_id=session_id,
+                session=session,
+                semester=semester,
+                section=section,
+            )
+            created.extend(records)
+            for conflict in period_conflicts:
+                conflicts.append(dict(conflict, index=indexes[conflict["index"]]))
+
+    condition = _periods_condition([rows[index] for indexes in periods.values() for index in indexes])
+    server_rows = []
+    if condition is not None:
+        server_rows = list(
+            Attendance.objects.filter(condition, is_deleted=False).order_by("id").values(*SYNC_FIELDS)
+        )
+
+    conflicts.sort(key=lambda conflict: conflict["index"])
+    return created, conflicts, server_rows
+
+
+# -----------------------------
+# SUMMARIES
+# -----------------------------
+def teacher_summary_rows(teacher_id):
+    """Per-period totals for a teacher's subjects, straight from the rollup."""
+    return AttendanceRollup.objects.filter(subject__teacher_id=teacher_id, total__gt=0).values(
+        "id",
+        "session_id",
+        "date",
+        "subject__name",
+        "session",
+        "total",
+        "present",
+        "absent",
+        student__semester=F("semester"),
+        student__section=F("section"),
+    )
+
+
+# -----------------------------
+# ANALYTICS
+# -----------------------------
+# Grouping -> the values() keys of each row, in output order
+ANALYTICS_GROUPS = {
+    "subject": ("subject_id", "subject__name"),
+    "section": ("semester", "section"),
+    "week": ("period",),
+    "month": ("period",),
+    "student": ("student_id", "student__register_number", "student__full_name", "semester", "section"),
+}
+ANALYTICS_COLUMNS = ("total_classes", "present_count", "rate")
+DEFAULTER_KEYS = ANALYTICS_GROUPS["student"] + ("subject_id", "subject__name")
+BUCKETS = {"week": TruncWeek, "month": TruncMonth}
+
+
+def _with_rate(rows):
+    return rows.annotate(
+        rate=Round(Cast("present_count", FloatField()) * 100 / F("total_classes"), 2)
+    )
+
+
+def _student_totals(teacher_id, keys, date_range):
+    """
+    Per-student aggregates: from the maintained counters, or from the raw
+    (indexed) rows when a date window rules the counters out.
+    """
+    if date_range:
+        rows = date_range(Attendance.objects.filter(subject__teacher_id=teacher_id, is_deleted=False))
+        counts = {"total_classes": Count("id"), "present_count": Count("id", filter=Q(status="Present"))}
+    else:
+        rows = SubjectAttendanceStats.objects.filter(subject__teacher_id=teacher_id, total__gt=0).annotate(
+            semester=F("student__semester"), section=F("student__section"),
+        )
+        counts = {"total_classes": Sum("total"), "present_count": Sum("present")}
+    return rows.values(*keys).annotate(**counts)
+
+
+def attendance_analytics(teacher_id, by, date_range=None, **filters):
+    """
+    Attendance rates of a teacher's classes grouped ``by`` one of
+    ``ANALYTICS_GROUPS``, as a single aggregate query.
+
+    Subject, section and calendar buckets are summed from the period
+    rollup; per-student rates come from ``_student_totals``. ``filters``
+    narrow by ``subject_id``, ``semester`` and ``section``;
+    ``date_range(queryset)`` applies a date window.
+    """
+    keys = ANALYTICS_GROUPS[by]
+    if by == "student":
+        rows = _student_totals(teacher_id, keys, date_range)
+    else:
+        rows = AttendanceRollup.objects.filter(subject__teacher_id=teacher_id, total__gt=0)
+        if date_range:
+            rows = date_range(rows)
+        if by in BUCKETS:
+            rows = rows.annotate(period=BUCKETS[by]("date"))
+        rows = rows.values(*keys).annotate(total_classes=Sum("total"), present_count=Sum("present"))
+    return _with_rate(rows.filter(**filters)).order_by(*keys)
+
+
+def defaulters(teacher_id, threshold, date_range=None, **filters):
+    """
+    Students whose attendance in one of the teacher's subjects is below
+    ``threshold`` percent, lowest rate first.
+    """
+    rows = _student_totals(teacher_id, DEFAULTER_KEYS, date_range).filter(**filters)
+    # present / total < threshold / 100, without dividing in SQL
+    rows = rows.filter(present_count__lt=F("total_classes") * (threshold / 100))
+    return _with_rate(rows).order_by("rate", "subject__name", "student__register_number")
+
+
+# -----------------------------
+# ATTENDANCE REGISTER
+# -----------------------------
+REGISTER_CHUNK_SIZE = 2000
+REGISTER_MARKS = {"Present": "P", "Absent": "A"}
+
+
+def register_periods(subject, section, date_range=None):
+    """The marked (date, session) columns of a subject+section register, in order."""
+    rollups = AttendanceRollup.objects.filter(subject=subject, section=section, total__gt=0)
+    if date_range:
+        rollups = date_range(rollups)
+    return list(rollups.order_by("date", "session").values_list("date", "session").distinct())
+
+
+def register_header(periods):
+    return [
+        "register_number", "full_name",
+        *(f"{date.isoformat()} P{session}" for date, session in periods),
+        "present", "total",
+    ]
+
+
+def register_rows(subject, section, periods, date_range=None, chunk_size=REGISTER_CHUNK_SIZE):
+    """
+    Yield one register line per student:
+    ``[register_number, full_name, <mark per period>..., present, total]``.
+
+    The roster and the marks are two iterators sorted the same way and
+    merged as they stream, so only one student's line is ever in memory.
+    Students who left the section but have marks in it are kept.
+    """
+    marks = Attendance.objects.filter(subject=subject, section=section, is_deleted=False)
+    if date_range:
+        marks = date_range(marks)
+    students = (
+        Student.objects
+        .filter(
+            Q(department=subject.teacher.department, semester=subject.semester, section=section)
+            | Q(id__in=marks.values("student_id"))
+        )
+        .order_by("register_number", "id")
+        .values_list("id", "register_number", "full_name")
+        .iterator(chunk_size=chunk_size)
+    )
+    marks = (
+        marks.order_by("student__register_number", "student_id", "date", "session")
+        .values_list("student_id", "date", "session", "status")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    column = {period: index for index, period in enumerate(periods)}
+    mark = next(marks, None)
+    for student_id, register_number, full_name in students:
+        cells = [""] * len(periods)
+        present = total = 0
+        while mark is not None and mark[0] == student_id:
+            _, date, session, status = mark
+            if (date, session) in column:
+                cells[column[(date, session)]] = REGISTER_MARKS.get(status, status)
+                total += 1
+                present += status == "Present"
+            mark = next(marks, None)
+        yield [register_number, full_name, *cells, present, total]
+
+
+# -----------------------------
+# ROSTER SNAPSHOTS
+# -----------------------------
+def _roster_rows(department, semester, section):
+    students = (
+        Student.objects
+        .filter(department=department, semester=semester, section=section)
+        .only("id", "full_name", "roll_number", "register_number", "img", "img_digest")
+        .order_by("register_number", "id")
+    )
+    return [
+        {
+            "id": student.id,
+            "name": student.full_name,
+            # Register number until a roll number is assigned
+            "roll_number": student.roll_number or student.register_number,
+            "img": thumbnail_url(student, "sm") or (student.img.url if student.img else None),
+        }
+        for student in students
+    ]
+
+
+def roster_snapshot(department, semester, section):
+    """
+    ``{"hash", "students"}`` for one class, built once and kept until a
+    student of the class changes (``roster_scope`` is bumped by the
+    student signals and the importer). ``hash`` identifies the content.
+    """
+    def build():
+        rows = _roster_rows(department, semester, section)
+        body = json.dumps(rows, sort_keys=True, separators=(",", ":"))
+        return {"hash": hashlib.sha256(body.encode()).hexdigest()[:32], "students": rows}
+
+    return cached_snapshot("roster", [roster_scope(department, semester, section)], build)
+
+
+# -----------------------------
+# SUBJECT SECTIONS
+# -----------------------------
+@transaction.atomic
+def set_subject_sections(subject, sections):
+    """Make ``sections`` the exact set of sections ``subject`` is taught to."""
+    sections = set(sections)
+    SubjectSection.objects.filter(subject=subject).exclude(section__in=sections).delete()
+    SubjectSection.objects.bulk_create(
+        [SubjectSection(subject=subject, section=section) for section in sorted(sections)],
+        ignore_conflicts=True,
+    )
+    bump_on_commit(SUBJECTS)
+
+
+# -----------------------------
+# REBUILD
+# -----------------------------
+def _bulk_create(model, objs, batch_size):
+    """``bulk_create`` ``objs`` a batch at a time; ``bulk_create`` itself lists them all first."""
+    for batch in chunked(objs, batch_size):
+        model.objects.bulk_create(batch)
+
+
+def rebuild_attendance_stats(batch_size=1000):
+    """Recompute every counter and rollup from the live attendance rows."""
+    live = Attendance.objects.filter(is_deleted=False).order_by()
+    present = Count("id", filter=Q(status="Present"))
+
+    with transaction.atomic():
+        SubjectAttendanceStats.objects.all().delete()
+        StudentAttendanceStats.objects.all().delete()
+        AttendanceRollup.objects.all().delete()
+
+        _bulk_create(
+            AttendanceRollup,
+            (
+                AttendanceRollup(**row)
+                for row in live.values(*ROLLUP_KEY)
+                .annotate(total=Count("id"), present=present, absent=Count("id", filter=Q(status="Absent")))
+                .iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+
+        _bulk_create(
+            SubjectAttendanceStats,
+            (
+                SubjectAttendanceStats(
+                    student_id=row["student_id"],
+                    subject_id=row["subject_id"],
+                    total=row["total"],
+                    present=row["present"],
+                )
+                for row in live.values("student_id", "subject_id")
+                .annotate(total=Count("id"), present=present)
+                .iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        _bulk_create(
+            StudentAttendanceStats,
+            (
+                StudentAttendanceStats(
+                    student_id=row["student_id"],
+                    total=row["total"],
+                    present=row["present"],
+                )
+                for row in live.values("student_id")
+                .annotate(total=Count("id"), present=present)
+                .iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        bump_on_commit(*(student_scope(pk) for pk in Student.objects.values_list("pk", flat=True)))
+
+    return StudentAttendanceStats.objects.count(), SubjectAttendanceStats.objects.count()
@@ -0,0 +1,93 @@
+"""
+Side effects of writes that do not go through ``services.py`` (admin
+edits, profile changes, enrolment): cache invalidation and thumbnails.
+Attendance writes bump their own versions in
+``services.apply_attendance_deltas``; ``attendance_changed`` is the net
+for any single-record save or delete that bypasses it.
+"""
+import functools
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import SUBJECTS, bump_on_commit, roster_scope, student_scope, teacher_scope
+from .models import Attendance, Student, Subject, SubjectSection, Teacher
+from .thumbnails import generate_thumbnails_for
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=SubjectSection)
+def subjects_changed(sender, **kwargs):
+    bump_on_commit(SUBJECTS)
+
+
+@receiver([post_save, post_delete], sender=Teacher)
+def teacher_changed(sender, instance, **kwargs):
+    # Subjects show their teacher's name
+    bump_on_commit(teacher_scope(instance.pk), SUBJECTS)
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    # Profiles and summaries show the student's attendance
+    bump_on_commit(student_scope(instance.student_id))
+
+
+ROSTER_FIELDS = ("department", "semester", "section")
+
+
+@receiver(pre_save, sender=Student)
+def note_previous(sender, instance, update_fields=None, **kwargs):
+    """Remember the class a student leaves and whether the photo is new."""
+    instance._previous_class = None
+    if update_fields is not None and not {"img", *ROSTER_FIELDS} & set(update_fields):
+        return
+    previous = None
+    if instance.pk:
+        previous = Student.objects.filter(pk=instance.pk).values_list("img", *ROSTER_FIELDS).first()
+    if previous:
+        instance._previous_class = previous[1:]
+    # A fresh upload still carries its client-side name here
+    instance._new_photo = (instance.img.name or "") != ((previous and previous[0]) or "")
+    if instance._new_photo:
+        instance.img_digest = ""
+
+
+@receiver([post_save, post_delete], sender=Student)
+def student_changed(sender, instance, **kwargs):
+    classes = {tuple(getattr(instance, field) for field in ROSTER_FIELDS)}
+    if getattr(instance, "_previous_class", None):
+        classes.add(instance._previous_class)
+    bump_on_commit(student_scope(instance.pk), *(roster_scope(*group) for group in classes))
+
+
+@receiver(post_save, sender=Student)
+def make_thumbnails(sender, instance, **kwargs):
+    if getattr(instance, "_new_photo", False) and instance.img:
+        instance._new_photo = False
+        transaction.on_commit(functools.partial(generate_thumbnails_for, instance.pk))
+
+
+@receiver(m2m_changed, sender=Student.subjects.through)
+def enrolment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        bump_on_commit(student_scope(instance.pk))
+    elif pk_set is not None:
+        bump_on_commit(*(student_scope(pk) for pk in pk_set))
+    else:
+        # subject.students.clear()
+        bump_on_commit(*(student_scope(pk) for pk in Student.objects.values_list("pk", flat=True)))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached response shows
+    if created or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    teacher_id = Teacher.objects.filter(user=instance).values_list("pk", flat=True).first()
+    if teacher_id:
+        bump_on_commit(teacher_scope(teacher_id), SUBJECTS)
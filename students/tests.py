@@ -1,21 +1,1489 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
 from django.contrib.auth.models import User
-from .models import Student, Attendance
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from attendance_tracker.settings import _database
+
+from . import routers, thumbnails
+from .benchmarks import count_hashes
+from .benchmarks.api import api_patterns, check_budgets, load_budgets, run_api_benchmark
+from .benchmarks.datagen import generate_scale
+from .importer import import_students
+from .instrumentation import normalize_sql
+from .jobs import claim_next, enqueue, job_handler, requeue_stale, run_job
+from .models import (
+    Attendance,
+    AttendanceRollup,
+    IdempotencyKey,
+    Job,
+    Student,
+    StudentAttendanceStats,
+    Subject,
+    SubjectAttendanceStats,
+    SubjectSection,
+    Teacher,
+)
+from .pagination import KeysetPagination
+from .renderers import ColumnarJSONRenderer
+from .retry import retry_on_lock
+from .routers import ReplicaRouter, use_replica
+from .serializer import MyTokenObtainPairSerializer, StudentSerializer, TeacherSerializer
+from .services import bulk_mark_attendance, rebuild_attendance_stats, register_periods, register_rows
+from .views import serve_thumbnail
+
 
 class AttendancePercentageTests(TestCase):
+    # The percentage is read from the counters the services keep
     def setUp(self):
-        u = User.objects.create_user('s1', 's1@example.com', 'pass')
-        self.student = Student.objects.create(user=u)
+        self.teacher = make_teacher()
+        self.subject = Subject.objects.create(name="DBMS", code="CS501", teacher=self.teacher, semester="5")
+        self.student = make_student("R001")
+
+    def mark(self, date, status):
+        bulk_mark_attendance(
+            [{"student": self.student.id, "subject": self.subject.id, "date": date, "status": status}],
+            recorded_by=self.teacher.user,
+            session_id=uuid.uuid4(),
+            session=1,
+            semester="5",
+            section="A",
+        )
+
+    def percentage(self):
+        return Student.objects.get(pk=self.student.pk).attendance_percentage()
 
     def test_no_attendance_records(self):
-        self.assertEqual(self.student.attendance_percentage(), 0)
+        self.assertEqual(self.percentage(), 0)
 
     def test_all_present(self):
-        Attendance.objects.create(student=self.student, date='2025-10-01', status='present')
-        Attendance.objects.create(student=self.student, date='2025-10-02', status='present')
-        self.assertEqual(self.student.attendance_percentage(), 100)
+        self.mark("2025-10-01", "Present")
+        self.mark("2025-10-02", "Present")
+        self.assertEqual(self.percentage(), 100)
 
     def test_mixed_attendance(self):
-        Attendance.objects.create(student=self.student, date='2025-10-01', status='present')
-        Attendance.objects.create(student=self.student, date='2025-10-02', status='absent')
-        self.assertEqual(self.student.attendance_percentage(), 50)
+        self.mark("2025-10-01", "Present")
+        self.mark("2025-10-02", "Absent")
+        self.assertEqual(self.percentage(), 50)
+
+    def test_rows_written_directly_count_after_a_rebuild(self):
+        Attendance.objects.create(
+            student=self.student, subject=self.subject, date="2025-10-01", status="Present",
+            recorded_by=self.teacher.user, semester="5", section="A", session_id=uuid.uuid4(),
+        )
+        self.assertEqual(self.percentage(), 0)
+        rebuild_attendance_stats()
+        self.assertEqual(self.percentage(), 100)
+
+
+def make_teacher(username="t1", department="CSE"):
+    user = User.objects.create_user(username, f"{username}@example.com", "pass")
+    return Teacher.objects.create(user=user, department=department)
+
+
+def make_student(register_number, semester="5", section="A", department="CSE"):
+    user = User.objects.create_user(register_number)
+    return Student.objects.create(
+        user=user,
+        full_name=f"Student {register_number}",
+        register_number=register_number,
+        department=department,
+        semester=semester,
+        section=section,
+    )
+
+
+def clear_response_cache():
+    # Test transactions never commit, so writes never bump cache versions;
+    # start every test from an empty response cache instead
+    caches[settings.RESPONSE_CACHE_ALIAS].clear()
+
+
+class AttendanceAPITestCase(APITestCase):
+    def setUp(self):
+        clear_response_cache()
+        self.teacher = make_teacher()
+        self.subject = Subject.objects.create(
+            name="DBMS", code="CS501", teacher=self.teacher, semester="5"
+        )
+        SubjectSection.objects.create(subject=self.subject, section="A")
+        self.students = [make_student(f"R{i:03d}") for i in range(20)]
+        self.client.force_authenticate(self.teacher.user)
+
+    def payload(self, students, date="2025-10-01", session=1):
+        return [
+            {
+                "student": s.id,
+                "subject": self.subject.id,
+                "date": date,
+                "session": session,
+                "semester": "5",
+                "section": "A",
+                "status": "Present" if i % 2 else "Absent",
+            }
+            for i, s in enumerate(students)
+        ]
+
+    def mark(self, students, **kwargs):
+        res = self.client.post("/api/attendance/", self.payload(students, **kwargs), format="json")
+        self.assertEqual(res.status_code, 201)
+        return res.data["session_id"]
+
+
+class BulkAttendanceTests(AttendanceAPITestCase):
+
+    def test_bulk_create_uses_constant_queries(self):
+        for session, size in ((1, 5), (2, 20)):
+            with self.subTest(size=size), self.assertNumQueries(15):
+                res = self.client.post(
+                    "/api/attendance/", self.payload(self.students[:size], session=session), format="json"
+                )
+            self.assertEqual(res.status_code, 201)
+            self.assertEqual(res.data["created"], size)
+            self.assertEqual(res.data["conflicts"], [])
+            self.assertEqual(Attendance.objects.filter(session=session).count(), size)
+            self.assertEqual(len(set(Attendance.objects.filter(session=session).values_list("session_id", flat=True))), 1)
+
+    def test_bulk_create_rejects_mixed_periods(self):
+        other = Subject.objects.create(name="OS", code="CS502", teacher=self.teacher, semester="5")
+        payload = self.payload(self.students[:6])
+        payload[1]["session"] = 2
+        payload[3]["section"] = "B"
+        payload[4]["date"] = "2025-10-02"
+        payload[5]["subject"] = other.id
+        res = self.client.post("/api/attendance/", payload, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["rows"], [1, 3, 4, 5])
+        self.assertEqual(Attendance.objects.count(), 0)
+
+    def test_bulk_create_only_for_own_subjects(self):
+        self.client.force_authenticate(make_teacher("t2").user)
+        res = self.client.post("/api/attendance/", self.payload(self.students[:3]), format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([conflict["detail"] for conflict in res.data["conflicts"]], ["Invalid subject."] * 3)
+
+        self.client.force_authenticate(self.students[0].user)
+        res = self.client.post("/api/attendance/", self.payload(self.students[:3]), format="json")
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(Attendance.objects.count(), 0)
+
+    def test_bulk_create_reports_per_row_conflicts(self):
+        self.client.post("/api/attendance/", self.payload(self.students[:5]), format="json")
+        res = self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["created"], 15)
+        self.assertEqual([c["index"] for c in res.data["conflicts"]], [0, 1, 2, 3, 4])
+        self.assertEqual(Attendance.objects.count(), 20)
+
+    def test_bulk_create_all_conflicting(self):
+        self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        res = self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(len(res.data["conflicts"]), 20)
+
+    def test_duplicate_rows_within_batch(self):
+        rows = self.payload(self.students[:2])
+        res = self.client.post("/api/attendance/", rows + rows[:1], format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["conflicts"][0]["index"], 2)
+
+
+class AttendanceCounterTests(AttendanceAPITestCase):
+    def stats(self, student):
+        return StudentAttendanceStats.objects.get(student=student)
+
+    def test_counters_follow_create_delete_restore(self):
+        session_id = self.mark(self.students[:4])
+        self.mark(self.students[:4], session=2)
+        # index 1 is Present, index 0 Absent in every batch
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (2, 2))
+        self.assertEqual((self.stats(self.students[0]).total, self.stats(self.students[0]).present), (2, 0))
+        self.assertEqual(
+            SubjectAttendanceStats.objects.get(student=self.students[1], subject=self.subject).total, 2
+        )
+
+        res = self.client.delete(f"/api/attendance/delete-session/{session_id}/")
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (1, 1))
+        self.assertIsNotNone(Attendance.objects.filter(session_id=session_id).first().deleted_at)
+
+        res = self.client.post(f"/api/attendance/restore-session/{session_id}/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (2, 2))
+
+        record = Attendance.objects.filter(student=self.students[1]).first()
+        self.client.delete(f"/api/attendance/{record.id}/")
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (1, 1))
+        self.assertEqual(self.students[1].attendance_percentage(), 100)
+
+    def test_rebuild_command_matches_incremental_counters(self):
+        session_id = self.mark(self.students)
+        self.mark(self.students[:10], session=2)
+        self.client.delete(f"/api/attendance/delete-session/{session_id}/")
+        expected = set(StudentAttendanceStats.objects.values_list("student_id", "total", "present"))
+
+        StudentAttendanceStats.objects.update(total=0, present=0)
+        call_command("rebuild_attendance_stats", "--batch-size", "7", stdout=open("/dev/null", "w"))
+        rebuilt = set(StudentAttendanceStats.objects.filter(total__gt=0).values_list("student_id", "total", "present"))
+        self.assertEqual(rebuilt, {row for row in expected if row[1] > 0})
+
+    def test_edits_move_counts(self):
+        session_id = self.mark(self.students[:2])
+        record = Attendance.objects.get(session_id=session_id, student=self.students[1])
+
+        res = self.client.patch(f"/api/attendance/{record.id}/", {"status": "Absent"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (1, 0))
+        rollup = AttendanceRollup.objects.get(session_id=session_id)
+        self.assertEqual((rollup.total, rollup.present, rollup.absent), (2, 0, 2))
+
+        model_admin = admin.site._registry[Attendance]
+        request = RequestFactory().post("/admin/")
+        record.refresh_from_db()
+        record.status = "Present"
+        model_admin.save_model(request, record, None, True)
+        self.assertEqual((self.stats(self.students[1]).total, self.stats(self.students[1]).present), (1, 1))
+
+        model_admin.delete_queryset(request, Attendance.objects.filter(session_id=session_id))
+        self.assertEqual(self.stats(self.students[1]).total, 0)
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.total, rollup.present, rollup.absent), (0, 0, 0))
+
+    def test_students_for_teacher_reads_counters(self):
+        self.mark(self.students)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                f"/api/teacher/students/?subject={self.subject.id}&semester=5&section=A"
+            )
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if "students_attendance" in q["sql"]])
+        self.assertEqual(res.data["results"][1]["attendance_percentage"], "100.00%")
+        self.assertEqual(res.data["results"][0]["attendance_percentage"], "0%")
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "query plans are asserted against SQLite")
+class AttendanceQueryPlanTests(TestCase):
+    """Guard the hot Attendance query shapes against losing their indexes."""
+
+    def assertUsesIndex(self, qs, index_name):
+        plan = qs.explain()
+        self.assertIn(f"INDEX {index_name}", plan)
+        self.assertNotIn("SCAN students_attendance", plan)
+
+    def test_session_lookups(self):
+        session_id = uuid.uuid4()
+        self.assertUsesIndex(Attendance.objects.filter(session_id=session_id, is_deleted=False), "attendance_session_idx")
+        self.assertUsesIndex(Attendance.objects.filter(session_id=session_id, is_deleted=True), "attendance_session_idx")
+
+    def test_teacher_lookups(self):
+        self.assertUsesIndex(
+            Attendance.objects.filter(subject__teacher_id=1, is_deleted=False),
+            "attendance_subject_idx"
+        )
+        self.assertUsesIndex(
+            Attendance.objects.filter(subject__teacher_id=1, is_deleted=True),
+            "attendance_deleted_idx"
+        )
+
+    def test_sync_lookups(self):
+        # Without statistics SQLite seeks by subject/student; either way no full scan
+        for qs in (
+            Attendance.objects.filter(subject__teacher_id=1),
+            Attendance.objects.filter(student_id=1),
+        ):
+            plan = qs.filter(updated_at__gt=timezone.now()).order_by("updated_at", "id").explain()
+            self.assertIn("USING INDEX", plan)
+            self.assertNotIn("SCAN students_attendance", plan)
+
+    def test_student_lookups(self):
+        plan = Attendance.objects.filter(student_id=1, is_deleted=False, status="Present").explain()
+        self.assertIn("USING INDEX", plan)
+        self.assertNotIn("SCAN students_attendance", plan)
+
+
+class TeacherSummaryRollupTests(AttendanceAPITestCase):
+    def test_summary_served_from_rollup(self):
+        first = self.mark(self.students, date="2025-10-01")
+        self.mark(self.students[:10], date="2025-10-02", session=3)
+
+        res = self.client.get("/api/attendance/teacher-summary/")
+        self.assertEqual(res.status_code, 200)
+        rows = res.data["results"]
+        self.assertEqual([(str(r["date"]), r["session"]) for r in rows], [("2025-10-02", 3), ("2025-10-01", 1)])
+        self.assertEqual((rows[1]["total"], rows[1]["present"], rows[1]["absent"]), (20, 10, 10))
+        self.assertEqual(rows[1]["subject__name"], "DBMS")
+        self.assertEqual((rows[1]["student__semester"], rows[1]["student__section"]), ("5", "A"))
+
+        self.client.delete(f"/api/attendance/delete-session/{first}/")
+        res = self.client.get("/api/attendance/teacher-summary/")
+        self.assertEqual(len(res.data["results"]), 1)
+
+        self.client.post(f"/api/attendance/restore-session/{first}/")
+        rollup = AttendanceRollup.objects.get(session_id=first)
+        self.assertEqual((rollup.total, rollup.present, rollup.absent), (20, 10, 10))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        first = self.mark(self.students, date="2025-10-01")
+        self.mark(self.students[:10], date="2025-10-02", session=3)
+        self.client.delete(f"/api/attendance/delete-session/{first}/")
+        self.client.post(f"/api/attendance/restore-session/{first}/")
+        record = Attendance.objects.filter(session_id=first).first()
+        self.client.delete(f"/api/attendance/{record.id}/")
+
+        fields = ("session_id", "date", "subject_id", "session", "semester", "section", "total", "present", "absent")
+        expected = set(AttendanceRollup.objects.filter(total__gt=0).values_list(*fields))
+        call_command("rebuild_attendance_stats", stdout=open("/dev/null", "w"))
+        self.assertEqual(set(AttendanceRollup.objects.values_list(*fields)), expected)
+
+    def test_summary_date_range_and_cursor(self):
+        for day in range(1, 6):
+            self.mark(self.students[:3], date=f"2025-10-0{day}")
+
+        res = self.client.get("/api/attendance/teacher-summary/?from=2025-10-02&to=2025-10-04")
+        self.assertEqual([str(r["date"]) for r in res.data["results"]], ["2025-10-04", "2025-10-03", "2025-10-02"])
+
+        res = self.client.get("/api/attendance/teacher-summary/?page_size=2")
+        self.assertEqual(len(res.data["results"]), 2)
+        res = self.client.get(res.data["next"])
+        self.assertEqual([str(r["date"]) for r in res.data["results"]], ["2025-10-03", "2025-10-02"])
+
+        res = self.client.get("/api/attendance/teacher-summary/?from=yesterday")
+        self.assertEqual(res.status_code, 400)
+
+
+class KeysetPaginationTests(AttendanceAPITestCase):
+    def collect(self, url):
+        rows = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            rows += res.data["results"]
+            url = res.data["next"]
+        return rows
+
+    def test_attendance_list_walks_meta_ordering(self):
+        for day in (1, 2, 3):
+            for period in (1, 2):
+                self.mark(self.students[:5], date=f"2025-10-0{day}", session=period)
+
+        rows = self.collect("/api/attendance/?page_size=4")
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(len({r["id"] for r in rows}), 30)
+        keys = [(r["date"], r["session"], r["student"]) for r in rows]
+        expected = sorted(keys, key=lambda k: (-int(k[0].replace("-", "")), k[1], k[2]))
+        self.assertEqual(keys, expected)
+
+        rows = self.collect("/api/attendance/?from=2025-10-02&to=2025-10-02&page_size=3")
+        self.assertEqual({r["date"] for r in rows}, {"2025-10-02"})
+        self.assertEqual(len(rows), 10)
+
+    def test_deleted_sessions_and_roster_are_paginated(self):
+        for day in (1, 2, 3):
+            self.client.delete(f"/api/attendance/delete-session/{self.mark(self.students[:2], date=f'2025-10-0{day}')}/")
+
+        rows = self.collect("/api/attendance/teacher-deleted/?page_size=2")
+        self.assertEqual([str(r["date"]) for r in rows], ["2025-10-03", "2025-10-02", "2025-10-01"])
+
+        rows = self.collect(f"/api/teacher/students/?subject={self.subject.id}&semester=5&section=A&page_size=7")
+        self.assertEqual([r["id"] for r in rows], [s.id for s in self.students])
+
+    def test_invalid_cursor(self):
+        res = self.client.get("/api/attendance/?cursor=not-a-cursor")
+        self.assertEqual(res.status_code, 404)
+
+    def test_cursor_with_bad_values(self):
+        paginator = KeysetPagination()
+        for values in (["notadate", 1, 1, 1], [{"a": 1}, 1, 1, 1], ["2025-10-01", "x", 1, 1], ["2025-10-01", 1, 1]):
+            res = self.client.get("/api/attendance/", {"cursor": paginator.encode_cursor(values)})
+            self.assertEqual(res.status_code, 404, values)
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StudentImportTests(APITestCase):
+    CSV = (
+        "register_number,full_name,department,semester,year,section\n"
+        "R001,Asha,CSE,5,3,A\n"
+        "R002,Bala,CSE,5,3,B\n"
+        "\n"
+        "R001,Asha Again,CSE,5,3,A\n"
+        "R003,Chitra,CSE,5,3,Z\n"
+        "R004,Dev,CSE,5,,C\n"
+    )
+
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content)
+
+    def test_csv_import_report(self):
+        make_student("R002")
+        report = import_students(self.upload("s.csv", self.CSV.encode()), "s.csv", chunk_size=2, workers=1)
+
+        self.assertEqual((report["created"], report["exists"], report["error"]), (2, 1, 2))
+        statuses = {(r["row"], r["status"]) for r in report["rows"]}
+        self.assertEqual(statuses, {(2, "created"), (3, "exists"), (5, "error"), (6, "error"), (7, "created")})
+
+        student = Student.objects.get(register_number="R004")
+        self.assertIsNone(student.year)
+        self.assertTrue(student.must_change_password)
+        self.assertTrue(student.user.check_password("R004"))
+
+    def test_xlsx_import_with_process_pool(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Register_Number", "Full_Name", "Department", "Semester", "Year", "Section"])
+        for i in range(6):
+            sheet.append([1000 + i, f"Student {i}", "CSE", 5, 3, "A"])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        report = import_students(self.upload("s.xlsx", buffer.getvalue()), "s.xlsx", workers=2)
+        self.assertEqual(report["created"], 6)
+        self.assertTrue(User.objects.get(username="1003").check_password("1003"))
+
+    def test_upload_endpoint(self):
+        self.client.force_authenticate(make_teacher().user)
+        res = self.client.post("/api/upload-students/", {"file": self.upload("s.csv", self.CSV.encode())})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["created_students"], 3)
+        self.assertEqual(res.data["failed_rows"], 2)
+
+        res = self.client.post("/api/upload-students/", {"file": self.upload("s.txt", b"x")})
+        self.assertEqual(res.status_code, 400)
+        res = self.client.post("/api/upload-students/", {"file": self.upload("s.csv", b"name\nx\n")})
+        self.assertEqual(res.status_code, 400)
+
+
+@job_handler("test_fail")
+def _failing_job(job):
+    raise RuntimeError("boom")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, MEDIA_ROOT=tempfile.mkdtemp(), STUDENT_IMPORT_HASH_WORKERS=1)
+class JobQueueTests(APITestCase):
+    def test_async_upload_runs_in_worker(self):
+        teacher = make_teacher()
+        self.client.force_authenticate(teacher.user)
+        upload = SimpleUploadedFile("s.csv", StudentImportTests.CSV.encode())
+        res = self.client.post("/api/upload-students/?async=1", {"file": upload})
+        self.assertEqual(res.status_code, 202)
+        job_id = res.data["job_id"]
+        self.assertFalse(Student.objects.exists())
+
+        res = self.client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(res.data["status"], "queued")
+
+        call_command("run_jobs", "--once", stdout=io.StringIO())
+
+        res = self.client.get(f"/api/jobs/{job_id}/")
+        self.assertEqual(res.data["status"], "succeeded")
+        self.assertEqual(res.data["progress"], 5)
+        self.assertEqual(res.data["result"]["created"], 3)
+        self.assertEqual(Student.objects.count(), 3)
+
+        self.client.force_authenticate(make_teacher("t2").user)
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/").status_code, 404)
+
+    def test_claim_is_exclusive_and_failures_are_recorded(self):
+        job = enqueue("test_fail")
+        claimed = claim_next()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(claim_next())
+
+        with self.assertLogs("students.jobs", "ERROR"):
+            run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.attempts), (Job.QUEUED, "boom", 1))
+
+        # Retried until the last attempt
+        with self.assertLogs("students.jobs", "ERROR"):
+            while (claimed := claim_next()) is not None:
+                run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, settings.JOB_MAX_ATTEMPTS))
+
+    def test_upload_is_kept_until_the_import_is_finished(self):
+        teacher = make_teacher()
+        self.client.force_authenticate(teacher.user)
+        upload = SimpleUploadedFile("s.csv", StudentImportTests.CSV.encode())
+        job = Job.objects.get(pk=self.client.post("/api/upload-students/?async=1", {"file": upload}).data["job_id"])
+        path = job.payload["path"]
+
+        # The worker died mid-run: the job is queued again with its file
+        first = claim_next()
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        self.assertEqual(requeue_stale(3600), 1)
+        self.assertTrue(default_storage.exists(path))
+
+        with mock.patch("students.importer.import_students", side_effect=RuntimeError("db down")):
+            with self.assertLogs("students.jobs", "ERROR"):
+                run_job(claim_next())
+        self.assertTrue(default_storage.exists(path))
+
+        job = run_job(claim_next())
+        self.assertEqual((job.status, job.attempts), (Job.SUCCEEDED, 3))
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertFalse(default_storage.exists(path))
+        self.assertEqual(first.pk, job.pk)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RoleResolutionTests(APITestCase):
+    def setUp(self):
+        clear_response_cache()
+        self.teacher = make_teacher()
+        self.teacher.user.set_password("secret-pass")
+        self.teacher.user.save()
+        self.subject = Subject.objects.create(name="DBMS", code="CS501", teacher=self.teacher, semester="5")
+
+    def login(self, username, password):
+        res = self.client.post("/api/token/", {"username": username, "password": password})
+        self.assertEqual(res.status_code, 200)
+        return res.data["access"]
+
+    def test_token_carries_role_claims(self):
+        token = AccessToken(self.login("t1", "secret-pass"))
+        self.assertEqual((token["role"], token["teacher_id"], token["student_id"]), ("teacher", self.teacher.id, None))
+
+    def test_refresh_reads_the_current_role(self):
+        res = self.client.post("/api/token/", {"username": "t1", "password": "secret-pass"})
+        self.assertNotIn("role", RefreshToken(res.data["refresh"]))
+        self.teacher.delete()
+        student = make_student("R001")
+        Student.objects.filter(pk=student.pk).update(user=User.objects.get(username="t1"))
+
+        res = self.client.post("/api/token/refresh/", {"refresh": res.data["refresh"]})
+        self.assertEqual(res.status_code, 200)
+        token = AccessToken(res.data["access"])
+        self.assertEqual((token["role"], token["teacher_id"], token["student_id"]), ("student", None, student.id))
+
+    def test_role_comes_from_token_without_lookup(self):
+        access = self.login("t1", "secret-pass")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/subjects/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([s["id"] for s in res.data["results"]], [self.subject.id])
+        role_lookups = [
+            q for q in ctx.captured_queries
+            if '"students_teacher"."id"' in q["sql"] and '"students_student"."id"' in q["sql"]
+        ]
+        self.assertEqual(role_lookups, [])
+
+    def test_role_falls_back_to_single_lookup(self):
+        student = make_student("R001")
+        self.client.force_authenticate(student.user)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/attendance/teacher-summary/")
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('"students_student"."id"', ctx.captured_queries[0]["sql"])
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 10
+
+
+@override_settings(PASSWORD_HASHERS=["students.tests.FastPBKDF2PasswordHasher"])
+class LoginHashTests(APITestCase):
+    def setUp(self):
+        self.student = make_student("R001")
+        self.student.user.set_password("R001")
+        self.student.user.save()
+
+    def login(self, password):
+        with count_hashes() as hashes:
+            res = self.client.post("/api/token/", {"username": "R001", "password": password})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(hashes["count"], 1)
+        return res.data
+
+    def test_default_password_forces_change_with_one_hash(self):
+        self.assertTrue(self.login("R001")["must_change_password"])
+
+    def test_changed_password_clears_flag(self):
+        self.client.force_authenticate(self.student.user)
+        res = self.client.post("/api/change-password/", {"old_password": "R001", "new_password": "Xq7!long-enough"})
+        self.assertEqual(res.status_code, 200)
+        self.student.refresh_from_db()
+        self.assertFalse(self.student.must_change_password)
+
+        self.client.force_authenticate(None)
+        self.assertFalse(self.login("Xq7!long-enough")["must_change_password"])
+
+    def test_token_claim_matches_the_response(self):
+        # A stale stored flag must not leak into the token
+        Student.objects.filter(pk=self.student.pk).update(must_change_password=False)
+        data = self.login("R001")
+        self.assertTrue(data["must_change_password"])
+        self.assertTrue(AccessToken(data["access"])["must_change_password"])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, STUDENT_IMPORT_HASH_WORKERS=1)
+class APIQueryBudgetTests(APITestCase):
+    """Every API route stays within its checked-in query budget."""
+
+    def test_routes_within_query_budgets(self):
+        dataset = generate_scale("tiny")
+        results = run_api_benchmark(dataset, iterations=1)
+        self.assertEqual(check_budgets(results, load_budgets(), check_latency=False), [])
+        # Every API URL has a benchmarked route (and so a budget)
+        self.assertEqual(api_patterns() - {result["pattern"] for result in results.values()}, set())
+
+
+class EagerLoadingTests(AttendanceAPITestCase):
+    """Nested serializers cost the same number of queries for 1 or N rows."""
+
+    def setUp(self):
+        super().setUp()
+        other = make_teacher("t2")
+        self.electives = [
+            Subject.objects.create(name=f"S{i}", code=f"CS6{i:02d}", teacher=teacher, semester="5")
+            for i, teacher in enumerate([self.teacher, other, self.teacher])
+        ]
+
+    def enrol(self, students):
+        for student in students:
+            student.subjects.set(self.electives + [self.subject])
+
+    def count(self, serializer_class, queryset):
+        with CaptureQueriesContext(connection) as ctx:
+            serializer_class(serializer_class.setup_eager_loading(queryset), many=True).data
+        return len(ctx.captured_queries)
+
+    def test_student_serializer_queries_do_not_grow(self):
+        self.enrol(self.students)
+        one = self.count(StudentSerializer, Student.objects.filter(pk=self.students[0].pk))
+        many = self.count(StudentSerializer, Student.objects.all())
+        self.assertEqual(one, many)
+        self.assertEqual(many, 3)  # students + stats, subjects + teacher users, sections
+
+    def test_teacher_serializer_queries_do_not_grow(self):
+        self.enrol(self.students[:1])
+        self.assertEqual(self.count(TeacherSerializer, Teacher.objects.all()), 3)
+
+    def test_roster_endpoint_is_constant(self):
+        def roster():
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(f"/api/teacher/students/?subject={self.subject.id}&semester=5&section=A")
+            self.assertEqual(res.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.enrol(self.students[:1])
+        few = roster()
+        self.enrol(self.students)
+        self.assertEqual(roster(), few)
+
+
+class SubjectSectionTests(AttendanceAPITestCase):
+    def test_sections_round_trip_through_api(self):
+        res = self.client.post(
+            "/api/subjects/",
+            {"name": "OS", "code": "CS502", "teacher": self.teacher.id, "semester": "5", "sections": ["C", "B"]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["sections"], ["B", "C"])
+
+        res = self.client.patch(f"/api/subjects/{res.data['id']}/", {"sections": ["B", "D"]}, format="json")
+        self.assertEqual(res.data["sections"], ["B", "D"])
+        self.assertEqual(
+            list(SubjectSection.objects.filter(section="B", subject__semester="5").values_list("subject__code", flat=True)),
+            ["CS502"],
+        )
+
+    def test_invalid_section_rejected(self):
+        res = self.client.patch(f"/api/subjects/{self.subject.id}/", {"sections": ["Z"]}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_roster_checks_section_in_subject_query(self):
+        url = f"/api/teacher/students/?subject={self.subject.id}&semester=5&section="
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url + "B")
+        self.assertEqual(res.status_code, 400)
+        subject_queries = [q["sql"] for q in ctx.captured_queries if '"students_subject"' in q["sql"]]
+        self.assertEqual(len(subject_queries), 1)
+        self.assertIn('"students_subjectsection"', subject_queries[0])
+        self.assertEqual(self.client.get(url + "A").status_code, 200)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "query plans are asserted against SQLite")
+    def test_reverse_lookup_uses_index(self):
+        qs = SubjectSection.objects.filter(section="B").values("subject_id")
+        self.assertIn("subject_section_idx", qs.explain())
+
+
+class FastAttendanceReadTests(AttendanceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        res = self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        self.session_id = res.data["session_id"]
+
+    def test_fast_rows_match_serializer(self):
+        for url in ("/api/attendance/", f"/api/attendance/by-session/{self.session_id}/"):
+            slow = self.client.get(url).json()
+            fast = self.client.get(url, {"fast": "1"}).json()
+            self.assertEqual(fast, slow)
+
+    def test_columnar_by_accept_header_and_format(self):
+        slow = self.client.get("/api/attendance/", {"page_size": 5}).json()
+        res = self.client.get("/api/attendance/", {"page_size": 5}, HTTP_ACCEPT=ColumnarJSONRenderer.media_type)
+        self.assertEqual(res["Content-Type"], ColumnarJSONRenderer.media_type)
+        body = res.json()
+        self.assertEqual(body["next"], slow["next"])
+        self.assertEqual([dict(zip(body["columns"], row)) for row in body["rows"]], slow["results"])
+
+        body = self.client.get(f"/api/attendance/by-session/{self.session_id}/", {"format": "columnar"}).json()
+        self.assertEqual(len(body["rows"]), 20)
+        self.assertEqual(body["columns"][:3], ["id", "student", "student_name"])
+
+    def test_fast_list_does_not_scale_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/attendance/", {"format": "columnar"})
+        # one joined SELECT; the other query is the role lookup of force_authenticate
+        attendance = [q for q in ctx.captured_queries if '"students_attendance"' in q["sql"]]
+        self.assertEqual(len(attendance), 1)
+
+    def test_columnar_renderer_passes_errors_through(self):
+        res = self.client.get(f"/api/attendance/by-session/{uuid.uuid4()}/", {"format": "columnar"})
+        self.assertEqual(res.status_code, 404)
+        self.assertIn("error", res.json())
+
+
+class AdminChangelistQueryTests(AttendanceAPITestCase):
+    """Changelist query counts do not grow with the number of rows shown."""
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser("admin", password=None)
+        self.client.force_login(admin)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_are_constant(self):
+        urls = [
+            "/admin/students/attendance/",
+            "/admin/students/student/",
+            "/admin/students/subject/",
+            "/admin/students/teacher/",
+        ]
+        self.client.post("/api/attendance/", self.payload(self.students[:2]), format="json")
+        few = [self.queries(url) for url in urls]
+
+        make_teacher("t2")
+        for i in range(5):
+            Subject.objects.create(name=f"S{i}", code=f"CS6{i:02d}", teacher=self.teacher, semester="5")
+        self.client.post("/api/attendance/", self.payload(self.students, session=2), format="json")
+        self.assertEqual([self.queries(url) for url in urls], few)
+
+
+class DatabaseConfigTests(unittest.TestCase):
+    def test_sqlite_is_the_default(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(_database("DB_", "db.sqlite3")["ENGINE"], "django.db.backends.sqlite3")
+
+    def test_postgres_pool_and_replica_fallbacks(self):
+        env = {
+            "DB_ENGINE": "postgres", "DB_NAME": "attendx", "DB_USER": "app", "DB_HOST": "primary",
+            "DB_POOL": "1", "DB_POOL_MAX_SIZE": "20", "DB_REPLICA_HOST": "replica",
+        }
+        with mock.patch.dict(os.environ, env, clear=True):
+            primary = _database("DB_", "db.sqlite3")
+            replica = _database("DB_REPLICA_", "db-replica.sqlite3")
+        self.assertEqual(primary["OPTIONS"]["pool"], {"min_size": 2, "max_size": 20})
+        self.assertEqual(primary["CONN_MAX_AGE"], 0)
+        self.assertTrue(primary["CONN_HEALTH_CHECKS"])
+        self.assertEqual((replica["HOST"], replica["USER"], replica["NAME"]), ("replica", "app", "attendx"))
+
+    def test_persistent_connections_without_pool(self):
+        with mock.patch.dict(os.environ, {"DB_ENGINE": "postgres", "DB_CONN_MAX_AGE": "300"}, clear=True):
+            config = _database("DB_", "db.sqlite3")
+        self.assertEqual((config["CONN_MAX_AGE"], config["OPTIONS"]), (300, {}))
+
+
+class ReplicaRoutingTests(AttendanceAPITestCase):
+    def replica_reads(self, method, url, **kwargs):
+        """Whether the router was asked for each read inside a replica block."""
+        flags = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            flags.append(routers._replica_reads.get())
+            return original(router, model, **hints)
+
+        with mock.patch.object(ReplicaRouter, "db_for_read", spy):
+            getattr(self.client, method)(url, **kwargs)
+        return set(flags)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        with override_settings(REPLICA_DATABASE=None), use_replica():
+            self.assertIsNone(router.db_for_read(Student))
+        with override_settings(REPLICA_DATABASE="replica"), \
+                mock.patch.object(routers, "_mirrors_primary", return_value=False):
+            self.assertIsNone(router.db_for_read(Student))
+            with use_replica():
+                self.assertEqual(router.db_for_read(Student), "replica")
+            self.assertIsNone(router.db_for_write(Student))
+
+    def test_test_mirror_reads_primary(self):
+        with override_settings(REPLICA_DATABASE="default"), use_replica():
+            self.assertIsNone(ReplicaRouter().db_for_read(Student))
+
+    def test_summary_reads_use_replica_writes_do_not(self):
+        self.assertEqual(self.replica_reads("get", "/api/attendance/teacher-summary/"), {True})
+        self.assertEqual(self.replica_reads("get", "/api/teacher/students/?subject=1&semester=5&section=A"), {True})
+        # Cached responses are filled from the primary (see students/cache.py)
+        self.assertEqual(self.replica_reads("get", "/api/teacher/profile/"), {False})
+        self.assertEqual(
+            self.replica_reads("post", "/api/attendance/", data=self.payload(self.students), format="json"),
+            {False},
+        )
+        self.assertEqual(self.replica_reads("get", "/api/attendance/"), {False})
+
+
+class WriteRetryTests(unittest.TestCase):
+    def flaky(self, failures, error="database is locked"):
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return "saved"
+
+        return write, calls
+
+    @mock.patch("students.retry.time.sleep")
+    def test_retries_lock_errors_with_jitter(self, sleep):
+        write, calls = self.flaky(2)
+        with override_settings(ATTENDANCE_WRITE_RETRIES=3):
+            self.assertEqual(write(), "saved")
+        self.assertEqual(len(calls), 3)
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertTrue(all(0 <= delay <= 1.0 for delay in delays))
+
+    @mock.patch("students.retry.time.sleep")
+    def test_gives_up_after_retries(self, sleep):
+        write, calls = self.flaky(5)
+        with override_settings(ATTENDANCE_WRITE_RETRIES=2), self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 3)
+
+    @mock.patch("students.retry.time.sleep")
+    def test_other_errors_and_outer_transactions_are_not_retried(self, sleep):
+        write, calls = self.flaky(1, error="no such table: x")
+        with self.assertRaises(OperationalError):
+            write()
+        write, calls = self.flaky(1)
+        with self.assertRaises(OperationalError), transaction.atomic():
+            write()
+        self.assertEqual(len(calls), 1)
+        sleep.assert_not_called()
+
+    def test_sqlite_production_settings(self):
+        with mock.patch.dict(os.environ, {"DB_SQLITE_PRODUCTION": "1", "DB_SQLITE_TIMEOUT": "7"}, clear=True):
+            options = _database("DB_", "db.sqlite3")["OPTIONS"]
+        self.assertEqual((options["timeout"], options["transaction_mode"]), (7, "IMMEDIATE"))
+        self.assertIn("journal_mode=WAL", options["init_command"])
+        self.assertIn("busy_timeout=7000", options["init_command"])
+
+
+class AsyncEndpointTests(AttendanceAPITestCase):
+    """The async endpoints answer exactly what their sync twins answer."""
+
+    def setUp(self):
+        super().setUp()
+        res = self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        self.session_id = res.data["session_id"]
+        self.student = self.students[1]
+        self.client.force_authenticate(None)
+        self.tokens = {
+            user.pk: f"Bearer {MyTokenObtainPairSerializer().get_token(user).access_token}"
+            for user in (self.teacher.user, self.student.user)
+        }
+
+    def bearer(self, user):
+        return self.tokens[user.pk]
+
+    def sync_get(self, user, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=self.bearer(user))
+
+    async def async_get(self, user, url):
+        return await AsyncClient().get(url, headers={"Authorization": self.bearer(user)})
+
+    async def assert_same(self, user, path, status=200):
+        sync = await sync_to_async(self.sync_get)(user, f"/api/{path}")
+        response = await self.async_get(user, f"/api/async/{path}")
+        self.assertEqual((response.status_code, sync.status_code), (status, status))
+        self.assertEqual(response.json(), sync.json())
+
+    async def test_parity(self):
+        teacher, student = self.teacher.user, self.student.user
+        await self.assert_same(teacher, "attendance/teacher-summary/")
+        await self.assert_same(teacher, "attendance/teacher-summary/?from=2025-10-02")
+        await self.assert_same(teacher, f"attendance/by-session/{self.session_id}/")
+        await self.assert_same(teacher, f"attendance/by-session/{uuid.uuid4()}/", status=404)
+        await self.assert_same(student, f"students/{self.student.id}/attendance_summary/")
+        await self.assert_same(student, f"students/{self.students[0].id}/attendance_summary/", status=404)
+        await self.assert_same(student, "student/profile/")
+        await self.assert_same(teacher, "attendance/teacher-summary/?from=bad", status=400)
+
+    async def test_requires_token(self):
+        response = await AsyncClient().get("/api/async/student/profile/")
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get("/api/async/student/profile/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(response.status_code, 401)
+
+
+class ResponseCacheTests(AttendanceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.students[1]
+
+    def get(self, user, url, **headers):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, headers=headers)
+        return res, len(ctx.captured_queries)
+
+    def test_hit_and_not_modified(self):
+        user = self.student.user
+        first, queries = self.get(user, "/api/student/profile/")
+        self.assertEqual(first.status_code, 200)
+        self.assertGreater(queries, 1)
+
+        # Only the role lookup of force_authenticate is left
+        second, queries = self.get(user, "/api/student/profile/")
+        self.assertEqual((second.data, second["ETag"]), (first.data, first["ETag"]))
+        self.assertEqual(queries, 1)
+
+        res, _ = self.get(user, "/api/student/profile/", **{"If-None-Match": first["ETag"]})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], first["ETag"])
+
+    def test_cached_per_user(self):
+        mine, _ = self.get(self.student.user, "/api/student/profile/")
+        theirs, _ = self.get(self.students[2].user, "/api/student/profile/")
+        self.assertNotEqual(mine.data["id"], theirs.data["id"])
+        self.assertNotEqual(mine["ETag"], theirs["ETag"])
+
+    def test_attendance_writes_invalidate(self):
+        url = f"/api/students/{self.student.id}/attendance_summary/"
+        before, _ = self.get(self.student.user, url)
+        untouched, _ = self.get(self.students[2].user, "/api/student/profile/")
+        self.assertEqual(before.data["total_classes"], 0)
+
+        self.client.force_authenticate(self.teacher.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/attendance/", self.payload([self.student]), format="json")
+        session_id = res.data["session_id"]
+        after, _ = self.get(self.student.user, url)
+        self.assertEqual(after.data["total_classes"], 1)
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        res, _ = self.get(self.student.user, url, **{"If-None-Match": before["ETag"]})
+        self.assertEqual(res.status_code, 200)
+        # Other students' entries survive
+        res, queries = self.get(self.students[2].user, "/api/student/profile/")
+        self.assertEqual((res["ETag"], queries), (untouched["ETag"], 1))
+
+        self.client.force_authenticate(self.teacher.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/attendance/delete-session/{session_id}/")
+        res, _ = self.get(self.student.user, url)
+        self.assertEqual(res.data["total_classes"], 0)
+
+    def test_attendance_edits_invalidate(self):
+        self.client.force_authenticate(self.teacher.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/attendance/", self.payload(self.students[:2]), format="json")
+        record = Attendance.objects.get(session_id=res.data["session_id"], student=self.student)
+        url = f"/api/students/{self.student.id}/attendance_summary/"
+        before, _ = self.get(self.student.user, url)
+        profile, _ = self.get(self.student.user, "/api/student/profile/")
+
+        self.client.force_authenticate(self.teacher.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(f"/api/attendance/{record.id}/", {"status": "Absent"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        patched, _ = self.get(self.student.user, url, **{"If-None-Match": before["ETag"]})
+        self.assertEqual(patched.status_code, 200)
+        self.assertNotEqual(patched.data, before.data)
+        res, _ = self.get(self.student.user, "/api/student/profile/", **{"If-None-Match": profile["ETag"]})
+        self.assertEqual(res.status_code, 200)
+
+        # A raw delete that skips the services still invalidates
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        res, _ = self.get(self.student.user, url, **{"If-None-Match": patched["ETag"]})
+        self.assertEqual(res.status_code, 200)
+
+    def test_subject_changes_invalidate(self):
+        before, _ = self.get(self.teacher.user, "/api/teacher/profile/")
+        listed, _ = self.get(self.teacher.user, "/api/subjects/")
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(f"/api/subjects/{self.subject.id}/", {"sections": ["A", "B"]}, format="json")
+        self.assertEqual(res.status_code, 200)
+        after, _ = self.get(self.teacher.user, "/api/teacher/profile/")
+        self.assertEqual(after.data["subjects"][0]["sections"], ["A", "B"])
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        res, _ = self.get(self.teacher.user, "/api/subjects/")
+        self.assertEqual(res.data["results"][0]["sections"], ["A", "B"])
+        self.assertNotEqual(res["ETag"], listed["ETag"])
+
+
+class AnalyticsTests(AttendanceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Odd-indexed students present each time; R000 is also absent in October
+        self.client.post("/api/attendance/", self.payload(self.students, date="2025-09-30"), format="json")
+        self.client.post("/api/attendance/", self.payload(self.students, date="2025-10-01"), format="json")
+        self.client.post("/api/attendance/", self.payload(self.students[:2], date="2025-10-02", session=2), format="json")
+
+    def report(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200, res.content)
+        reads = [q for q in ctx.captured_queries if "auth_user" not in q["sql"]]
+        self.assertEqual(len(reads), 1)
+        return res
+
+    def test_rates_by_subject_section_and_month(self):
+        [subject] = self.report("/api/attendance/analytics/").data
+        self.assertEqual((subject["subject__name"], subject["total_classes"], subject["present_count"]), ("DBMS", 42, 21))
+        self.assertEqual(subject["rate"], 50.0)
+        [section] = self.report("/api/attendance/analytics/?by=section").data
+        self.assertEqual((section["semester"], section["section"], section["total_classes"]), ("5", "A", 42))
+
+        months = self.report("/api/attendance/analytics/?by=month").data
+        self.assertEqual([(str(m["period"]), m["total_classes"]) for m in months], [("2025-09-01", 20), ("2025-10-01", 22)])
+        weeks = self.report("/api/attendance/analytics/?by=week&from=2025-10-01").data
+        self.assertEqual([(str(w["period"]), w["total_classes"]) for w in weeks], [("2025-09-29", 22)])
+
+    def test_student_rates_from_counters_or_raw_rows(self):
+        rows = self.report("/api/attendance/analytics/?by=student").data
+        self.assertEqual(len(rows), 20)
+        self.assertEqual((rows[0]["student__register_number"], rows[0]["total_classes"], rows[0]["rate"]), ("R000", 3, 0.0))
+        self.assertEqual((rows[1]["total_classes"], rows[1]["rate"]), (3, 100.0))
+        windowed = self.report("/api/attendance/analytics/?by=student&from=2025-10-02").data
+        self.assertEqual([(r["student__register_number"], r["total_classes"]) for r in windowed], [("R000", 1), ("R001", 1)])
+
+    def test_defaulters(self):
+        rows = self.report("/api/attendance/defaulters/").data
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(row["rate"] == 0.0 for row in rows))
+        self.assertEqual(self.report("/api/attendance/defaulters/?threshold=0").data, [])
+        self.assertEqual(self.client.get("/api/attendance/defaulters/?threshold=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/attendance/analytics/?by=year").status_code, 400)
+
+    def test_streaming_csv(self):
+        res = self.client.get("/api/attendance/defaulters/?format=csv")
+        self.assertTrue(res.streaming)
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "student_id,student__register_number,student__full_name,semester,section,"
+                                   "subject_id,subject__name,total_classes,present_count,rate")
+        self.assertEqual(len(lines), 11)
+        res = self.client.get("/api/attendance/analytics/?by=subject&format=csv")
+        self.assertEqual(b"".join(res.streaming_content).decode().splitlines()[1], f"{self.subject.id},DBMS,42,21,50.0")
+
+    def test_teacher_only(self):
+        self.client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.client.get("/api/attendance/analytics/").status_code, 404)
+
+
+class RegisterExportTests(AttendanceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.post("/api/attendance/", self.payload(self.students, date="2025-10-01"), format="json")
+        self.client.post("/api/attendance/", self.payload(self.students[:2], date="2025-10-01", session=2), format="json")
+        self.client.post("/api/attendance/", self.payload(self.students[:5], date="2025-10-02"), format="json")
+        # Moved to another section after being marked; still on this register
+        Student.objects.filter(pk=self.students[3].pk).update(section="B")
+        self.newcomer = make_student("R100")
+        self.url = f"/api/attendance/register/?subject={self.subject.id}&section=A"
+
+    def test_matrix(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.data["columns"],
+            ["register_number", "full_name", "2025-10-01 P1", "2025-10-01 P2", "2025-10-02 P1", "present", "total"],
+        )
+        rows = {row[0]: row for row in res.data["rows"]}
+        self.assertEqual(len(rows), 21)
+        self.assertEqual(rows["R000"][2:], ["A", "A", "A", 0, 3])
+        self.assertEqual(rows["R003"][2:], ["P", "", "P", 2, 2])
+        self.assertEqual(rows["R019"][2:], ["P", "", "", 1, 1])
+        self.assertEqual(rows["R100"][2:], ["", "", "", 0, 0])
+
+        res = self.client.get(self.url + "&from=2025-10-02")
+        self.assertEqual(res.data["columns"][2:-2], ["2025-10-02 P1"])
+
+    def test_streams_in_chunks(self):
+        periods = register_periods(self.subject, "A")
+        self.assertEqual(
+            list(register_rows(self.subject, "A", periods, chunk_size=3)),
+            list(register_rows(self.subject, "A", periods)),
+        )
+
+    def test_csv_and_xlsx(self):
+        res = self.client.get(self.url + "&format=csv")
+        self.assertTrue(res.streaming)
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 22)
+        self.assertEqual(lines[1], "R000,Student R000,A,A,A,0,3")
+        self.assertIn('filename="register-CS501-A.csv"', res["Content-Disposition"])
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_xlsx_is_built_by_a_job(self):
+        from openpyxl import load_workbook
+        res = self.client.get(self.url + "&format=xlsx&to=2025-10-01")
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(self.client.get(self.url + "&format=xlsx&to=yesterday").status_code, 400)
+
+        call_command("run_jobs", "--once", stdout=io.StringIO())
+        job = self.client.get(f"/api/jobs/{res.json()['job_id']}/").data
+        self.assertEqual(job["status"], "succeeded")
+        self.assertTrue(job["result"]["file"].endswith("/register-CS501-A.xlsx"))
+        with default_storage.open(job["result"]["path"], "rb") as file:
+            sheet = load_workbook(file).active
+        self.assertEqual(sheet.max_row, 22)
+        self.assertEqual([cell.value for cell in sheet[1]][2:-2], ["2025-10-01 P1", "2025-10-01 P2"])
+        self.assertEqual([cell.value for cell in sheet[2]], ["R000", "Student R000", "A", "A", 0, 2])
+
+    def test_requires_own_subject(self):
+        self.assertEqual(self.client.get("/api/attendance/register/?section=A").status_code, 400)
+        other = Subject.objects.create(name="OS", code="CS502", teacher=make_teacher("t2"), semester="5")
+        self.assertEqual(self.client.get(f"/api/attendance/register/?subject={other.id}&section=A").status_code, 404)
+
+
+def photo(color="red", name="photo.jpg"):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class ThumbnailTests(AttendanceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.student = self.students[0]
+
+    def upload(self, student, file):
+        student.img = file
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        student.refresh_from_db()
+
+    def test_upload_creates_content_addressed_sizes(self):
+        from PIL import Image
+
+        self.upload(self.student, photo())
+        digest = self.student.img_digest
+        self.assertEqual(len(digest), 64)
+        for size, pixels in thumbnails.SIZES.items():
+            for fmt in thumbnails.FORMATS:
+                name = thumbnails.thumbnail_name(digest, size, fmt)
+                with default_storage.open(name) as file:
+                    self.assertEqual(Image.open(file).size, (pixels, pixels))
+
+        # Same photo, same files; a new photo gets new ones
+        other = self.students[1]
+        self.upload(other, photo(name="copy.jpg"))
+        self.assertEqual(other.img_digest, digest)
+        self.assertEqual(thumbnails.generate_thumbnails(other), 0)
+        self.upload(self.student, photo("blue"))
+        self.assertNotEqual(self.student.img_digest, digest)
+
+    def test_serializer_picks_size(self):
+        self.upload(self.student, photo())
+        url = f"/api/teacher/students/?subject={self.subject.id}&semester=5&section=A"
+        digest = self.student.img_digest
+
+        def img_url(query=""):
+            res = self.client.get(url + query)
+            return next(row["img_url"] for row in res.data["results"] if row["id"] == self.student.id)
+
+        self.assertTrue(img_url().endswith(thumbnails.thumbnail_name(digest, "sm")))
+        self.assertTrue(img_url("&img_size=lg&img_format=jpeg").endswith(thumbnails.thumbnail_name(digest, "lg", "jpeg")))
+        self.assertTrue(img_url("&img_size=original").endswith(self.student.img.url))
+
+    def test_backfill_command(self):
+        default_storage.save("student_images/old.jpg", photo())
+        Student.objects.filter(pk=self.student.pk).update(img="student_images/old.jpg")
+        out = io.StringIO()
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Thumbnails ready for 1 photos (6 files written)", out.getvalue())
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.img_digest)
+
+    def test_served_with_long_cache(self):
+        self.upload(self.student, photo())
+        name = thumbnails.thumbnail_name(self.student.img_digest, "sm")
+        response = serve_thumbnail(RequestFactory().get(f"/media/{name}"), name)
+        self.assertEqual(response["Cache-Control"], thumbnails.CACHE_CONTROL)
+        response.close()
+
+
+class RosterSnapshotTests(AttendanceAPITestCase):
+    url = "/api/teacher/roster/?subject={}&semester=5&section=A"
+
+    def get(self, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(self.url.format(self.subject.id), headers=headers)
+        return res, [q for q in ctx.captured_queries if "auth_user" not in q["sql"]]
+
+    def test_snapshot_and_revalidation(self):
+        first, queries = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data["students"]), 20)
+        self.assertEqual(
+            first.data["students"][0],
+            {"id": self.students[0].id, "name": "Student R000", "roll_number": "R000", "img": None},
+        )
+        self.assertEqual(first["ETag"], f'"{first.data["hash"]}"')
+        self.assertEqual(len(queries), 2)
+
+        # Snapshot reused: only the subject/section check is left
+        second, queries = self.get()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(queries), 1)
+        res, _ = self.get(**{"If-None-Match": first["ETag"]})
+        self.assertEqual(res.status_code, 304)
+
+        # Attendance does not touch the roster
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/attendance/", self.payload(self.students), format="json")
+        res, queries = self.get(**{"If-None-Match": first["ETag"]})
+        self.assertEqual((res.status_code, len(queries)), (304, 1))
+
+    def test_student_changes_invalidate(self):
+        first, _ = self.get()
+        student = self.students[0]
+        student.full_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        res, _ = self.get(**{"If-None-Match": first["ETag"]})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["students"][0]["name"], "Renamed")
+
+        # Leaving the section updates the old class too
+        student.section = "B"
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        res, _ = self.get()
+        self.assertEqual(len(res.data["students"]), 19)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_student("R200")
+        res, _ = self.get()
+        self.assertEqual(len(res.data["students"]), 20)
+
+    def test_checks_subject_and_section(self):
+        res = self.client.get(f"/api/teacher/roster/?subject={self.subject.id}&semester=5&section=C")
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get("/api/teacher/roster/?subject=x&semester=5&section=A")
+        self.assertEqual(res.status_code, 400)
+
+
+class IdempotencyTests(AttendanceAPITestCase):
+    def post(self, data, key="batch-1"):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/attendance/", data, format="json", headers={"Idempotency-Key": key})
+        return res, ctx.captured_queries
+
+    def test_replay_returns_stored_response_without_writing(self):
+        payload = self.payload(self.students)
+        first, _ = self.post(payload)
+        self.assertEqual(first.status_code, 201)
+
+        replay, queries = self.post(payload)
+        self.assertEqual((replay.status_code, replay.data), (201, first.data))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(len(queries), 1)  # the key lookup
+        self.assertEqual(Attendance.objects.count(), 20)
+
+        # Same key, different body
+        res, _ = self.post(self.payload(self.students, date="2025-10-02"))
+        self.assertEqual(res.status_code, 422)
+
+    def test_session_id_follows_the_key(self):
+        first, _ = self.post(self.payload(self.students[:5]), key="k")
+        IdempotencyKey.objects.all().delete()
+        again, _ = self.post(self.payload(self.students[:5]), key="k")
+        self.assertEqual(again.status_code, 400)  # already marked, not duplicated
+        other, _ = self.post(self.payload(self.students[5:]), key="k2")
+        self.assertNotEqual(first.data["session_id"], other.data["session_id"])
+
+    def test_in_progress_errors_and_expiry(self):
+        payload = self.payload(self.students)
+        fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        IdempotencyKey.objects.create(user=self.teacher.user, key="busy", fingerprint=fingerprint)
+        res, _ = self.post(payload, key="busy")
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(Attendance.objects.count(), 0)
+
+        # A claim past its lease was abandoned: the retry takes it over
+        IdempotencyKey.objects.filter(key="busy").update(created_at=timezone.now() - datetime.timedelta(minutes=5))
+        res, _ = self.post(payload, key="busy")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get(key="busy").status_code, 201)
+        Attendance.objects.all().delete()
+
+        # Validation errors release the key, raised or returned
+        res, _ = self.post([{"student": "nope"}], key="bad")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(key="bad").exists())
+        mixed = self.payload(self.students[:2])
+        mixed[1]["session"] = 2
+        res, _ = self.post(mixed, key="mixed")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(key="mixed").exists())
+        res, _ = self.post(self.payload(self.students[:2]), key="mixed")
+        self.assertEqual(res.status_code, 201)
+        Attendance.objects.all().delete()
+
+        # Expired keys run again
+        first, _ = self.post(self.payload(self.students[:2]), key="old")
+        IdempotencyKey.objects.filter(key="old").update(created_at=timezone.now() - datetime.timedelta(days=2))
+        res, _ = self.post(self.payload(self.students[:2]), key="old")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(res.has_header("Idempotent-Replayed"))
+
+        out = io.StringIO()
+        IdempotencyKey.objects.filter(key="mixed").update(created_at=timezone.now() - datetime.timedelta(days=2))
+        call_command("purge_idempotency_keys", stdout=out)
+        self.assertIn("Deleted 1 expired", out.getvalue())
+
+
+@override_settings(ATTENDANCE_SYNC_SAFETY_WINDOW=0)
+class DeltaSyncTests(AttendanceAPITestCase):
+    def pull(self, since=None, **params):
+        if since:
+            params["since"] = since
+        res = self.client.get("/api/attendance/sync/", params)
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_pull_pages_deltas_including_deletes_and_restores(self):
+        res = self.client.post("/api/attendance/", self.payload(self.students[:3]), format="json")
+        session_id = res.data["session_id"]
+
+        first = self.pull(limit=2)
+        self.assertEqual(len(first["changes"]), 2)
+        self.assertTrue(first["has_more"])
+        rest = self.pull(first["watermark"], limit=2)
+        self.assertEqual(len(rest["changes"]), 1)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(self.pull(rest["watermark"])["changes"], [])
+
+        self.client.delete(f"/api/attendance/delete-session/{session_id}/")
+        deleted = self.pull(rest["watermark"])
+        self.assertEqual([row["is_deleted"] for row in deleted["changes"]], [True] * 3)
+
+        self.client.post(f"/api/attendance/restore-session/{session_id}/")
+        restored = self.pull(deleted["watermark"])
+        self.assertEqual([row["is_deleted"] for row in restored["changes"]], [False] * 3)
+
+        self.assertEqual(self.client.get("/api/attendance/sync/", {"since": "junk"}).status_code, 400)
+
+    def test_safety_window_holds_back_fresh_writes(self):
+        self.client.post("/api/attendance/", self.payload(self.students[:3]), format="json")
+        with override_settings(ATTENDANCE_SYNC_SAFETY_WINDOW=60):
+            self.assertEqual(self.pull()["changes"], [])
+        self.assertEqual(len(self.pull()["changes"]), 3)
+
+    def test_push_spans_periods_and_keeps_server_records(self):
+        self.client.post("/api/attendance/", self.payload(self.students[:5]), format="json")
+        online_session = Attendance.objects.values_list("session_id", flat=True).first()
+
+        rows = self.payload(self.students[:10]) + self.payload(self.students[:4], session=2)
+        rows[0]["status"] = "Present"  # the server says Absent
+        res = self.client.post("/api/attendance/sync/", rows, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["created"], 9)
+        self.assertEqual([c["index"] for c in res.data["conflicts"]], [0, 1, 2, 3, 4])
+        self.assertEqual(len(res.data["changes"]), 14)
+        self.assertEqual(
+            next(row for row in res.data["changes"] if row["student"] == self.students[0].id and row["session"] == 1)["status"],
+            "Absent",
+        )
+
+        # Period 1 stays one session; period 2 gets its own
+        sessions = dict(Attendance.objects.values_list("session", "session_id").distinct())
+        self.assertEqual(sessions[1], online_session)
+        self.assertEqual(Attendance.objects.filter(session=1).count(), 10)
+        self.assertEqual(StudentAttendanceStats.objects.get(student=self.students[9]).total, 1)
+
+    def test_push_rejects_other_teachers_subjects(self):
+        other = Subject.objects.create(name="OS", code="CS502", teacher=make_teacher("t2"), semester="5")
+        rows = self.payload(self.students[:2])
+        rows[1]["subject"] = other.id
+        res = self.client.post("/api/attendance/sync/", rows, format="json")
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["conflicts"], [{"index": 1, "student": self.students[1].id, "detail": "Invalid subject."}])
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTests(AttendanceAPITestCase):
+    def test_sampled_request_reports_timings_and_slow_queries(self):
+        with self.assertLogs("students.instrumentation", "INFO") as logs:
+            self.client.post("/api/attendance/", self.payload(self.students), format="json")
+            res = self.client.get("/api/attendance/")
+        self.assertEqual(res.status_code, 200)
+
+        timing = dict(part.split(";", 1) for part in res["Server-Timing"].split(", "))
+        self.assertEqual(set(timing), {"total", "view", "serialize", "db"})
+        self.assertRegex(timing["db"], r'dur=[\d.]+;desc="\d+ queries"')
+
+        insert, record = (json.loads(line.getMessage()) for line in logs.records)
+        self.assertEqual(insert["status"], 201)
+        self.assertEqual((record["view"], record["status"]), ("attendance-list", 200))
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["serialize_ms"], 0)
+        self.assertLessEqual(len(record["slow_queries"]), settings.INSTRUMENTATION_SLOW_QUERIES)
+        self.assertIn("students_attendance", " ".join(q["sql"] for q in record["slow_queries"]))
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_disabled_adds_nothing(self):
+        res = self.client.get("/api/attendance/")
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql('SELECT "t1"."id" FROM "t1" WHERE "x" IN (%s, %s)  AND y = \'it\'\'s\' LIMIT 21'),
+            'SELECT "t1"."id" FROM "t1" WHERE "x" IN (...) AND y = ? LIMIT ?',
+        )
+        self.assertEqual(normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"), "INSERT INTO t (a, b) VALUES (...)")
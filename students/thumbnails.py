@@ -0,0 +1,104 @@
+"""
+Fixed-size thumbnails of ``Student.img``.
+
+Originals are phone-camera photos while lists, rosters and the admin only
+show small squares. Every photo gets one file per size and format under a
+content-addressed path::
+
+    thumbs/<digest[:2]>/<digest>/<size>.<format>
+
+where ``digest`` is the SHA-256 of the original's bytes (stored as
+``Student.img_digest``). A path's content never changes, so it is served
+with a far-future ``Cache-Control`` and identical photos share files.
+"""
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import Student
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = {"sm": 64, "md": 160, "lg": 480}
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+DEFAULT_FORMAT = "webp"
+QUALITY = 80
+ROOT = "thumbs"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def thumbnail_name(digest, size, fmt=DEFAULT_FORMAT):
+    return f"{ROOT}/{digest[:2]}/{digest}/{size}.{fmt}"
+
+
+def thumbnail_url(student, size, fmt=DEFAULT_FORMAT):
+    """URL of one of ``student``'s thumbnails, or None before they exist."""
+    if not student.img_digest or size not in SIZES or fmt not in FORMATS:
+        return None
+    return default_storage.url(thumbnail_name(student.img_digest, size, fmt))
+
+
+def _digest(file):
+    sha = hashlib.sha256()
+    for chunk in file.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def render(image, size, fmt):
+    """``image`` cropped to a centred ``size`` square, encoded as ``fmt``."""
+    from PIL import Image, ImageOps
+
+    pixels = SIZES[size]
+    thumb = ImageOps.fit(image.convert("RGB"), (pixels, pixels), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    thumb.save(buffer, FORMATS[fmt], quality=QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(student, storage=default_storage):
+    """
+    Write any missing thumbnails of ``student.img`` and record its digest.
+    Returns the number of files written.
+    """
+    from PIL import Image, ImageOps
+
+    if not student.img:
+        if student.img_digest:
+            student.img_digest = ""
+            student.save(update_fields=["img_digest"])
+        return 0
+
+    with student.img.open("rb") as file:
+        digest = _digest(file)
+        file.seek(0)
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+
+    written = 0
+    for size in SIZES:
+        for fmt in FORMATS:
+            name = thumbnail_name(digest, size, fmt)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(render(image, size, fmt)))
+                written += 1
+
+    if student.img_digest != digest:
+        student.img_digest = digest
+        student.save(update_fields=["img_digest"])
+    return written
+
+
+def generate_thumbnails_for(student_id):
+    """``generate_thumbnails`` after an upload; a bad file is logged, not raised."""
+    student = Student.objects.filter(pk=student_id).first()
+    if student is None:
+        return
+    try:
+        generate_thumbnails(student)
+    except (OSError, ValueError):
+        logger.exception("Could not create thumbnails for student %s", student_id)
@@ -15,6 +15,7 @@ urlpatterns = [
     path('student/profile/', views.get_student_profile, name='student-profile'),
     path('teacher/profile/', views.teacher_profile, name='teacher-profile'),
     path('teacher/students/', views.get_students_for_teacher, name='students-for-teacher'),
+    path('teacher/roster/', views.teacher_roster, name='teacher-roster'),
     path('upload-students/', views.upload_students, name='upload-students'),
 
     # 🔥 NEW: CHANGE PASSWORD API
@@ -1,5 +1,8 @@
+from .roles import role_for_user
+
+
 def is_teacher(user):
-    return user.groups.filter(name='Teachers').exists()
+    return role_for_user(user).is_teacher
 
 def is_student(user):
-    return user.groups.filter(name='Students').exists()
+    return role_for_user(user).is_student
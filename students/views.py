@@ -2,26 +2,69 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.utils import timezone
-from django.contrib.auth.models import User
-import pandas as pd
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.http import JsonResponse
 from django.contrib.auth.password_validation import validate_password
 import uuid
-from django.db.models import Count
-from django.db import models
-
-from .models import Student, Teacher, Attendance, Subject
+from django.db.models import Count, Exists, OuterRef
+
+from .models import Student, Teacher, Attendance, Subject, SubjectSection, Job
+from .cache import SUBJECTS, cached_response, etag_matches
+from .filters import filter_date_range
+from .importer import import_students, ImportFormatError
+from .jobs import enqueue
+from .roles import get_role
+from .retry import retry_on_lock
+from .idempotency import idempotent, batch_session_id
+from .routers import replica_reads
+from .renderers import ColumnarJSONRenderer, CSVRenderer, XLSXRenderer
+from .exports import stream_csv, xlsx_response
+from .pagination import KeysetPagination, SummaryPagination, DeletedSessionPagination
 from .serializer import (
     StudentSerializer,
     TeacherSerializer,
     AttendanceSerializer,
     SubjectSerializer,
+    AttendanceBulkSerializer,
+    AttendanceValuesSerializer,
+    JobSerializer,
     MyTokenObtainPairSerializer,
+    MyTokenRefreshSerializer,
+)
+from .services import (
+    bulk_mark_attendance,
+    mark_attendance,
+    save_attendance,
+    soft_delete_attendance,
+    soft_delete_session,
+    restore_attendance_session,
+    roster_snapshot,
+    teacher_summary_rows,
+    attendance_analytics,
+    defaulters,
+    ANALYTICS_GROUPS,
+    ANALYTICS_COLUMNS,
+    DEFAULTER_KEYS,
+    REGISTER_CHUNK_SIZE,
+    register_header,
+    register_periods,
+    register_rows,
+    attendance_changes,
+    decode_watermark,
+    encode_watermark,
+    sync_mark_attendance,
 )
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from rest_framework import status
 from django.db import IntegrityError
+from django.core.files.storage import default_storage
+from django.views.static import serve
+from .thumbnails import CACHE_CONTROL
+
+# Upper bound of ?limit= on GET /api/attendance/sync/
+SYNC_MAX_PAGE_SIZE = 5000
 # -----------------------------
 # CUSTOM PERMISSIONS
 # -----------------------------
@@ -29,7 +72,27 @@ class IsTeacherOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return request.user.is_authenticated
-        return Teacher.objects.filter(user=request.user).exists()
+        return get_role(request).is_teacher
+
+
+# -----------------------------
+# EAGER LOADING
+# -----------------------------
+class EagerLoadingViewMixin:
+    """
+    Applies the serializer's declared relations (see
+    ``EagerLoadingMixin``) to every queryset the view serializes, so list
+    and detail responses cost a fixed number of queries.
+    """
+
+    def setup_eager_loading(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, "setup_eager_loading"):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.setup_eager_loading(super().filter_queryset(queryset))
 
 
 # -----------------------------
@@ -39,41 +102,51 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
+class MyTokenRefreshView(TokenRefreshView):
+    # Re-reads the role claims for each new access token
+    serializer_class = MyTokenRefreshSerializer
+
+
 # -----------------------------
 # SUBJECT VIEWSET
 # -----------------------------
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
    serializer_class = SubjectSerializer
    permission_classes = [permissions.IsAuthenticated]
 
    def get_queryset(self):
-        teacher = Teacher.objects.filter(user=self.request.user).first()
-        if teacher:
-            return Subject.objects.filter(teacher=teacher)
+        role = get_role(self.request)
+        if role.is_teacher:
+            return Subject.objects.filter(teacher_id=role.teacher_id)
         return Subject.objects.none()
 
+   @cached_response("teacher", SUBJECTS)
+   def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 # -----------------------------
 # STUDENT VIEWSET
 # -----------------------------
-class StudentViewSet(viewsets.ReadOnlyModelViewSet):
+class StudentViewSet(EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = StudentSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Student.objects.all()
 
     def get_queryset(self):
-        user = self.request.user
-        student = Student.objects.filter(user=user).first()
-        if student:
-            return Student.objects.filter(pk=student.pk)
+        role = get_role(self.request)
+        if role.student_id:
+            return Student.objects.filter(pk=role.student_id)
         return Student.objects.none()
 
     @action(detail=True, methods=["get"])
+    @cached_response("student")
     def attendance_summary(self, request, pk=None):
         student = self.get_object()
-        qs = Attendance.objects.filter(student=student, is_deleted=False)
-        total_classes = qs.count()
-        present_count = qs.filter(status="Present").count()
+        # Joined in by the serializer's eager loading; None when never marked
+        stats = getattr(student, "attendance_stats", None)
+        total_classes = stats.total if stats else 0
+        present_count = stats.present if stats else 0
         percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
 
         return Response({
@@ -88,65 +161,109 @@ class StudentViewSet(viewsets.ReadOnlyModelViewSet):
 # -----------------------------
 # TEACHER VIEWSET
 # -----------------------------
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     @action(detail=False, methods=["get"])
+    @cached_response("teacher", SUBJECTS)
     def profile(self, request):
-        teacher = Teacher.objects.filter(user=request.user).first()
+        teacher = self.setup_eager_loading(Teacher.objects.filter(pk=get_role(request).teacher_id)).first()
         if not teacher:
             return Response({"detail": "Teacher profile not found"}, status=404)
         serializer = self.get_serializer(teacher)
         return Response(serializer.data)
 
 
+# -----------------------------
+# JOB VIEWSET (status / progress polling)
+# -----------------------------
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(created_by=user)
+
+
 # -----------------------------
 # ATTENDANCE VIEWSET
 # -----------------------------
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer, CSVRenderer, XLSXRenderer]
+
+    def values_read(self):
+        """
+        None for the regular serializer path, otherwise whether the fast
+        ``.values()`` path should answer in columnar form. Chosen by
+        ``?fast=1`` or by negotiating the columnar renderer.
+        """
+        columnar = isinstance(getattr(self.request, "accepted_renderer", None), ColumnarJSONRenderer)
+        if columnar or self.request.query_params.get("fast") in ("1", "true"):
+            return columnar
+        return None
 
     def get_queryset(self):
-        user = self.request.user
-        if Teacher.objects.filter(user=user).exists():
-           teacher = Teacher.objects.get(user=user)
-           return Attendance.objects.filter(
-             subject__teacher=teacher,
+        role = get_role(self.request)
+        if role.is_teacher:
+           qs = Attendance.objects.filter(
+             subject__teacher_id=role.teacher_id,
              is_deleted=False
             )
-        return Attendance.objects.filter(
-        student__user=user,
-        is_deleted=False
-    )
+        elif role.student_id:
+            qs = Attendance.objects.filter(
+            student_id=role.student_id,
+            is_deleted=False
+        )
+        else:
+            qs = Attendance.objects.none()
+
+        if self.action == "list":
+            qs = filter_date_range(qs, self.request)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        columnar = self.values_read()
+        if columnar is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(AttendanceValuesSerializer.values(self.get_queryset()))
+        return self.get_paginated_response(AttendanceValuesSerializer.to_representation(page, columnar))
 
 
         
+    @idempotent
+    @retry_on_lock
     def create(self, request, *args, **kwargs):
         data = request.data
         is_many = isinstance(data, list)
 
-        batch_session_id = str(uuid.uuid4())
+        # Client-keyed when an Idempotency-Key is sent
+        session_id = batch_session_id(request)
+
+        if is_many:
+            return self.bulk_mark(request, data, session_id)
 
-        session_num = 1
-        if is_many and len(data) > 0:
-            session_num = data[0].get("session", 1)
-        elif not is_many:
-            session_num = data.get("session", 1)
+        session_num = data.get("session", 1)
 
-        serializer = self.get_serializer(data=data, many=is_many)
+        serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
 
         try:
-            serializer.save(
+            mark_attendance(
+                serializer,
                 recorded_by=request.user,
-                session_id=batch_session_id,
+                session_id=session_id,
                 session=session_num,
-                semester=data[0]["semester"] if isinstance(data, list) else data["semester"],
-                section=data[0]["section"] if isinstance(data, list) else data["section"],
+                semester=data["semester"],
+                section=data["section"],
 
             )
         except IntegrityError:
@@ -159,56 +276,292 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             {"message": "Attendance saved successfully"},
             status=status.HTTP_201_CREATED
         )
+
+    # -----------------------------
+    # 🔥 NEW: BULK MARKING (list payloads)
+    # -----------------------------
+    def bulk_mark(self, request, data, batch_session_id):
+        if not data:
+            return Response(
+                {"detail": "No attendance records submitted"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        role = get_role(request)
+        if not role.is_teacher:
+            return Response(
+                {"error": "Only teachers can mark attendance"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = AttendanceBulkSerializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+        first = rows[0]
+
+        # One batch is one period of one class: the rows share its session id,
+        # and delete-session/restore-session act on all of them together
+        mixed = [
+            index for index, row in enumerate(rows)
+            if any(row[field] != first[field] for field in ("subject", "date", "session", "semester", "section"))
+        ]
+        if mixed:
+            return Response(
+                {
+                    "detail": "Every row in a batch must have the same subject, date, session, semester and section",
+                    "rows": mixed,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            records, conflicts = bulk_mark_attendance(
+                rows,
+                recorded_by=request.user,
+                session_id=batch_session_id,
+                session=first["session"],
+                semester=first["semester"],
+                section=first["section"],
+                teacher_id=role.teacher_id,
+            )
+        except IntegrityError:
+            # Lost a race with a concurrent submission for the same period
+            return Response(
+                {"detail": "Attendance already marked for this subject, date, and period"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not records:
+            return Response(
+                {
+                    "detail": "Attendance already marked for this subject, date, and period",
+                    "conflicts": conflicts,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                "message": "Attendance saved successfully",
+                "session_id": batch_session_id,
+                "created": len(records),
+                "conflicts": conflicts,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
         # -----------------------------
 # 🔥 NEW: VIEW DELETED SESSIONS (for undo)
 # -----------------------------
     @action(detail=False, methods=["get"], url_path="teacher-deleted")
     def deleted_sessions(self, request):
-        teacher = Teacher.objects.filter(user=request.user).first()
-        if not teacher:
+        role = get_role(request)
+        if not role.is_teacher:
             return Response({"error": "Teacher not found"}, status=404)
 
         deleted = (
-            Attendance.objects
-            .filter(subject__teacher=teacher, is_deleted=True)
+            filter_date_range(
+                Attendance.objects.filter(subject__teacher_id=role.teacher_id, is_deleted=True),
+                request
+            )
             .values("session_id", "date", "subject__name", "session","semester",   # ✅
               "section", )
             .annotate(total=Count("id"))
-            .order_by("-date", "-session")
         )
 
-        return Response(deleted)
+        paginator = DeletedSessionPagination()
+        page = paginator.paginate_queryset(deleted, request, view=self)
+        return paginator.get_paginated_response(page)
 
 
     @action(detail=False, methods=["get"], url_path="teacher-summary")
+    @replica_reads
     def teacher_attendance_summary(self, request):
-        teacher = Teacher.objects.filter(user=request.user).first()
-        if not teacher:
+        role = get_role(request)
+        if not role.is_teacher:
+            return Response({"error": "Teacher not found"}, status=404)
+
+        rollups = filter_date_range(teacher_summary_rows(role.teacher_id), request)
+
+        paginator = SummaryPagination()
+        page = paginator.paginate_queryset(rollups, request, view=self)
+        return paginator.get_paginated_response(page)
+
+    # -----------------------------
+    # ANALYTICS (rates, buckets, defaulters)
+    # -----------------------------
+    def report_filters(self, request):
+        """``?subject=&semester=&section=`` and the ``?from=&to=`` window."""
+        params = request.query_params
+        filters = {key: params[key] for key in ("semester", "section") if params.get(key)}
+        if params.get("subject"):
+            try:
+                filters["subject_id"] = int(params["subject"])
+            except ValueError:
+                raise ValidationError({"subject": "Enter a subject id."})
+        if params.get("from") or params.get("to"):
+            filters["date_range"] = lambda queryset: filter_date_range(queryset, request)
+        return filters
+
+    def export_response(self, request, header, rows, name):
+        """
+        ``rows`` as a download when CSV (streamed) or XLSX (built in full,
+        so only for the bounded aggregate reports) was negotiated, else None.
+        """
+        renderer = request.accepted_renderer
+        if isinstance(renderer, CSVRenderer):
+            return stream_csv(header, rows, f"{name}.csv")
+        if isinstance(renderer, XLSXRenderer):
+            return xlsx_response(header, rows, f"{name}.xlsx", title=name)
+        return None
+
+    def report_response(self, request, rows, columns, name):
+        lines = ([row[column] for column in columns] for row in rows.iterator(chunk_size=REGISTER_CHUNK_SIZE))
+        return self.export_response(request, columns, lines, name) or Response(list(rows))
+
+    @action(detail=False, methods=["get"])
+    def analytics(self, request):
+        role = get_role(request)
+        if not role.is_teacher:
             return Response({"error": "Teacher not found"}, status=404)
 
-        attendances = (
-            Attendance.objects
-            .filter(subject__teacher=teacher, is_deleted=False)
-            .values(
-                "session_id",
-                "date",
-                "subject__name",
-                "session",
-                "student__semester",
-                "student__section",
-                
+        by = request.query_params.get("by", "subject")
+        if by not in ANALYTICS_GROUPS:
+            raise ValidationError({"by": f"Choose one of: {', '.join(ANALYTICS_GROUPS)}."})
+        rows = attendance_analytics(role.teacher_id, by, **self.report_filters(request))
+        return self.report_response(request, rows, [*ANALYTICS_GROUPS[by], *ANALYTICS_COLUMNS], f"attendance-by-{by}")
+
+    @action(detail=False, methods=["get"], url_path="defaulters")
+    def defaulter_list(self, request):
+        role = get_role(request)
+        if not role.is_teacher:
+            return Response({"error": "Teacher not found"}, status=404)
+
+        try:
+            threshold = float(request.query_params.get("threshold", settings.ATTENDANCE_DEFAULTER_THRESHOLD))
+        except ValueError:
+            raise ValidationError({"threshold": "Enter a percentage."})
+        if not 0 <= threshold <= 100:
+            raise ValidationError({"threshold": "Enter a percentage between 0 and 100."})
+
+        rows = defaulters(role.teacher_id, threshold, **self.report_filters(request))
+        return self.report_response(request, rows, [*DEFAULTER_KEYS, *ANALYTICS_COLUMNS], "defaulters")
+
+    # -----------------------------
+    # REGISTER EXPORT (student x period matrix)
+    # -----------------------------
+    @action(detail=False, methods=["get"])
+    def register(self, request):
+        role = get_role(request)
+        if not role.is_teacher:
+            return Response({"error": "Teacher not found"}, status=404)
+
+        filters = self.report_filters(request)
+        section = request.query_params.get("section")
+        if "subject_id" not in filters or not section:
+            return Response({"error": "subject and section are required"}, status=400)
+        subject = Subject.objects.filter(
+            id=filters["subject_id"], teacher_id=role.teacher_id
+        ).select_related("teacher").first()
+        if not subject:
+            return Response({"error": "Invalid subject for this teacher"}, status=404)
+
+        date_range = filters.get("date_range")
+        if isinstance(request.accepted_renderer, XLSXRenderer):
+            # A workbook can only be sent once it is complete, which for a
+            # semester's register outlasts a request: build it in a job
+            if date_range:
+                date_range(Attendance.objects.none())  # validates ?from=/?to=
+            job = enqueue("export_register", {
+                "subject_id": subject.id,
+                "section": section,
+                "date_from": request.query_params.get("from") or None,
+                "date_to": request.query_params.get("to") or None,
+            }, user=request.user)
+            return JsonResponse({"job_id": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+        periods = register_periods(subject, section, date_range)
+        header = register_header(periods)
+        rows = register_rows(subject, section, periods, date_range)
+        name = f"register-{subject.code}-{section}"
+        return self.export_response(request, header, rows, name) or Response({"columns": header, "rows": list(rows)})
+
+    # -----------------------------
+    # DELTA SYNC (offline clients)
+    # -----------------------------
+    @action(detail=False, methods=["get", "post"])
+    def sync(self, request):
+        if request.method == "POST":
+            return self.sync_push(request)
+        return self.sync_pull(request)
+
+    def sync_pull(self, request):
+        """Records changed since ``?since=<watermark>`` (all of them without one)."""
+        role = get_role(request)
+        if role.is_teacher:
+            qs = Attendance.objects.filter(subject__teacher_id=role.teacher_id)
+        elif role.student_id:
+            qs = Attendance.objects.filter(student_id=role.student_id)
+        else:
+            return Response({"error": "Teacher or student not found"}, status=404)
+
+        watermark = None
+        since = request.query_params.get("since")
+        if since:
+            try:
+                watermark = decode_watermark(since)
+            except ValueError:
+                return Response({"error": "Invalid watermark"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get("limit", settings.ATTENDANCE_SYNC_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, watermark, has_more = attendance_changes(qs, watermark, max(1, min(limit, SYNC_MAX_PAGE_SIZE)))
+        return Response({
+            "changes": rows,
+            "watermark": encode_watermark(watermark) if watermark else None,
+            "has_more": has_more,
+        })
+
+    @idempotent
+    @retry_on_lock
+    def sync_push(self, request):
+        """Markings made offline, possibly for several periods."""
+        role = get_role(request)
+        if not role.is_teacher:
+            return Response(
+                {"error": "Only teachers can mark attendance"},
+                status=status.HTTP_403_FORBIDDEN
             )
-            .annotate(
-                 
-                
-                total=Count("id"),
-                present=Count("id", filter=models.Q(status="Present")),
-                absent=Count("id", filter=models.Q(status="Absent")),
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"detail": "No attendance records submitted"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = AttendanceBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            records, conflicts, server_rows = sync_mark_attendance(
+                serializer.validated_data,
+                recorded_by=request.user,
+                teacher_id=role.teacher_id,
+                batch_id=batch_session_id(request),
+            )
+        except IntegrityError:
+            # Lost a race with a concurrent submission for the same period
+            return Response(
+                {"detail": "Attendance already marked for this subject, date, and period"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            .order_by("-date", "-session")
-        )
 
-        return Response(attendances)
+        return Response({
+            "created": len(records),
+            "conflicts": conflicts,
+            "changes": server_rows,
+        })
 
     # -----------------------------
     # 🔥 NEW: VIEW SESSION DETAILS
@@ -220,55 +573,62 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             is_deleted=False
         )
 
+        columnar = self.values_read()
+        if columnar is not None:
+            rows = list(AttendanceValuesSerializer.values(qs.order_by(*Attendance._meta.ordering)))
+            if not rows:
+                return Response({"error": "No attendance found for this session"}, status=404)
+            return Response(AttendanceValuesSerializer.to_representation(rows, columnar))
+
         if not qs.exists():
             return Response(
                 {"error": "No attendance found for this session"},
                 status=404
             )
 
-        serializer = self.get_serializer(qs, many=True)
+        serializer = self.get_serializer(self.setup_eager_loading(qs), many=True)
         return Response(serializer.data)
 
     # -----------------------------
     # 🔥 NEW: DELETE FULL SESSION
     # -----------------------------
     @action(detail=False, methods=["delete"], url_path="delete-session/(?P<session_id>[^/.]+)")
+    @retry_on_lock
     def delete_session(self, request, session_id=None):
-        if not Teacher.objects.filter(user=request.user).exists():
+        if not get_role(request).is_teacher:
             return Response(
                 {"error": "Only teachers can delete attendance"},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        qs = Attendance.objects.filter(session_id=session_id, is_deleted=False)
-
-        if not qs.exists():
+        if not soft_delete_session(session_id):
             return Response(
                 {"error": "Session not found"},
                 status=404
             )
 
-        qs.update(is_deleted=True)
-
         return Response(
             {"message": "Attendance session deleted successfully"},
             status=status.HTTP_204_NO_CONTENT
         )
 
+    def perform_update(self, serializer):
+        # Moves the record's counts to its new status/period
+        save_attendance(serializer.instance.pk, serializer.save)
+
     # -----------------------------
     # SINGLE RECORD DELETE (unchanged)
     # -----------------------------
     def destroy(self, request, *args, **kwargs):
         attendance = self.get_object()
 
-        if not Teacher.objects.filter(user=request.user).exists():
+        if not get_role(request).is_teacher:
             return Response(
                 {"error": "Only teachers can delete attendance"},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        attendance.is_deleted = True
-        attendance.save()
+        soft_delete_attendance(attendance)
 
         return Response(
             {"message": "Attendance deleted successfully"},
@@ -281,18 +641,24 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 # -----------------------------
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_response("student", SUBJECTS)
 def get_student_profile(request):
-    student = Student.objects.filter(user=request.user).first()
+    student = StudentSerializer.setup_eager_loading(
+        Student.objects.filter(pk=get_role(request).student_id)
+    ).first()
     if not student:
         return Response({"error": "Student profile not found"}, status=404)
-    serializer = StudentSerializer(student)
+    serializer = StudentSerializer(student, context={"request": request})
     return Response(serializer.data)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@cached_response("teacher", SUBJECTS)
 def teacher_profile(request):
-    teacher= Teacher.objects.filter(user=request.user).prefetch_related('subjects').first()
+    teacher = TeacherSerializer.setup_eager_loading(
+        Teacher.objects.filter(pk=get_role(request).teacher_id)
+    ).first()
     if not teacher:
         return Response({"detail": "Teacher profile not found"}, status=404)
     serializer = TeacherSerializer(teacher)
@@ -301,9 +667,10 @@ def teacher_profile(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def get_students_for_teacher(request):
-    teacher = Teacher.objects.filter(user=request.user).first()
-    if not teacher:
+    role = get_role(request)
+    if not role.is_teacher:
         return Response({"error": "Teacher profile not found"}, status=404)
 
     section = request.query_params.get("section")
@@ -317,8 +684,12 @@ def get_students_for_teacher(request):
 
     subject = Subject.objects.filter(
        id=subject_id,
-       teacher=teacher,
+       teacher_id=role.teacher_id,
        semester=semester
+    ).select_related("teacher").annotate(
+        handles_section=Exists(
+            SubjectSection.objects.filter(subject=OuterRef("pk"), section=section)
+        )
     ).first()
 
     if not subject:
@@ -327,24 +698,69 @@ def get_students_for_teacher(request):
         status=400
     )
      # 🔥 CRITICAL CHECK
-    if section not in subject.sections:
+    if not subject.handles_section:
         return Response(
             {"error": "Teacher does not handle this section for the subject"},
             status=400
         )
 
     students = Student.objects.filter(
-        department=teacher.department,
+        department=subject.teacher.department,
         semester=semester,
         section=section,
       
    )
+    students = StudentSerializer.setup_eager_loading(students)
 
-    serializer = StudentSerializer(students, many=True)
-    return Response(serializer.data)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(students, request)
+    # Roster rows show small photos unless ?img_size= asks otherwise
+    serializer = StudentSerializer(page, many=True, context={"request": request, "img_size": "sm"})
+    return paginator.get_paginated_response(serializer.data)
  
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def teacher_roster(request):
+    """
+    Compact roster (id, name, roll number, photo) of a class the teacher
+    takes, for the mark-attendance screen. Shared snapshot per class,
+    revalidated through its content hash (ETag / If-None-Match).
+    """
+    role = get_role(request)
+    if not role.is_teacher:
+        return Response({"error": "Teacher not found"}, status=404)
+
+    section = request.query_params.get("section")
+    semester = request.query_params.get("semester")
+    subject_id = request.query_params.get("subject")
+    if not section or not semester or not subject_id:
+        return Response({"error": "subject, section and semester are required"}, status=400)
+    if not subject_id.isdigit():
+        return Response({"error": "Invalid subject for this teacher"}, status=400)
+
+    subject = Subject.objects.filter(
+        id=subject_id, teacher_id=role.teacher_id, semester=semester
+    ).select_related("teacher").annotate(
+        handles_section=Exists(SubjectSection.objects.filter(subject=OuterRef("pk"), section=section))
+    ).first()
+    if not subject:
+        return Response({"error": "Invalid subject for this teacher"}, status=400)
+    if not subject.handles_section:
+        return Response({"error": "Teacher does not handle this section for the subject"}, status=400)
+
+    snapshot = roster_snapshot(subject.teacher.department, semester, section)
+    etag = f'"{snapshot["hash"]}"'
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(snapshot)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def upload_students(request):
@@ -352,33 +768,27 @@ def upload_students(request):
     if not file:
         return Response({"error": "No file uploaded"}, status=400)
 
-    try:
-        df = pd.read_excel(file)
-    except:
-        return Response({"error": "Invalid Excel file"}, status=400)
-
-    created = 0
-    for _, row in df.iterrows():
-        register_number = str(row["register_number"]).strip()
-        user, created_user = User.objects.get_or_create(username=register_number)
-        if created_user:
-            user.set_password(register_number)
-            user.save()
-
-        Student.objects.get_or_create(
-            register_number=register_number,
-            defaults={
-                "user": user,
-                "full_name": row["full_name"],
-                "department": row["department"],
-                "semester": row["semester"],
-                "year": row["year"],
-                "section": row["section"],
-            }
+    if request.query_params.get("async") or request.data.get("async"):
+        # Park the file and let `manage.py run_jobs` do the import
+        path = default_storage.save(f"imports/{uuid.uuid4()}-{file.name}", file)
+        job = enqueue("import_students", {"path": path, "filename": file.name}, user=request.user)
+        return Response(
+            {"job_id": job.id, "status": job.status},
+            status=status.HTTP_202_ACCEPTED
         )
-        created += 1
 
-    return Response({"message": "Upload successful", "created_students": created})
+    try:
+        report = import_students(file, file.name)
+    except ImportFormatError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    return Response({
+        "message": "Upload successful",
+        "created_students": report["created"],
+        "existing_students": report["exists"],
+        "failed_rows": report["error"],
+        "rows": report["rows"],
+    })
 
 
 @api_view(["POST"])
@@ -397,6 +807,7 @@ def change_password(request):
     validate_password(new_password, user)
     user.set_password(new_password)
     user.save()
+    Student.objects.filter(user=user).update(must_change_password=False)
 
     return Response({"message": "Password changed successfully"})
 # -----------------------------
@@ -404,26 +815,45 @@ def change_password(request):
 # -----------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@retry_on_lock
 def restore_session(request, session_id):
     # Only teachers can restore sessions
-    if not Teacher.objects.filter(user=request.user).exists():
+    if not get_role(request).is_teacher:
         return Response(
             {"error": "Only teachers can restore sessions"},
             status=403
         )
 
-    # Get all soft-deleted attendances for this session
-    attendances = Attendance.objects.filter(session_id=session_id, is_deleted=True)
-    if not attendances.exists():
+    # Restore all soft-deleted attendances for this session
+    try:
+        restored = restore_attendance_session(session_id)
+    except IntegrityError:
+        return Response(
+            {"error": "Attendance has been marked again for this period"},
+            status=400
+        )
+
+    if not restored:
         return Response(
             {"error": "No deleted session found"},
             status=404
         )
 
-    # Restore the session
-    attendances.update(is_deleted=False)
-
     return Response(
         {"message": "Session restored successfully"},
         status=200
-    ) 
\ No newline at end of file
+    ) 
+
+
+# -----------------------------
+# THUMBNAILS (development server)
+# -----------------------------
+def serve_thumbnail(request, path):
+    """
+    Thumbnails from MEDIA_ROOT with the far-future caching their
+    content-addressed names allow. In production the web server serves
+    ``/media/thumbs/`` with the same header.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response["Cache-Control"] = CACHE_CONTROL
+    return response